@@ -0,0 +1,301 @@
+from __future__ import annotations
+import base64, gzip, json, os, sqlite3, time, datetime as dt
+from typing import TYPE_CHECKING, Any, Iterator
+
+# agents/db.py imports this module for its reads, so it is imported here only where needed
+if TYPE_CHECKING:
+    from .db import Session
+
+# Cold storage: rows older than the archive horizon live in gzip'd JSON-lines files, one per table and
+# month, next to the database in <db name>-archive/. index.json (the sidecar) records the horizon
+# and, per month, row counts, time/date range and file sizes. Reads in agents/db.py attach the
+# months they need as a temporary database (schema "arch") and union it with the hot tables; hot
+# rows win over archived copies of the same key.
+
+INDEX_NAME = "index.json"
+# Archived tables, the column that assigns a row to a month, and the key under which a hot row
+# supersedes archived ones (a hot selection for a pack/date replaces the whole archived selection)
+TABLES = {
+    "items": ("event_ts", ("id",)),
+    "item_packs": ("event_ts", ("pack", "item_id")),
+    "daily_selected": ("date", ("pack", "date")),
+}
+
+PRIMARY_KEYS = {"items": ("id",), "item_packs": ("pack", "item_id"), "daily_selected": ("pack", "date", "item_id")}
+
+_index_cache: dict[str, tuple[int, dict[str, Any]]] = {}
+
+def archive_dir(db_path: str) -> str:
+    return os.path.splitext(os.path.abspath(db_path))[0] + "-archive"
+
+def month_of_ts(ts: int) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+def _month_of(table: str, value: Any) -> str:
+    return month_of_ts(value) if TABLES[table][0] == "event_ts" else value[:7]
+
+def load_index(directory: str) -> dict[str, Any] | None:
+    """The sidecar index for an archive directory (cached until the file changes), or None."""
+    path = os.path.join(directory, INDEX_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = _index_cache[path] = (mtime, json.load(f))
+    return cached[1]
+
+def _write_atomic(path: str, write) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _encode(row: dict[str, Any]) -> str:
+    return json.dumps({k: {"b64": base64.b64encode(v).decode("ascii")} if isinstance(v, bytes) else v
+                       for k, v in row.items()}, ensure_ascii=False, separators=(",", ":"))
+
+def _decode(line: str) -> dict[str, Any]:
+    return {k: base64.b64decode(v["b64"]) if isinstance(v, dict) else v for k, v in json.loads(line).items()}
+
+def partition_path(directory: str, table: str, month: str) -> str:
+    return os.path.join(directory, f"{table}-{month}.jsonl.gz")
+
+def read_partition(directory: str, table: str, month: str) -> Iterator[dict[str, Any]]:
+    path = partition_path(directory, table, month)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield _decode(line)
+
+def _databases(conn: sqlite3.Connection) -> dict[str, str]:
+    """Schema name -> file for the connection (plain tuples, so row counters do not see these reads)."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    return {name: path for _, name, path in cur.execute("PRAGMA database_list")}
+
+def _archive_of(conn: sqlite3.Connection) -> tuple[str, dict[str, Any]] | None:
+    main = _databases(conn).get("main")
+    if not main:
+        return None
+    directory = archive_dir(main)
+    idx = load_index(directory)
+    return (directory, idx) if idx and idx["partitions"] else None
+
+def horizon(conn: sqlite3.Connection) -> int:
+    """Epoch seconds before which rows may be archived (0 when the database has no archive)."""
+    arc = _archive_of(conn)
+    return arc[1]["horizon_ts"] if arc else 0
+
+def _attach(conn: sqlite3.Connection) -> None:
+    conn.execute("ATTACH DATABASE '' AS arch")
+    for table in TABLES:
+        conn.execute(f"CREATE TABLE arch.{table} AS SELECT * FROM main.{table} WHERE 0")
+    conn.executescript('''
+        CREATE INDEX arch.idx_arch_items_id ON items(id);
+        CREATE INDEX arch.idx_arch_items_ts ON items(event_ts);
+        CREATE INDEX arch.idx_arch_packs ON item_packs(pack, event_ts);
+        CREATE INDEX arch.idx_arch_packs_item ON item_packs(item_id, pack);
+        CREATE INDEX arch.idx_arch_selected ON daily_selected(pack, date);
+        CREATE TABLE arch.loaded (month TEXT PRIMARY KEY);
+    ''')
+
+def _load_month(conn: sqlite3.Connection, directory: str, month: str) -> None:
+    # inside a caller's transaction the rows are committed (or rolled back) with it
+    owned = not conn.in_transaction
+    fts = conn.execute("SELECT 1 FROM arch.sqlite_master WHERE name = 'items_fts'").fetchone() is not None
+    first_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM arch.items").fetchone()[0]
+    for table in TABLES:
+        cols = [r[1] for r in conn.execute(f"PRAGMA main.table_info({table})")]
+        sql = f"INSERT INTO arch.{table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        batch = []
+        for row in read_partition(directory, table, month):
+            batch.append(tuple(row.get(c) for c in cols))
+            if len(batch) >= 5000:
+                conn.executemany(sql, batch)
+                batch.clear()
+        conn.executemany(sql, batch)
+    if fts:
+        from .db import FTS_TEXT_SQL
+        conn.execute(f"""INSERT INTO arch.items_fts(rowid, title, snippet, full_text)
+                         SELECT rowid, title, snippet, {FTS_TEXT_SQL} FROM arch.items WHERE rowid > ?""", (first_rowid,))
+    conn.execute("INSERT INTO arch.loaded(month) VALUES (?)", (month,))
+    if owned:
+        conn.commit()
+
+def attach(conn: sqlite3.Connection, start_ts: int | None = None, end_ts: int | None = None) -> bool:
+    """Make archived rows for [start_ts, end_ts] (None = unbounded) readable as schema "arch".
+
+    Returns False, touching nothing, when the range is entirely after the archive horizon or the
+    database has no archive. Months already loaded on this connection are not read again. A
+    connection with an open write transaction cannot attach, and reads the hot tables only; once
+    attached, months loaded during a caller's transaction are left for the caller to commit.
+    """
+    arc = _archive_of(conn)
+    if arc is None:
+        return False
+    directory, idx = arc
+    if start_ts is not None and start_ts >= idx["horizon_ts"]:
+        return False
+    parts = sorted(idx["partitions"])
+    lo = month_of_ts(start_ts) if start_ts is not None else parts[0]
+    hi = month_of_ts(min(end_ts, idx["horizon_ts"] - 1)) if end_ts is not None else parts[-1]
+    months = [m for m in parts if lo <= m <= hi]
+    if not months:
+        return False
+    if "arch" not in _databases(conn):
+        if conn.in_transaction:
+            print("[archive] connection has an open transaction; reading hot tables only")
+            return False
+        _attach(conn)
+    loaded = {r[0] for r in conn.execute("SELECT month FROM arch.loaded")}
+    for month in months:
+        if month not in loaded:
+            _load_month(conn, directory, month)
+    return True
+
+def ensure_fts(conn: sqlite3.Connection) -> None:
+    """Full-text index over the attached archive rows, built on first use."""
+    if conn.execute("SELECT 1 FROM arch.sqlite_master WHERE name = 'items_fts'").fetchone() is None:
+        from .db import FTS_TEXT_SQL
+        owned = not conn.in_transaction
+        conn.execute("CREATE VIRTUAL TABLE arch.items_fts USING fts5(title, snippet, full_text, "
+                     "tokenize='unicode61 remove_diacritics 2')")
+        conn.execute(f"INSERT INTO arch.items_fts(rowid, title, snippet, full_text) "
+                     f"SELECT rowid, title, snippet, {FTS_TEXT_SQL} FROM arch.items")
+        if owned:
+            conn.commit()
+
+def source(table: str) -> str:
+    """SQL table expression for `table` unioned with its attached archive rows (hot rows win)."""
+    key = " AND ".join(f"m.{c} = a.{c}" for c in TABLES[table][1])
+    return (f"(SELECT * FROM main.{table} UNION ALL SELECT a.* FROM arch.{table} a "
+            f"WHERE NOT EXISTS (SELECT 1 FROM main.{table} m WHERE {key}))")
+
+def find_items(conn: sqlite3.Connection, id_ts: dict[str, int]) -> dict[str, dict[str, Any]]:
+    """Archived rows of the given items (id -> event_ts, which picks the month file to scan)."""
+    arc = _archive_of(conn)
+    if arc is None:
+        return {}
+    directory, idx = arc
+    months: dict[str, set[str]] = {}
+    for item_id, ts in id_ts.items():
+        if ts is not None and ts < idx["horizon_ts"]:
+            months.setdefault(month_of_ts(ts), set()).add(item_id)
+    out = {}
+    for month, ids in months.items():
+        if month in idx["partitions"]:
+            out.update((r["id"], r) for r in read_partition(directory, "items", month) if r["id"] in ids)
+    return out
+
+def _write_partition(directory: str, table: str, month: str, rows: list[dict[str, Any]]) -> int:
+    """Merge rows into the month's file; new rows replace archived ones with the same supersede key."""
+    pk, sk = PRIMARY_KEYS[table], TABLES[table][1]
+    replaced = {tuple(r[c] for c in sk) for r in rows}
+    merged = {tuple(r[c] for c in pk): r for r in read_partition(directory, table, month)
+              if tuple(r[c] for c in sk) not in replaced}
+    merged.update((tuple(r[c] for c in pk), r) for r in rows)
+
+    def write(path):
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+            for r in merged.values():
+                f.write(_encode(r) + "\n")
+
+    _write_atomic(partition_path(directory, table, month), write)
+    return len(merged)
+
+def _by_month(table: str, cur: sqlite3.Cursor) -> Iterator[tuple[str, list[dict[str, Any]]]]:
+    """Group a cursor ordered by the table's month column into (month, rows)."""
+    col = TABLES[table][0]
+    month, rows = None, []
+    for r in cur:
+        m = _month_of(table, r[col])
+        if m != month and rows:
+            yield month, rows
+            rows = []
+        month = m
+        rows.append(dict(r))
+    if rows:
+        yield month, rows
+
+def archive_older_than(db_path: str, cutoff: dt.date, vacuum: bool = True,
+                       session: Session | None = None) -> dict[str, Any]:
+    """Move items (with their pack tags) whose event time is before `cutoff`, and selections for dates
+    before it, into monthly partitions; then delete them from the database and compact it.
+
+    Items still referenced by a selection on or after `cutoff` stay hot. Partition files and the
+    index are written (atomically) before anything is deleted, so an interrupted run leaves rows in
+    both places, which reads resolve in favour of the hot copy; re-running merges them again.
+    Trend rollups, title-gram counts and report rows are small and stay in the database.
+    With `session`, the work goes through its connection instead of one opened for `db_path`.
+    """
+    from . import db as dbmod
+    cutoff_ts = int(dt.datetime.combine(cutoff, dt.time(), dt.timezone.utc).timestamp())
+    cutoff_day = cutoff.isoformat()
+    directory = archive_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    idx = dict(load_index(directory) or {"version": 1, "horizon_ts": 0, "partitions": {}})
+    size_before = os.path.getsize(db_path)
+
+    with dbmod.borrow(session, db_path) as conn:
+        conn.execute("CREATE TEMP TABLE archiving (id TEXT PRIMARY KEY)")
+        conn.execute("""INSERT INTO temp.archiving SELECT id FROM items WHERE event_ts < ?
+                        AND id NOT IN (SELECT item_id FROM daily_selected WHERE date >= ?)""", (cutoff_ts, cutoff_day))
+        where = {
+            "items": ("id IN (SELECT id FROM temp.archiving)", ()),
+            # tags of archived items, and tags left on items that are only in the archive
+            "item_packs": ("item_id IN (SELECT id FROM temp.archiving) OR (event_ts < ? AND item_id NOT IN (SELECT id FROM items))",
+                           (cutoff_ts,)),
+            "daily_selected": ("date < ?", (cutoff_day,)),
+        }
+        summary: dict[str, Any] = {"cutoff": cutoff_day, "months": []}
+        for table, (cond, params) in where.items():
+            col = TABLES[table][0]
+            cur = conn.execute(f"SELECT * FROM {table} WHERE {cond} ORDER BY {col}", params)
+            n = 0
+            for month, rows in _by_month(table, cur):
+                part = idx["partitions"].setdefault(month, {})
+                part[table] = _write_partition(directory, table, month, rows)
+                if col == "event_ts":
+                    part["min_ts"] = min(part.get("min_ts", rows[0][col]), rows[0][col])
+                    part["max_ts"] = max(part.get("max_ts", rows[-1][col]), rows[-1][col])
+                n += len(rows)
+                if month not in summary["months"]:
+                    summary["months"].append(month)
+            summary[table] = n
+        for month, part in idx["partitions"].items():
+            part["bytes"] = sum(os.path.getsize(partition_path(directory, t, month)) for t in TABLES
+                                if os.path.exists(partition_path(directory, t, month)))
+        idx["horizon_ts"] = max(idx["horizon_ts"], cutoff_ts)
+        idx["horizon"] = dt.datetime.fromtimestamp(idx["horizon_ts"], dt.timezone.utc).date().isoformat()
+        idx["updated_at"] = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+        def write_index(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(idx, f, indent=2, sort_keys=True)
+
+        _write_atomic(os.path.join(directory, INDEX_NAME), write_index)
+
+        if dbmod.has_fts(conn):
+            conn.execute("DELETE FROM items_fts WHERE rowid IN (SELECT rowid FROM items WHERE id IN (SELECT id FROM temp.archiving))")
+        conn.execute("DELETE FROM lsh_buckets WHERE item_id IN (SELECT id FROM temp.archiving)")
+        conn.execute("DELETE FROM enrichment WHERE item_id IN (SELECT id FROM temp.archiving)")
+        for table, (cond, params) in where.items():
+            conn.execute(f"DELETE FROM {table} WHERE {cond}", params)
+        conn.execute("DROP TABLE temp.archiving")
+        conn.commit()
+        if vacuum:
+            if dbmod.has_fts(conn):
+                conn.execute("INSERT INTO items_fts(items_fts) VALUES ('optimize')")
+                conn.commit()
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    summary.update(horizon=idx["horizon"], db_bytes_before=size_before, db_bytes_after=os.path.getsize(db_path),
+                   archive_bytes=sum(p.get("bytes", 0) for p in idx["partitions"].values()))
+    return summary
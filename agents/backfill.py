@@ -0,0 +1,165 @@
+from __future__ import annotations
+import os, hashlib, datetime as dt
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any
+from . import db as dbmod, validation
+from .collector import load_query_pack, pack_name, fetch_gdelt, filter_gdelt, dedupe_items, select_for_window, selection_size
+from .writer import build_report, report_dir
+from .editor import qa_and_append
+
+SLICE_HOURS = 24
+BACKFILL_WORKERS = 4
+# GDELT ArtList returns at most 250 records per request
+MAX_RECORDS = 250
+# A slice that fills max_records is split in half down to this length (GDELT updates every 15 minutes)
+MIN_SLICE_SECONDS = 15 * 60
+
+def _iso(t: dt.datetime) -> str:
+    return t.replace(microsecond=0).isoformat() + "Z"
+
+def time_slices(start: dt.date, end: dt.date, slice_hours: int = SLICE_HOURS) -> list[tuple[dt.datetime, dt.datetime]]:
+    """Cut [start 00:00:00, end 23:59:59] UTC into consecutive slices with inclusive, second-resolution bounds."""
+    t = dt.datetime.combine(start, dt.time())
+    stop = dt.datetime.combine(end + dt.timedelta(days=1), dt.time())
+    out = []
+    while t < stop:
+        nxt = min(t + dt.timedelta(hours=slice_hours), stop)
+        out.append((t, nxt - dt.timedelta(seconds=1)))
+        t = nxt
+    return out
+
+def split_slice(sl: tuple[dt.datetime, dt.datetime]) -> list[tuple[dt.datetime, dt.datetime]]:
+    """The two halves of an inclusive slice, or [] if it is shorter than 2 * MIN_SLICE_SECONDS."""
+    seconds = int((sl[1] - sl[0]).total_seconds()) + 1
+    if seconds < 2 * MIN_SLICE_SECONDS:
+        return []
+    mid = sl[0] + dt.timedelta(seconds=seconds // 2)
+    return [(sl[0], mid - dt.timedelta(seconds=1)), (mid, sl[1])]
+
+def _day_report(session: dbmod.Session, day: dt.date, k: int, out_root: str,
+                pack: str = dbmod.DEFAULT_PACK) -> dict[str, Any] | None:
+    conn = session.conn
+    date_key = day.isoformat()
+    day_end = dt.datetime.combine(day, dt.time(23, 59, 59))
+    window_items, top = select_for_window(conn, _iso(dt.datetime.combine(day, dt.time())), _iso(day_end), date_key, k,
+                                          now=day_end.replace(tzinfo=dt.timezone.utc), pack=pack)
+    if not top:
+        return None
+    out_dir = report_dir(date_key, pack, out_root)
+    report, wmeta = build_report(date_key, out_dir=out_dir, pack=pack, session=session)
+    emeta = qa_and_append(report, session=session)
+    meta = {
+        "date": date_key,
+        "items_collected": window_items,
+        "items_selected": wmeta["items_selected"],
+        "footnotes": emeta["footnotes"],
+        "tier_breakdown": emeta["tier_breakdown"],
+        "regions": wmeta["regions"],
+        "publishers": [p for p, _ in emeta["top_publishers"]],
+        "backfill": True,
+        "editor": emeta,
+    }
+    dbmod.save_report_meta(conn, date_key, report.path, None, meta, pack=pack)
+    return meta
+
+def run_backfill(
+    db_path: str,
+    start: dt.date,
+    end: dt.date,
+    slice_hours: int = SLICE_HOURS,
+    workers: int = BACKFILL_WORKERS,
+    max_records: int = MAX_RECORDS,
+    base_url: str | None = None,
+    reports: bool = True,
+    out_root: str = "data",
+    query_pack: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Backfill GDELT coverage for [start, end] in time slices, then select and report each day.
+
+    Slices are fetched `workers` at a time and written as they arrive (filter, validate, dedupe,
+    upsert), so memory is bounded by the in-flight slices; items failing the raw item schema are
+    quarantined. A slice returning `max_records` articles may have been cut short, so it is split in
+    half and its halves fetched instead; one that cannot be split further is written and recorded as
+    "truncated". Each finished slice is checkpointed in backfill_slices for the current gdelt_query;
+    a re-run skips slices already done (or truncated) and retries failed ones.
+    """
+    q = query_pack or load_query_pack(db_path=db_path)
+    pack = pack_name(q)
+    query_hash = hashlib.sha1(q["gdelt_query"].encode("utf-8")).hexdigest()[:16]
+    run_id = "backfill-" + dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    with dbmod.Session(db_path) as session:
+        conn = session.conn
+        status = dbmod.get_backfill_status(conn, query_hash)
+
+        def to_fetch(sl):
+            # a slice split on an earlier run resumes from its unfinished halves
+            state, halves = status.get((_iso(sl[0]), _iso(sl[1]))), split_slice(sl)
+            if state == "split" and halves:
+                return [x for h in halves for x in to_fetch(h)]
+            return [] if state in ("done", "truncated") else [sl]
+
+        slices = time_slices(start, end, slice_hours)
+        pending = [x for s in slices for x in to_fetch(s)]
+        summary = {"slices": len(slices), "already_done": sum(not to_fetch(s) for s in slices), "done": 0,
+                   "failed": 0, "split": 0, "truncated": 0, "inserted": 0, "updated": 0, "unchanged": 0, "quarantined": 0,
+                   "reports": []}
+        touched_days: set[dt.date] = set()
+
+        def fetch(sl):
+            articles = fetch_gdelt(q["gdelt_query"], max_records, start=sl[0], end=sl[1], base_url=base_url)
+            return filter_gdelt(articles, q, run_id), len(articles) >= max_records
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as ex:
+            queue = deque(pending)
+            inflight = {}
+
+            def submit_next():
+                if queue:
+                    sl = queue.popleft()
+                    inflight[ex.submit(fetch, sl)] = sl
+
+            for _ in range(max(1, workers) * 2):
+                submit_next()
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    sl = inflight.pop(fut)
+                    key = (_iso(sl[0]), _iso(sl[1]))
+                    try:
+                        items, saturated = fut.result()
+                    except Exception as e:
+                        print(f"[backfill] slice {key[0]} failed: {e}")
+                        dbmod.save_backfill_slice(conn, query_hash, *key, "error", error=str(e))
+                        summary["failed"] += 1
+                    else:
+                        halves = split_slice(sl) if saturated else []
+                        if halves:
+                            # checkpointed as split: a re-run goes straight to whichever halves are unfinished
+                            dbmod.save_backfill_slice(conn, query_hash, *key, "split", items=len(items))
+                            summary["split"] += 1
+                            queue.extendleft(reversed([x for h in halves for x in to_fetch(h)]))
+                        else:
+                            items, rejected = validation.screen_items(items)
+                            summary["quarantined"] += dbmod.quarantine_items(conn, rejected, pack=pack, run_id=run_id)
+                            written = dbmod.upsert_items(conn, dedupe_items(items), pack=pack)
+                            for k in ("inserted", "updated", "unchanged"):
+                                summary[k] += written[k]
+                            if saturated:
+                                print(f"[backfill] slice {key[0]} returned {max_records} articles and cannot be split")
+                            state = "truncated" if saturated else "done"
+                            dbmod.save_backfill_slice(conn, query_hash, *key, state, items=len(items))
+                            summary[state] += 1
+                            touched_days.update({sl[0].date(), sl[1].date()})
+                    while len(inflight) < max(1, workers) * 2 and queue:
+                        submit_next()
+
+        if reports:
+            have_report = {r["date"] for r in conn.execute("SELECT date FROM reports WHERE pack = ?", (pack,))}
+            day = start
+            while day <= end:
+                if day in touched_days or day.isoformat() not in have_report:
+                    if _day_report(session, day, selection_size(q), out_root, pack) is not None:
+                        summary["reports"].append(day.isoformat())
+                day += dt.timedelta(days=1)
+    return summary
@@ -1,102 +1,271 @@
 from __future__ import annotations
-import json, datetime as dt, requests, feedparser
-from dateutil import parser as dtparser
-from typing import Any
-from .utils import canonicalize_url, stable_id, norm_text, has_negative, keyword_hits, domain_from_url
+import hashlib, json, os, time, heapq, calendar, datetime as dt
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+from .utils import canonicalize_url, stable_id, norm_text, domain_from_url, iso_from_epoch, peak_rss_kb, to_epoch
+from .scoring import static_score, epoch_us, recency, score_rows, decay_key, DECAY_S, LINEAR_AGE_S
+from . import archive, querypack, validation
 from . import db as dbmod
+from . import instrument
+
+# requests, feedparser and dateutil are imported where first used: selection, backfill reports and
+# benchmarks import this module without fetching or parsing anything.
+if TYPE_CHECKING:
+    import requests
 
 GDELT_URL = "https://api.gdeltproject.org/api/v2/doc/doc"
+USER_AGENT = "DisplacementWatch/2 (+personal monitoring; RSS/GDELT)"
+
+# Fetch stage limits: worker pool size, per-source wall-clock timeout and total deadline (seconds)
+FETCH_WORKERS = 8
+SOURCE_TIMEOUT_S = 20.0
+FETCH_DEADLINE_S = 120.0
+# Shortest request timeout given to a fetch that starts close to the deadline
+MIN_REQUEST_TIMEOUT_S = 0.5
+# Items per upsert transaction in collect_and_persist
+WRITE_BATCH = 500
+# Entry ids remembered per feed for "already seen" skipping
+MAX_SEEN_IDS = 1000
+# Incremental selection keeps window items scoring within this much of the k-th pick in its
+# candidate pool; a wider margin means a larger pool but rarer fallbacks to a full rescan
+POOL_MARGIN = 0.2
 
 def _iso_now() -> str:
     return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
-def load_query_pack(path: str = "config/query_pack.json") -> dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def load_query_pack(path: str = "config/query_pack.json", db_path: str | None = None) -> dict[str, Any]:
+    """The pack's normalized settings, from its compiled artifact (see agents/querypack.py); with
+    `db_path`, the artifact is cached beside that database."""
+    return querypack.load(path, querypack.cache_dir_for(db_path) if db_path else None).pack()
+
+def pack_name(query_pack: dict[str, Any]) -> str:
+    return query_pack.get("name") or dbmod.DEFAULT_PACK
+
+def load_query_packs(paths: Iterable[str], db_path: str | None = None) -> list[dict[str, Any]]:
+    """Packs for a multi-pack run; a pack without "name" is named after its file (config/query_pack.json is "default")."""
+    packs = []
+    for path in paths:
+        q = load_query_pack(path, db_path)
+        if not q.get("name") and os.path.abspath(path) != os.path.abspath("config/query_pack.json"):
+            q["name"] = os.path.splitext(os.path.basename(path))[0]
+        packs.append(q)
+    names = [pack_name(q) for q in packs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"query pack names must be unique: {names}")
+    return packs
+
+def merge_pack_items(results: Iterable[tuple[str, list[dict[str, Any]]]]) -> list[dict[str, Any]]:
+    """One item per id across packs' results, in first-seen order.
+
+    Item fields come from the first pack that kept it; item["packs"] maps every pack that kept it
+    to that pack's {"tier", "keywords_hit"}.
+    """
+    merged: dict[str, dict[str, Any]] = {}
+    for pack, items in results:
+        for it in items:
+            m = merged.get(it["id"])
+            if m is None:
+                m = merged[it["id"]] = dict(it, packs={})
+            m["packs"].setdefault(pack, {"tier": it["tier"], "keywords_hit": it["keywords_hit"]})
+    return list(merged.values())
+
+def _download(url: str, timeout: float, params: dict[str, Any] | None = None,
+              headers: dict[str, str] | None = None, session: requests.Session | None = None) -> tuple[requests.Response, bytes]:
+    import requests
+    started = time.monotonic()
+    with (session or requests).get(url, params=params, timeout=timeout, stream=True,
+                      headers={"User-Agent": USER_AGENT, **(headers or {})}) as r:
+        r.raise_for_status()
+        chunks = []
+        for chunk in r.iter_content(chunk_size=65536):
+            if time.monotonic() - started > timeout:
+                raise TimeoutError(f"download exceeded {timeout:g}s")
+            chunks.append(chunk)
+    body = b"".join(chunks)
+    instrument.add("http_bytes", len(body))
+    return r, body
+
+def _is_timeout(e: BaseException) -> bool:
+    if isinstance(e, TimeoutError):
+        return True
+    import requests
+    return isinstance(e, requests.Timeout)
+
+def fetch_url(url: str, timeout: float = SOURCE_TIMEOUT_S, params: dict[str, Any] | None = None,
+              session: requests.Session | None = None) -> bytes:
+    """GET `url`, enforcing `timeout` as a wall-clock budget for the whole download (not per read)."""
+    return _download(url, timeout, params, session=session)[1]
+
+def fetch_feed(url: str, timeout: float = SOURCE_TIMEOUT_S, state: dict[str, Any] | None = None,
+               session: requests.Session | None = None) -> dict[str, Any]:
+    """Conditional GET using the stored ETag / Last-Modified validators (over `session` when given).
 
-def tier_for_domain(domain: str, source_tiers: dict[str, list[str]]) -> str:
-    for tier, domains in source_tiers.items():
-        for d in domains:
-            if domain.endswith(d):
-                return tier
-    return "U"
+    Returns {"status", "content", "bytes", "etag", "last_modified"}; `content` is None on 304.
+    """
+    state = state or {}
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    r, body = _download(url, timeout, headers=headers, session=session)
+    if r.status_code == 304:
+        return {"status": 304, "content": None, "bytes": len(body),
+                "etag": state.get("etag"), "last_modified": state.get("last_modified")}
+    return {"status": r.status_code, "content": body, "bytes": len(body),
+            "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
 
-def parse_feed(feed_url: str, feed_name: str, query_pack: dict[str, Any], run_id: str) -> list[dict[str, Any]]:
-    parsed = feedparser.parse(feed_url)
+def entry_key(e: Any) -> str | None:
+    return e.get("id") or e.get("link")
+
+def entry_published(e: Any) -> tuple[str | None, int | None]:
+    """(ISO string, UTC epoch) of an entry's published/updated time, preferring feedparser's parsed struct."""
+    for attr in ("published", "updated"):
+        st = e.get(f"{attr}_parsed")
+        if st:
+            ts = calendar.timegm(st)
+            return iso_from_epoch(ts), ts
+        val = e.get(attr)
+        if val:
+            try:
+                from dateutil import parser as dtparser
+                t = dtparser.parse(val).astimezone(dt.timezone.utc)
+                return t.replace(tzinfo=None).isoformat() + "Z", int(t.timestamp())
+            except Exception:
+                pass
+    return None, None
+
+def parse_entries(
+    content: bytes | str,
+    seen: set[str] | None = None,
+    stats: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    """Parse a feed document once into normalised entries ({"title", "link", "summary", "entry"}).
+
+    Entries whose id (or link) is in `seen` are skipped before any normalisation. When `stats` is
+    given it receives the entry count, the number skipped and the ids present in this document.
+    """
+    import feedparser
+    parsed = feedparser.parse(content)
     out: list[dict[str, Any]] = []
+    ids: list[str] = []
+    skipped = 0
     for e in parsed.entries:
-        title = norm_text(getattr(e, "title", ""))
+        key = entry_key(e)
+        if key:
+            ids.append(key)
+            if seen and key in seen:
+                skipped += 1
+                continue
         link = getattr(e, "link", None)
-        summary = norm_text(getattr(e, "summary", ""))
-        text_blob = f"{title} {summary}"
-        if not link or has_negative(text_blob, query_pack["negative_keywords"]):
+        if not link:
+            continue
+        out.append({"title": norm_text(getattr(e, "title", "")), "link": link,
+                    "summary": norm_text(getattr(e, "summary", "")), "entry": e})
+    if stats is not None:
+        stats.update(entries=len(parsed.entries), entries_skipped=skipped, entry_ids=ids)
+    return out
+
+def filter_entries(entries: list[dict[str, Any]], feed_name: str, query_pack: dict[str, Any], run_id: str) -> list[dict[str, Any]]:
+    """Items for the entries that pass a pack's keyword/negative filters.
+
+    Pack-independent fields (canonical URL, id, dates) are computed once per entry and cached on
+    it, so evaluating several packs against the same entries only repeats the matching.
+    """
+    cp = querypack.compiled(query_pack)
+    matcher = cp.matcher
+    out: list[dict[str, Any]] = []
+    for en in entries:
+        title, summary = en["title"], en["summary"]
+        found = matcher.scan(f"{title} {summary}")
+        if found["negatives"]:
             continue
-        hits = keyword_hits(text_blob, query_pack["keywords"])
+        hits = sorted(found["keywords"])
         if not hits:
             continue
-        pub = None
-        for attr in ("published", "updated"):
-            val = getattr(e, attr, None)
-            if val:
-                try:
-                    pub = dtparser.parse(val).astimezone(dt.timezone.utc).replace(tzinfo=None).isoformat() + "Z"
-                    break
-                except Exception:
-                    pass
-        c_url = canonicalize_url(link)
-        domain = domain_from_url(c_url)
+        if "id" not in en:
+            pub, pub_ts = entry_published(en["entry"])
+            c_url = canonicalize_url(en["link"])
+            en.update(id=stable_id(c_url, title), canonical_url=c_url, domain=domain_from_url(c_url),
+                      published_at=pub, published_ts=pub_ts)
         out.append({
-            "id": stable_id(c_url, title),
-            "canonical_url": c_url,
-            "url": link,
+            "id": en["id"],
+            "canonical_url": en["canonical_url"],
+            "url": en["link"],
             "title": title,
             "publisher": feed_name,
-            "domain": domain,
-            "published_at": pub,
+            "domain": en["domain"],
+            "published_at": en["published_at"],
             "retrieved_at": _iso_now(),
+            "event_ts": en["published_ts"] if en["published_ts"] is not None else int(time.time()),
             "snippet": summary[:1000],
             "full_text": None,
             "language": None,
-            "tier": tier_for_domain(domain, query_pack["source_tiers"]),
+            "tier": cp.tier_for_domain(en["domain"]),
             "keywords_hit": hits,
             "source_type": "rss",
             "collection_run_id": run_id,
         })
     return out
 
-def query_gdelt(query_pack: dict[str, Any], max_records: int, run_id: str) -> list[dict[str, Any]]:
+def parse_feed(
+    feed_url: str,
+    feed_name: str,
+    query_pack: dict[str, Any],
+    run_id: str,
+    content: bytes | None = None,
+    seen: set[str] | None = None,
+    stats: dict[str, Any] | None = None,
+) -> list[dict[str, Any]]:
+    """Parse one feed and keep entries that pass the keyword/negative filters (see parse_entries)."""
+    entries = parse_entries(content if content is not None else feed_url, seen, stats)
+    return filter_entries(entries, feed_name, query_pack, run_id)
+
+def fetch_gdelt(gdelt_query: str, max_records: int, timeout: float = 30, stats: dict[str, Any] | None = None,
+                start: dt.datetime | None = None, end: dt.datetime | None = None,
+                base_url: str | None = None, session: requests.Session | None = None) -> list[dict[str, Any]]:
+    """Raw ArtList articles from the GDELT Doc API; `start`/`end` (naive UTC) restrict it to a time slice."""
     params = {
-        "query": query_pack["gdelt_query"],
+        "query": gdelt_query,
         "mode": "ArtList",
         "maxrecords": max_records,
         "format": "json",
         "sort": "DateDesc",
     }
-    r = requests.get(GDELT_URL, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    if start is not None:
+        params["startdatetime"] = start.strftime("%Y%m%d%H%M%S")
+    if end is not None:
+        params["enddatetime"] = end.strftime("%Y%m%d%H%M%S")
+    raw = fetch_url(base_url or GDELT_URL, timeout=timeout, params=params, session=session)
+    if stats is not None:
+        stats["bytes"] = len(raw)
+    return json.loads(raw or b"{}").get("articles", [])
+
+def filter_gdelt(articles: list[dict[str, Any]], query_pack: dict[str, Any], run_id: str) -> list[dict[str, Any]]:
+    cp = querypack.compiled(query_pack)
+    matcher = cp.matcher
     out: list[dict[str, Any]] = []
-    for a in data.get("articles", []):
+    for a in articles:
         title = norm_text(a.get("title", ""))
-        snippet = norm_text(a.get("seendate", "")) + " " + norm_text(a.get("socialimage",""))
         url = a.get("url")
         if not url:
             continue
-        text_blob = f"{title} {a.get('sourceCollection','')} {a.get('domain','')}"
-        if has_negative(text_blob, query_pack["negative_keywords"]):
+        found = matcher.scan(f"{title} {a.get('sourceCollection','')} {a.get('domain','')}")
+        if found["negatives"]:
             continue
-        hits = keyword_hits(title, query_pack["keywords"])
-        if not hits:
-            hits = keyword_hits(text_blob, query_pack["keywords"])
+        hits = matcher.keyword_hits(title) or sorted(found["keywords"])
         if not hits:
             continue
         c_url = canonicalize_url(url)
         domain = domain_from_url(c_url)
         pub = a.get("seendate")
         published_at = None
+        event_ts = int(time.time())
         if pub:
             try:
-                published_at = dt.datetime.strptime(pub, "%Y%m%dT%H%M%SZ").isoformat() + "Z"
+                t = dt.datetime.strptime(pub, "%Y%m%dT%H%M%SZ")
+                published_at = t.isoformat() + "Z"
+                event_ts = calendar.timegm(t.timetuple())
             except Exception:
                 published_at = None
         out.append({
@@ -108,69 +277,466 @@ def query_gdelt(query_pack: dict[str, Any], max_records: int, run_id: str) -> li
             "domain": domain,
             "published_at": published_at,
             "retrieved_at": _iso_now(),
+            "event_ts": event_ts,
             "snippet": norm_text(a.get("sourceCountry",""))[:1000],
             "full_text": None,
             "language": a.get("language"),
-            "tier": tier_for_domain(domain, query_pack["source_tiers"]),
+            "tier": cp.tier_for_domain(domain),
             "keywords_hit": hits,
             "source_type": "gdelt",
             "collection_run_id": run_id,
         })
     return out
 
-def score_item(item: dict[str, Any]) -> float:
-    tier_w = {"A": 3.0, "B": 2.0, "C": 1.0, "U": 0.7}.get(item.get("tier","U"), 0.7)
-    kw = min(len(item.get("keywords_hit",[])), 4) * 0.5
-    recency = 1.0
-    if item.get("published_at"):
-        try:
-            t = dtparser.parse(item["published_at"])
-            age_h = max((dt.datetime.now(dt.timezone.utc) - t.astimezone(dt.timezone.utc)).total_seconds()/3600, 0)
-            recency = max(0.1, 1.5 - min(age_h/48, 1.4))
-        except Exception:
-            pass
-    return round(tier_w + kw + recency, 3)
-
-def collect_and_persist(db_path: str, since_hours: int = 24, max_gdelt: int = 100) -> dict[str, Any]:
-    q = load_query_pack()
-    run_id = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    items: list[dict[str, Any]] = []
-    for feed in q["rss_feeds"]:
-        try:
-            items.extend(parse_feed(feed["url"], feed["name"], q, run_id))
-        except Exception as e:
-            print(f"[collector] feed failed: {feed['name']}: {e}")
-    try:
-        items.extend(query_gdelt(q, max_gdelt, run_id))
-    except Exception as e:
-        print(f"[collector] gdelt failed: {e}")
+def query_gdelt(query_pack: dict[str, Any], max_records: int, run_id: str, timeout: float = 30,
+                stats: dict[str, Any] | None = None, start: dt.datetime | None = None, end: dt.datetime | None = None,
+                base_url: str | None = None) -> list[dict[str, Any]]:
+    """Query the GDELT Doc API; `start`/`end` (naive UTC) restrict it to a time slice for backfills."""
+    articles = fetch_gdelt(query_pack["gdelt_query"], max_records, timeout, stats, start, end, base_url)
+    return filter_gdelt(articles, query_pack, run_id)
+
+def score_item(item: dict[str, Any], now: dt.datetime | None = None) -> float:
+    """Tier weight + keyword score + recency relative to `now` (aware UTC; defaults to the current time).
 
-    # Dedupe by id/canonical_url, keep highest scored or richer metadata
-    dedup = {}
+    Uses the item's precomputed `static_score` / `published_ts` when present.
+    """
+    static = item.get("static_score")
+    if static is None:
+        static = static_score(item.get("tier","U"), item.get("keywords_hit",[]))
+    pub_ts = item["published_ts"] if "published_ts" in item else to_epoch(item.get("published_at"))
+    return round(static + recency(pub_ts, epoch_us(now)), 3)
+
+def dedupe_items(items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Dedupe by id/canonical_url, keep highest scored or richer metadata."""
+    dedup: dict[str, tuple[dict[str, Any], float]] = {}
     for it in items:
         key = it["id"]
-        if key not in dedup:
-            dedup[key] = it
-        else:
-            if score_item(it) > score_item(dedup[key]):
-                dedup[key] = it
-    items = list(dedup.values())
-
-    conn = dbmod.connect(db_path)
-    n = dbmod.upsert_items(conn, items)
-
-    end = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-    start = (dt.datetime.utcnow() - dt.timedelta(hours=since_hours)).replace(microsecond=0).isoformat() + "Z"
-    rows = dbmod.get_items_for_window(conn, start, end)
-    selected_scored = []
-    for r in rows:
-        item = dict(r)
-        item["keywords_hit"] = json.loads(item.get("keywords_hit_json") or "[]")
-        selected_scored.append((item["id"], score_item(item)))
-    selected_scored.sort(key=lambda x: x[1], reverse=True)
-    date_key = dt.datetime.utcnow().date().isoformat()
-    top = selected_scored[: max(5, q["report"].get("max_top_developments", 8))]
-    dbmod.save_daily_selected(conn, date_key, top)
-    conn.close()
-
-    return {"run_id": run_id, "inserted_or_updated": n, "window_items": len(rows), "selected": len(top), "date": date_key}
+        s = score_item(it)
+        if key not in dedup or s > dedup[key][1]:
+            dedup[key] = (it, s)
+    return [it for it, _ in dedup.values()]
+
+def selection_size(query_pack: dict[str, Any]) -> int:
+    return max(5, query_pack["report"].get("max_top_developments", 8))
+
+# Columns the selection step reads; everything else (snippet, full_text, ...) stays on disk
+SCORE_COLUMNS = ("id", "static_score", "published_ts", "cluster_id")
+
+def select_for_window(conn, start_iso: str, end_iso: str, date_key: str, k: int,
+                      now: dt.datetime | None = None, pack: str = dbmod.DEFAULT_PACK,
+                      changed: Iterable[str] | None = None) -> tuple[int, list[tuple[str, float, int]]]:
+    """Score a pack's items in the window, save the top k cluster representatives for `date_key`.
+
+    With `changed` (ids written since the last selection for this pack and date), only those,
+    items tagged since, and the candidate pool kept by the last run are scored, falling back to a
+    full rescan when there is no usable state or the pool cannot be shown to contain the top k.
+    Either way the result is the full rescan's. Returns (window item count, [(id, score, cluster_size)]).
+    """
+    now_us = epoch_us(now)
+    if changed is not None:
+        done = _select_incremental(conn, start_iso, end_iso, date_key, k, now_us, pack, set(changed))
+        if done is not None:
+            return done
+    window = 0
+    scanned: list[tuple[str, float | None, int | None]] = []
+    tag_rowid = dbmod.max_tag_rowid(conn)
+
+    def scored():
+        nonlocal window
+        for rows in dbmod.iter_window_chunks(conn, start_iso, end_iso, SCORE_COLUMNS, pack=pack):
+            window += len(rows)
+            if changed is not None:
+                scanned.extend((r["id"], r["static_score"], r["published_ts"]) for r in rows)
+            for r, s in zip(rows, score_rows(rows, now_us)):
+                yield r["id"], s, r["cluster_id"] or r["id"]
+
+    top = pick_cluster_representatives(scored(), k)
+    dbmod.replace_daily_selected(conn, date_key, top, pack=pack)
+    if changed is None:
+        dbmod.clear_selection_state(conn, pack, date_key)
+    else:
+        floors = _pool_floors(top, k, now_us, (None, None))
+        pool = {i for i, static, pub in scanned if not _below_floors(static, pub, floors)}
+        # items dated after the window enter it on a later run
+        pool.update(dbmod.get_pack_ids_after(conn, pack, to_epoch(end_iso)))
+        old = dbmod.get_selection_state(conn, pack, date_key)
+        old_pool = old[1] if old else set()
+        dbmod.save_selection_state(conn, pack, date_key, _state(k, start_iso, end_iso, floors, tag_rowid),
+                                   pool - old_pool, old_pool - pool)
+    return window, top
+
+def _state(k: int, start_iso: str, end_iso: str, floors: tuple[float | None, float | None], tag_rowid: int) -> dict[str, Any]:
+    return {"k": k, "span_s": to_epoch(end_iso) - to_epoch(start_iso), "floor_dated": floors[0],
+            "floor_undated": floors[1], "tag_rowid": tag_rowid}
+
+def _pool_floors(top: list[tuple[str, float, int]], k: int, now_us: int,
+                 old: tuple[float | None, float | None]) -> tuple[float | None, float | None]:
+    """Pool floors after a selection: decay_key floors for dated and undated items a POOL_MARGIN
+    below the k-th pick's score now, never lower than the previous floors (None: keep everything)."""
+    if len(top) < k:
+        return old
+    kth = top[-1][1] - POOL_MARGIN
+    new = (kth + now_us / 1e6 / DECAY_S, kth)
+    return tuple(n if o is None else max(o, n) for n, o in zip(new, old))
+
+def _below_floors(static: float | None, published_ts: int | None, floors: tuple[float | None, float | None]) -> bool:
+    floor = floors[1] if published_ts is None else floors[0]
+    return floor is not None and decay_key(static, published_ts) < floor
+
+def _select_incremental(conn, start_iso: str, end_iso: str, date_key: str, k: int, now_us: int, pack: str,
+                        changed: set[str]) -> tuple[int, list[tuple[str, float, int]]] | None:
+    """select_for_window over the candidate pool plus changed and newly tagged items, or None when
+    a full rescan is needed.
+
+    Every window item left out of the pool had a decay_key below the pool floors, so its score now
+    is below the bound computed from them (scores never rise with time). If the k-th pick scores
+    above that bound, no left-out item can be picked, win a tie or represent a picked cluster, and
+    as the pool is scored in window-scan order the picks equal the full rescan's.
+    """
+    start_ts, end_ts = to_epoch(start_iso), to_epoch(end_iso)
+    now_s = now_us / 1e6
+    # Past LINEAR_AGE_S scores stop decaying; archived rows are only read by the full scan
+    if now_s - start_ts > LINEAR_AGE_S or archive.horizon(conn) > start_ts:
+        return None
+    saved = dbmod.get_selection_state(conn, pack, date_key)
+    if saved is None:
+        return None
+    state, pool = saved
+    if state["k"] != k or state["span_s"] != end_ts - start_ts:
+        return None
+    floors = (state["floor_dated"], state["floor_undated"])
+    tag_rowid = dbmod.max_tag_rowid(conn)
+    ids = pool | changed | set(dbmod.get_tagged_since(conn, pack, state["tag_rowid"]))
+    # the pool keeps items dated after the window, which enter it on a later run
+    kept = [r for r in dbmod.get_pack_rows(conn, pack, ids, SCORE_COLUMNS + ("event_ts",))
+            if r["event_ts"] is not None and r["event_ts"] >= start_ts
+            and not _below_floors(r["static_score"], r["published_ts"], floors)]
+    rows = [r for r in kept if r["event_ts"] <= end_ts]
+    top = pick_cluster_representatives(
+        ((r["id"], s, r["cluster_id"] or r["id"]) for r, s in zip(rows, score_rows(rows, now_us))), k)
+    bounds = [f for f in (None if floors[0] is None else floors[0] - now_s / DECAY_S, floors[1]) if f is not None]
+    if bounds and (len(top) < k or round(max(bounds) + 1e-9, 3) >= top[-1][1]):
+        return None
+
+    clusters = {r["id"]: r["cluster_id"] or r["id"] for r in rows}
+    sizes = dbmod.count_window_clusters(conn, pack, [clusters[i] for i, _, _ in top], start_ts, end_ts)
+    top = [(i, s, sizes[clusters[i]]) for i, s, _ in top]
+    dbmod.replace_daily_selected(conn, date_key, top, pack=pack)
+    floors = _pool_floors(top, k, now_us, floors)
+    new_pool = {r["id"] for r in kept if not _below_floors(r["static_score"], r["published_ts"], floors)}
+    dbmod.save_selection_state(conn, pack, date_key, _state(k, start_iso, end_iso, floors, tag_rowid),
+                               new_pool - pool, pool - new_pool)
+    return dbmod.count_pack_window(conn, pack, start_ts, end_ts), top
+
+def pick_cluster_representatives(scored: Iterable[tuple[str, float, str]], k: int) -> list[tuple[str, float, int]]:
+    """Top k of (id, score, cluster_id), one per near-duplicate cluster, best first.
+
+    Same result as a stable sort by score followed by first-per-cluster: ties go to the earlier
+    entry in `scored`. Keeps one entry per cluster and a k-sized heap instead of sorting everything.
+    Returns (id, score, cluster_size) where cluster_size counts the cluster's items in `scored`.
+    """
+    sizes: dict[str, int] = {}
+    best: dict[str, tuple[float, int, str]] = {}
+    for i, (item_id, score, c) in enumerate(scored):
+        sizes[c] = sizes.get(c, 0) + 1
+        cur = best.get(c)
+        if cur is None or score > cur[0]:
+            best[c] = (score, -i, item_id)
+    top = heapq.nlargest(k, best.items(), key=lambda kv: kv[1][:2])
+    return [(b[2], b[0], sizes[c]) for c, b in top]
+
+def evaluate_packs(packs: list[dict[str, Any]], filter_fn: Callable[[dict[str, Any]], list[dict[str, Any]]],
+                   multi: bool) -> list[dict[str, Any]]:
+    """Items kept by `filter_fn` for each pack; in a multi-pack run they are merged and tagged per pack."""
+    if not multi:
+        return filter_fn(packs[0])
+    return merge_pack_items((pack_name(p), filter_fn(p)) for p in packs)
+
+def seen_key(packs: list[dict[str, Any]]) -> str:
+    """Key of the packs a feed is filtered for (from their compiled digests), stored with its seen ids."""
+    digests = sorted(querypack.compiled(p).digest for p in packs)
+    return hashlib.sha256(" ".join(digests).encode("ascii")).hexdigest()[:16]
+
+def collect_feed(
+    feed: dict[str, Any],
+    packs: list[dict[str, Any]],
+    run_id: str,
+    state: dict[str, Any] | None = None,
+    timeout: float = SOURCE_TIMEOUT_S,
+    stats: dict[str, Any] | None = None,
+    multi: bool = False,
+    session: requests.Session | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+    """Fetch one feed conditionally, parse it once and filter it for every pack listing it.
+
+    Returns (items, new feed state), the state being None when the feed was not modified. `stats`
+    receives bytes, entry counts and "not_modified". Seen ids include entries the packs filtered
+    out, so a state recorded for other packs (one was edited, added or removed) is not used: the
+    feed is fetched in full and every entry evaluated again.
+    """
+    stats = stats if stats is not None else {}
+    key = seen_key(packs)
+    state = state if state and state.get("seen_key") == key else {}
+    res = fetch_feed(feed["url"], timeout=timeout, state=state, session=session)
+    stats["bytes"] = res["bytes"]
+    if res["content"] is None:
+        stats["not_modified"] = True
+        return [], None
+    entries = parse_entries(res["content"], seen=set(state.get("seen_ids") or []), stats=stats)
+    out = evaluate_packs(packs, lambda p: filter_entries(entries, feed["name"], p, run_id), multi)
+    return out, {"etag": res["etag"], "last_modified": res["last_modified"],
+                 "seen_ids": stats.pop("entry_ids", [])[:MAX_SEEN_IDS], "seen_key": key}
+
+def select_packs(conn, packs: list[dict[str, Any]], start_iso: str, end_iso: str, date_key: str,
+                 now: dt.datetime | None = None, changed: Iterable[str] | None = None) -> dict[str, dict[str, Any]]:
+    """Run each pack's selection for `date_key` over [start_iso, end_iso]; per-pack window/selection counts.
+
+    `changed` makes each selection incremental (see select_for_window).
+    """
+    selections = {}
+    for p in packs:
+        window_items, top = select_for_window(conn, start_iso, end_iso, date_key, selection_size(p), now=now,
+                                              pack=pack_name(p), changed=changed)
+        selections[pack_name(p)] = {"window_items": window_items, "selected": len(top),
+                                    "duplicates_collapsed": sum(size - 1 for _, _, size in top)}
+    return selections
+
+def _run_source(fn: Callable[[dict[str, Any]], tuple[list[dict[str, Any]], dict[str, Any] | None]],
+                stats: dict[str, Any]) -> tuple[list[dict[str, Any]], dict[str, Any] | None, float]:
+    started, cpu = time.monotonic(), time.thread_time()
+    try:
+        out, state = fn(stats)
+        return out, state, time.monotonic() - started
+    finally:
+        stats["cpu_ms"] = round((time.thread_time() - cpu) * 1000, 1)
+
+def iter_sources(
+    q: dict[str, Any],
+    run_id: str,
+    max_gdelt: int = 100,
+    max_workers: int = FETCH_WORKERS,
+    source_timeout: float = SOURCE_TIMEOUT_S,
+    deadline: float = FETCH_DEADLINE_S,
+    feed_states: dict[str, dict[str, Any]] | None = None,
+    packs: list[dict[str, Any]] | None = None,
+) -> Iterator[tuple[int, dict[str, Any], list[dict[str, Any]], dict[str, Any] | None]]:
+    """Fetch every RSS feed and the GDELT query concurrently on a bounded pool.
+
+    Each source is fetched and filtered (`parse_feed` / `query_gdelt`) on its own worker. Yields
+    (source index, stats, items, new feed state) as sources finish, so callers can write while
+    others download; index follows source order (feeds as listed, then GDELT). `deadline` runs
+    from the call and is checked between results: a source that finished while the caller was
+    writing is still yielded, and one still running is abandoned and reported with status
+    "deadline_exceeded". Each request's timeout is capped at the time left (at least
+    MIN_REQUEST_TIMEOUT_S), so abandoned workers do not outlive the deadline by much.
+
+    Feeds are fetched conditionally against `feed_states` (url -> validators + seen entry ids),
+    which is only read. The new state of a feed that returned a document comes with its items
+    (None otherwise); callers save it (for stats["url"]) only once those items are written, so an
+    abandoned fetch that finishes late never marks entries seen that were not stored.
+
+    With several `packs` (q is then ignored), each distinct feed URL and GDELT query is fetched and
+    parsed once and every pack listing it filters the shared entries; items carry "packs" tags
+    (see merge_pack_items).
+    """
+    feed_states = feed_states if feed_states is not None else {}
+    multi = packs is not None and len(packs) > 1
+    packs = packs or [q]
+    started = time.monotonic()
+
+    def time_left() -> float | None:
+        return None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+
+    def request_timeout() -> float:
+        left = time_left()
+        return source_timeout if left is None else max(MIN_REQUEST_TIMEOUT_S, min(source_timeout, left))
+
+    def feed_task(feed, group):
+        state = feed_states.get(feed["url"])
+
+        def run(stats):
+            return collect_feed(feed, group, run_id, state, request_timeout(), stats, multi)
+        return run
+
+    def gdelt_task(query, group):
+        def run(stats):
+            articles = fetch_gdelt(query, max_gdelt, timeout=request_timeout(), stats=stats)
+            return evaluate_packs(group, lambda p: filter_gdelt(articles, p, run_id), multi), None
+        return run
+
+    feeds: dict[str, tuple[dict[str, Any], list[dict[str, Any]]]] = {}
+    queries: dict[str, list[dict[str, Any]]] = {}
+    for p in packs:
+        for feed in p["rss_feeds"]:
+            feeds.setdefault(feed["url"], (feed, []))[1].append(p)
+        queries.setdefault(p["gdelt_query"], []).append(p)
+    sources = [{"name": feed["name"], "type": "rss", "url": url, "fn": feed_task(feed, group)}
+               for url, (feed, group) in feeds.items()]
+    for query, group in queries.items():
+        name = "GDELT" if len(queries) == 1 else f"GDELT ({', '.join(pack_name(p) for p in group)})"
+        sources.append({"name": name, "type": "gdelt", "url": GDELT_URL, "fn": gdelt_task(query, group)})
+
+    def source_stats(i):
+        raw = raw_stats[i]
+        return {"name": sources[i]["name"], "type": sources[i]["type"], "url": sources[i]["url"], "status": "ok", "latency_ms": None, "items": 0,
+                "error": None, "bytes": raw.get("bytes", 0), "entries": raw.get("entries", 0),
+                "entries_skipped": raw.get("entries_skipped", 0), "cpu_ms": raw.get("cpu_ms"), "quarantined": 0}
+
+    ex = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources))), thread_name_prefix="collector")
+    raw_stats: list[dict[str, Any]] = [{} for _ in sources]
+    futures = {ex.submit(_run_source, s["fn"], raw): i for i, (s, raw) in enumerate(zip(sources, raw_stats))}
+    not_done = set(futures)
+    try:
+        while not_done:
+            # past the deadline this only collects sources that have already finished
+            done, not_done = wait(not_done, timeout=time_left(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in sorted(done, key=futures.get):
+                i = futures[fut]
+                st = source_stats(i)
+                s = sources[i]
+                if fut.exception() is not None:
+                    e = fut.exception()
+                    st.update(status="timeout" if _is_timeout(e) else "error", error=str(e))
+                    print(f"[collector] {'gdelt' if s['type'] == 'gdelt' else 'feed'} failed: {s['name']}: {e}")
+                    yield i, st, [], None
+                    continue
+                out, state, elapsed = fut.result()
+                st.update(status="not_modified" if raw_stats[i].get("not_modified") else "ok",
+                          latency_ms=round(elapsed * 1000, 1), items=len(out))
+                yield i, st, out, state
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    pending = {futures[f] for f in not_done}
+    for i in sorted(pending):
+        st = source_stats(i)
+        st.update(status="deadline_exceeded", latency_ms=round((time.monotonic() - started) * 1000, 1),
+                  error=f"not finished within {deadline:g}s deadline")
+        print(f"[collector] {sources[i]['type']} source timed out: {sources[i]['name']}")
+        yield i, st, [], None
+
+def fetch_sources(
+    q: dict[str, Any],
+    run_id: str,
+    max_gdelt: int = 100,
+    max_workers: int = FETCH_WORKERS,
+    source_timeout: float = SOURCE_TIMEOUT_S,
+    deadline: float = FETCH_DEADLINE_S,
+    feed_states: dict[str, dict[str, Any]] | None = None,
+    packs: list[dict[str, Any]] | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """All of `iter_sources` at once: (items in source order, per-source stats in source order)."""
+    results = sorted(iter_sources(q, run_id, max_gdelt, max_workers, source_timeout, deadline, feed_states, packs),
+                     key=lambda r: r[0])
+    return [it for _, _, out, _ in results for it in out], [st for _, st, _, _ in results]
+
+def collect_and_persist(
+    db_path: str,
+    since_hours: int = 24,
+    max_gdelt: int = 100,
+    max_workers: int = FETCH_WORKERS,
+    source_timeout: float = SOURCE_TIMEOUT_S,
+    deadline: float = FETCH_DEADLINE_S,
+    batch_size: int = WRITE_BATCH,
+    run_id: str | None = None,
+    packs: list[dict[str, Any]] | None = None,
+    session: dbmod.Session | None = None,
+) -> dict[str, Any]:
+    """Fetch, filter, validate, dedupe and write in batches of `batch_size`, then select the day's top items.
+
+    Items are written as sources finish rather than after all of them, so memory is bounded by the
+    batch and the largest single source, not by the run. Dedupe keeps the best-scoring copy of an id
+    (earliest source on ties, as in the serial path); a better copy arriving later rewrites it.
+    Each source's items are checked against schemas/raw_item.schema.json first; invalid ones are
+    recorded in the quarantine table rather than written or allowed to fail the run.
+
+    `packs` (default: config/query_pack.json alone) are collected in one pass with shared fetches;
+    each pack gets its own selection, and the top-level window/selection figures are the first pack's.
+    Selection is incremental: a run scores the items it wrote plus the pool kept for the day, so
+    frequent intra-day runs cost in proportion to what they collect.
+    With `session`, everything goes through the run's connection instead of one opened for `db_path`.
+    """
+    packs = packs or [load_query_pack(db_path=db_path)]
+    q = packs[0]
+    run_id = run_id or dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    with dbmod.borrow(session, db_path) as conn:
+        feed_states = dbmod.get_feed_states(conn, list(dict.fromkeys(f["url"] for p in packs for f in p["rss_feeds"])))
+        fetch_started = time.monotonic()
+
+        written = {"inserted": 0, "updated": 0, "unchanged": 0}
+        quarantined = 0
+        # every id written or tagged this run, for the incremental selection
+        touched: set[str] = set()
+        best: dict[str, tuple[float, int]] = {}
+        batch: list[dict[str, Any]] = []
+        extra_tags: list[tuple] = []
+        batches = 0
+        source_stats: list[tuple[int, dict[str, Any]]] = []
+        stats_of: dict[int, dict[str, Any]] = {}
+        # new state of each feed whose items were taken, saved once they are written
+        new_states: dict[str, dict[str, Any]] = {}
+
+        def flush():
+            nonlocal batch, batches
+            if batch:
+                outcomes: dict[str, str] = {}
+                for key, n in dbmod.upsert_items(conn, batch, pack=pack_name(q), outcomes=outcomes).items():
+                    written[key] += n
+                # rows written are credited to the source whose copy was written
+                for it in batch:
+                    kind = outcomes.pop(it["id"], None)
+                    if kind is not None:
+                        st = stats_of[-best[it["id"]][1]]
+                        st[kind] = st.get(kind, 0) + 1
+                batches += 1
+                batch = []
+            if extra_tags:
+                dbmod.tag_items(conn, extra_tags, replace=False)
+                conn.commit()
+                extra_tags.clear()
+
+        for idx, st, out, state in iter_sources(q, run_id, max_gdelt, max_workers, source_timeout, deadline, feed_states, packs):
+            source_stats.append((idx, st))
+            stats_of[idx] = st
+            if state is not None:
+                new_states[st["url"]] = state
+            out, rejected = validation.screen_items(out)
+            if rejected:
+                st["quarantined"] = dbmod.quarantine_items(conn, rejected, pack=pack_name(q), run_id=run_id)
+                quarantined += st["quarantined"]
+            for it in out:
+                rank = (score_item(it), -idx)
+                if it["id"] in best and best[it["id"]] >= rank:
+                    # a worse copy may still be the only one some pack kept
+                    extra_tags.extend(dbmod.pack_tag_rows(it) if "packs" in it else [])
+                    touched.add(it["id"])
+                    continue
+                best[it["id"]] = rank
+                batch.append(it)
+                touched.add(it["id"])
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+        fetch_s = round(time.monotonic() - fetch_started, 3)
+        source_stats = [st for _, st in sorted(source_stats, key=lambda r: r[0])]
+
+        for url, st in new_states.items():
+            dbmod.save_feed_state(conn, url, st.get("etag"), st.get("last_modified"), st.get("seen_ids") or [],
+                                  st.get("seen_key"))
+
+        end = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        start = (dt.datetime.utcnow() - dt.timedelta(hours=since_hours)).replace(microsecond=0).isoformat() + "Z"
+        date_key = dt.datetime.utcnow().date().isoformat()
+        selections = select_packs(conn, packs, start, end, date_key, changed=touched)
+
+    return {
+        "run_id": run_id, "inserted_or_updated": written["inserted"] + written["updated"], **written,
+        "quarantined": quarantined,
+        **selections[pack_name(q)], "date": date_key, "packs": selections,
+        "fetch_seconds": fetch_s, "sources": source_stats,
+        "bytes_fetched": sum(st["bytes"] for st in source_stats),
+        "entries_skipped": sum(st["entries_skipped"] for st in source_stats),
+        "feeds_not_modified": sum(1 for st in source_stats if st["status"] == "not_modified"),
+        "batch_size": batch_size, "write_batches": batches, "peak_rss_kb": peak_rss_kb(),
+    }
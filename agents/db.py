@@ -1,8 +1,27 @@
 from __future__ import annotations
-import sqlite3, json, os
-from typing import Iterable, Any
+import sqlite3, json, os, time, hashlib, zlib, datetime as dt
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Any
+from .utils import to_epoch
+from . import archive, instrument
+from .matcher import get_matcher
+from . import neardup
+from .terms import title_grams
+from .scoring import static_score
 
 DB_PATH = "displacement_watch.db"
+# Query pack name used when a pack has no "name" (config/query_pack.json) and for pre-pack data
+DEFAULT_PACK = "default"
+# Stored in PRAGMA user_version once migrate() has run. Bump it whenever SCHEMA_SQL, ADDED_COLUMNS,
+# INDEX_SQL, FTS_SQL or a migration/backfill step changes, or existing databases will not pick it up.
+SCHEMA_VERSION = 7
+# Applied to every connection: fsync at WAL checkpoints rather than every commit (safe in WAL mode),
+# memory-mapped reads, a 64 MB page cache, temp tables and sorts in memory, and a wait of up to 5 s
+# for another process's write lock instead of failing with "database is locked"
+PRAGMAS = (("synchronous", "NORMAL"), ("mmap_size", 256 * 1024 * 1024), ("cache_size", -64 * 1024),
+           ("temp_store", "MEMORY"), ("busy_timeout", 5000))
+# Prepared statements kept per connection; a run-scoped Session reuses them across stages
+CACHED_STATEMENTS = 256
 
 SCHEMA_SQL = '''
 PRAGMA journal_mode=WAL;
@@ -22,26 +41,110 @@ CREATE TABLE IF NOT EXISTS items (
   tier TEXT,
   source_type TEXT,
   keywords_hit_json TEXT,
-  collection_run_id TEXT
+  collection_run_id TEXT,
+  content_hash TEXT,
+  event_ts INTEGER,
+  cluster_id TEXT,
+  static_score REAL,
+  published_ts INTEGER,
+  full_text_z BLOB
 );
 
 CREATE INDEX IF NOT EXISTS idx_items_published ON items(published_at);
 CREATE INDEX IF NOT EXISTS idx_items_domain ON items(domain);
 
-CREATE TABLE IF NOT EXISTS daily_selected (
-  date TEXT NOT NULL,
+CREATE TABLE IF NOT EXISTS feed_state (
+  url TEXT PRIMARY KEY,
+  etag TEXT,
+  last_modified TEXT,
+  seen_ids_json TEXT,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-day trend counts, maintained by upsert_items. dim is total|keyword|publisher|tier|theme.
+CREATE TABLE IF NOT EXISTS trend_rollup (
+  day TEXT NOT NULL,
+  dim TEXT NOT NULL,
+  key TEXT NOT NULL,
+  n INTEGER NOT NULL,
+  PRIMARY KEY (day, dim, key)
+) WITHOUT ROWID;
+
+-- Per-day counts of items whose title contains a term (see terms.title_grams), maintained by upsert_items
+CREATE TABLE IF NOT EXISTS title_grams (
+  day TEXT NOT NULL,
+  gram TEXT NOT NULL,
+  n INTEGER NOT NULL,
+  PRIMARY KEY (day, gram)
+) WITHOUT ROWID;
+
+-- MinHash LSH buckets for near-duplicate clustering; cluster_id is denormalised from items
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+  band INTEGER NOT NULL,
+  bucket TEXT NOT NULL,
   item_id TEXT NOT NULL,
-  score REAL NOT NULL,
-  PRIMARY KEY (date, item_id),
+  cluster_id TEXT NOT NULL,
+  PRIMARY KEY (band, bucket, item_id)
+) WITHOUT ROWID;
+
+-- Backfill checkpoints: one row per (query, time slice); status pending|done|error
+CREATE TABLE IF NOT EXISTS backfill_slices (
+  query_hash TEXT NOT NULL,
+  slice_start TEXT NOT NULL,
+  slice_end TEXT NOT NULL,
+  status TEXT NOT NULL,
+  items INTEGER,
+  error TEXT,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (query_hash, slice_start, slice_end)
+);
+
+-- Which query packs kept each item, with the pack-specific tier/keywords/score; selection reads this
+CREATE TABLE IF NOT EXISTS item_packs (
+  pack TEXT NOT NULL,
+  item_id TEXT NOT NULL,
+  event_ts INTEGER,
+  tier TEXT,
+  keywords_hit_json TEXT,
+  static_score REAL,
+  PRIMARY KEY (pack, item_id),
   FOREIGN KEY (item_id) REFERENCES items(id)
 );
 
-CREATE TABLE IF NOT EXISTS reports (
-  date TEXT PRIMARY KEY,
-  report_path TEXT,
-  docx_path TEXT,
+CREATE INDEX IF NOT EXISTS idx_item_packs_window ON item_packs(pack, event_ts);
+
+-- Per-run timing/resource records written by run-daily; kind is run|stage|source
+CREATE TABLE IF NOT EXISTS runs (
+  run_id TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  name TEXT NOT NULL,
+  started_at TEXT,
+  wall_s REAL,
+  cpu_s REAL,
+  peak_rss_kb INTEGER,
+  rows_read INTEGER,
+  rows_written INTEGER,
+  http_bytes INTEGER,
+  status TEXT,
+  error TEXT,
   meta_json TEXT,
-  created_at TEXT DEFAULT CURRENT_TIMESTAMP
+  PRIMARY KEY (run_id, kind, name)
+);
+
+-- Article-body fetches by the enricher; validators drive conditional re-fetches
+-- status: ok|not_modified|robots_disallowed|unsupported|empty|error
+CREATE TABLE IF NOT EXISTS enrichment (
+  item_id TEXT PRIMARY KEY,
+  status TEXT NOT NULL,
+  http_status INTEGER,
+  etag TEXT,
+  last_modified TEXT,
+  text_chars INTEGER,
+  stored_bytes INTEGER,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  error TEXT,
+  fetched_at TEXT,
+  FOREIGN KEY (item_id) REFERENCES items(id)
 );
 
 CREATE TABLE IF NOT EXISTS query_proposals (
@@ -49,101 +152,1024 @@ CREATE TABLE IF NOT EXISTS query_proposals (
   proposal_json TEXT NOT NULL,
   rationale TEXT NOT NULL
 );
+
+-- Incremental selection (collector.select_for_window): the score floors below which window items
+-- were left out of the candidate pool, and the item_packs rowid high-water mark at the last run
+CREATE TABLE IF NOT EXISTS selection_state (
+  pack TEXT NOT NULL,
+  date TEXT NOT NULL,
+  k INTEGER NOT NULL,
+  span_s INTEGER NOT NULL,
+  floor_dated REAL,
+  floor_undated REAL,
+  tag_rowid INTEGER NOT NULL,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (pack, date)
+);
+
+CREATE TABLE IF NOT EXISTS selection_pool (
+  pack TEXT NOT NULL,
+  date TEXT NOT NULL,
+  item_id TEXT NOT NULL,
+  PRIMARY KEY (pack, date, item_id)
+) WITHOUT ROWID;
+
+-- Collected items that failed schemas/raw_item.schema.json (agents/validation.py), kept out of items.
+-- One row per (pack, item_key); a repeat offender updates it. item_key is the item's id, or a hash
+-- of the item when it has no usable id.
+CREATE TABLE IF NOT EXISTS quarantine (
+  pack TEXT NOT NULL,
+  item_key TEXT NOT NULL,
+  source_type TEXT,
+  run_id TEXT,
+  errors_json TEXT NOT NULL,
+  item_json TEXT NOT NULL,
+  hits INTEGER NOT NULL DEFAULT 1,
+  first_seen TEXT DEFAULT CURRENT_TIMESTAMP,
+  last_seen TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (pack, item_key)
+);
 '''
 
-def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+# Tables keyed by query pack. Databases from before multi-pack collection have them keyed without
+# `pack`; init_db rebuilds those with their rows assigned to DEFAULT_PACK.
+PACK_KEYED_SQL = {
+    "daily_selected": '''
+CREATE TABLE IF NOT EXISTS daily_selected (
+  pack TEXT NOT NULL DEFAULT 'default',
+  date TEXT NOT NULL,
+  item_id TEXT NOT NULL,
+  score REAL NOT NULL,
+  cluster_size INTEGER NOT NULL DEFAULT 1,
+  PRIMARY KEY (pack, date, item_id),
+  FOREIGN KEY (item_id) REFERENCES items(id)
+);''',
+    "reports": '''
+CREATE TABLE IF NOT EXISTS reports (
+  pack TEXT NOT NULL DEFAULT 'default',
+  date TEXT NOT NULL,
+  report_path TEXT,
+  docx_path TEXT,
+  meta_json TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (pack, date)
+);''',
+}
+
+# Item columns that item_packs holds per pack
+PACK_FIELDS = ("tier", "keywords_hit_json", "static_score")
+
+# Columns added after the first schema; init_db adds whichever an existing DB is missing.
+ADDED_COLUMNS: dict[str, list[tuple[str, str]]] = {
+    "items": [("content_hash", "TEXT"), ("event_ts", "INTEGER"), ("cluster_id", "TEXT"),
+              ("static_score", "REAL"), ("published_ts", "INTEGER"), ("full_text_z", "BLOB")],
+    # seen_key: the packs a feed's validators and seen ids were recorded for (collector.seen_key); the rest
+    # are the scheduling and health of each source polled by the watch daemon (agents/watcher.py)
+    "feed_state": [("seen_key", "TEXT"),
+                   ("name", "TEXT"), ("interval_s", "REAL"), ("next_poll_ts", "INTEGER"), ("last_poll_ts", "INTEGER"),
+                   ("last_ok_ts", "INTEGER"), ("last_status", "TEXT"), ("last_error", "TEXT"), ("latency_ms", "REAL"),
+                   ("latency_ewma_ms", "REAL"), ("new_rate", "REAL"), ("failures", "INTEGER DEFAULT 0"),
+                   ("open_until", "INTEGER"), ("polls", "INTEGER DEFAULT 0"), ("new_entries", "INTEGER DEFAULT 0")],
+}
+
+# Indexes on ADDED_COLUMNS; created after the columns exist
+INDEX_SQL = '''
+CREATE INDEX IF NOT EXISTS idx_items_event_ts ON items(event_ts);
+CREATE INDEX IF NOT EXISTS idx_items_cluster ON items(cluster_id);
+'''
+
+ITEM_COLUMNS = (
+    "id", "canonical_url", "url", "title", "publisher", "domain", "published_at", "retrieved_at", "snippet",
+    "full_text", "language", "tier", "source_type", "keywords_hit_json", "collection_run_id", "content_hash",
+    "event_ts", "cluster_id", "static_score", "published_ts",
+)
+
+# retrieved_at / collection_run_id change on every fetch and are deliberately not part of the hash
+HASHED_FIELDS = (
+    "canonical_url", "url", "title", "publisher", "domain", "published_at", "snippet", "full_text", "language",
+    "tier", "source_type", "keywords_hit",
+)
+
+UPSERT_ITEM_SQL = f'''INSERT INTO items ({", ".join(ITEM_COLUMNS)}) VALUES ({", ".join("?" * len(ITEM_COLUMNS))})
+   ON CONFLICT(id) DO UPDATE SET
+    canonical_url=excluded.canonical_url,
+    url=excluded.url,
+    title=excluded.title,
+    publisher=excluded.publisher,
+    domain=excluded.domain,
+    published_at=excluded.published_at,
+    retrieved_at=excluded.retrieved_at,
+    snippet=excluded.snippet,
+    full_text=COALESCE(excluded.full_text, items.full_text),
+    language=COALESCE(excluded.language, items.language),
+    tier=excluded.tier,
+    source_type=excluded.source_type,
+    keywords_hit_json=excluded.keywords_hit_json,
+    collection_run_id=excluded.collection_run_id,
+    content_hash=excluded.content_hash,
+    event_ts=excluded.event_ts,
+    cluster_id=COALESCE(items.cluster_id, excluded.cluster_id),
+    static_score=excluded.static_score,
+    published_ts=excluded.published_ts
+'''
+
+# Enriched article text is stored zlib-compressed in items.full_text_z; only its first
+# FTS_TEXT_CHARS characters are copied into the (uncompressed) full-text index.
+FTS_TEXT_CHARS = 4000
+# Text column for the FTS index: source-provided full_text, else the enriched text's lead
+FTS_TEXT_SQL = f"substr(COALESCE(full_text, inflate_text(full_text_z)), 1, {FTS_TEXT_CHARS})"
+
+# Full-text index over items (rowid = items.rowid), kept in sync by upsert_items and the enricher
+FTS_SQL = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+  title, snippet, full_text, tokenize='unicode61 remove_diacritics 2'
+);
+'''
+
+# Max bound parameters per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+def inflate_text(blob: bytes | None) -> str | None:
+    return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+def connect(db_path: str = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    target, uri = (f"file:{os.path.abspath(db_path)}?mode=ro", True) if readonly else (db_path, False)
+    counting = instrument.active()
+    conn = sqlite3.connect(target, uri=uri, cached_statements=CACHED_STATEMENTS,
+                           factory=instrument.CountingConnection if counting else sqlite3.Connection)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    conn.row_factory = instrument.counting_row if counting else sqlite3.Row
+    conn.create_function("inflate_text", 1, inflate_text, deterministic=True)
     return conn
 
+class Session:
+    """One tuned connection shared by every stage of a command run.
+
+    Opening a writable session migrates the database if its schema version is behind (otherwise
+    that costs one pragma read). A read-only session opens the file with mode=ro (temp and archive tables still work);
+    open one per concurrent reader (e.g. each rebuild worker). Use as a context manager (an exception rolls
+    back the open transaction) or close().
+    """
+
+    def __init__(self, db_path: str = DB_PATH, readonly: bool = False):
+        self.db_path = db_path
+        self.readonly = readonly
+        self.conn = connect(db_path, readonly=readonly)
+        if not readonly:
+            migrate(self.conn)
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None and not self.readonly:
+            self.conn.rollback()
+        self.close()
+
+    def close(self) -> None:
+        if not self.readonly:
+            self.conn.commit()
+            self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+@contextmanager
+def borrow(session: Session | None, db_path: str = DB_PATH, readonly: bool = False) -> Iterator[sqlite3.Connection]:
+    """The session's connection (left open), or, without a session, a connection to `db_path` closed afterwards."""
+    if session is not None:
+        yield session.conn
+        return
+    conn = connect(db_path, readonly=readonly)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
 def init_db(db_path: str = DB_PATH) -> None:
     conn = connect(db_path)
+    migrate(conn)
+    conn.close()
+
+def migrate(conn: sqlite3.Connection) -> bool:
+    """Create or upgrade the schema unless the database is already at SCHEMA_VERSION; True if it ran."""
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return False
     conn.executescript(SCHEMA_SQL)
+    _migrate_pack_keys(conn)
+    _add_missing_columns(conn)
+    conn.executescript(INDEX_SQL)
+    _backfill_event_ts(conn)
+    _backfill_score_parts(conn)
+    if conn.execute("SELECT 1 FROM item_packs LIMIT 1").fetchone() is None:
+        tag_all_items(conn)
+    _sync_pack_event_ts(conn)
+    if conn.execute("SELECT 1 FROM trend_rollup LIMIT 1").fetchone() is None:
+        rebuild_rollups(conn)
+    if conn.execute("SELECT 1 FROM title_grams LIMIT 1").fetchone() is None:
+        rebuild_title_grams(conn)
+    if conn.execute("SELECT 1 FROM lsh_buckets LIMIT 1").fetchone() is None:
+        rebuild_clusters(conn)
+    _split_empty_clusters(conn)
+    try:
+        conn.executescript(FTS_SQL)
+    except sqlite3.OperationalError as e:
+        print(f"[db] full-text search unavailable (SQLite built without FTS5?): {e}")
+    else:
+        if conn.execute("SELECT 1 FROM items_fts LIMIT 1").fetchone() is None:
+            rebuild_fts(conn)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
     conn.commit()
-    conn.close()
+    return True
 
-def upsert_items(conn: sqlite3.Connection, items: Iterable[dict[str, Any]]) -> int:
-    cur = conn.cursor()
+def has_fts(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='items_fts'").fetchone() is not None
+
+def _sync_fts(conn: sqlite3.Connection, ids: list[str]) -> None:
+    if not ids or not has_fts(conn):
+        return
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM items_fts WHERE rowid IN (SELECT rowid FROM items WHERE id IN ({marks}))", chunk)
+        conn.execute(
+            f"INSERT INTO items_fts(rowid, title, snippet, full_text) SELECT rowid, title, snippet, {FTS_TEXT_SQL} FROM items WHERE id IN ({marks})",
+            chunk
+        )
+
+def rebuild_fts(conn: sqlite3.Connection) -> None:
+    """Re-index every item in items_fts (migration / repair)."""
+    conn.execute("DELETE FROM items_fts")
+    conn.execute(f"INSERT INTO items_fts(rowid, title, snippet, full_text) SELECT rowid, title, snippet, {FTS_TEXT_SQL} FROM items")
+    conn.commit()
+
+def _migrate_pack_keys(conn: sqlite3.Connection) -> None:
+    for table, ddl in PACK_KEYED_SQL.items():
+        have = [r["name"] for r in conn.execute(f"PRAGMA table_info({table})")]
+        if have and "pack" not in have:
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_prepack")
+            conn.executescript(ddl)
+            cols = ", ".join(have)
+            conn.execute(f"INSERT INTO {table} (pack, {cols}) SELECT ?, {cols} FROM {table}_prepack", (DEFAULT_PACK,))
+            conn.execute(f"DROP TABLE {table}_prepack")
+        else:
+            conn.executescript(ddl)
+
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    for table, cols in ADDED_COLUMNS.items():
+        have = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in cols:
+            if name not in have:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+def event_ts_for(it: dict[str, Any]) -> int | None:
+    """Event time (UTC epoch) of an item: published_at, else retrieved_at."""
+    if it.get("event_ts") is not None:
+        return int(it["event_ts"])
+    ts = to_epoch(it.get("published_at"))
+    return ts if ts is not None else to_epoch(it.get("retrieved_at"))
+
+def _backfill_event_ts(conn: sqlite3.Connection, batch: int = 5000) -> int:
+    n = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, published_at, retrieved_at FROM items WHERE event_ts IS NULL AND (published_at IS NOT NULL OR retrieved_at IS NOT NULL) LIMIT ?",
+            (batch,)
+        ).fetchall()
+        updates = [(event_ts_for(dict(r)), r["id"]) for r in rows]
+        updates = [u for u in updates if u[0] is not None]
+        if not updates:
+            return n
+        conn.executemany("UPDATE items SET event_ts=? WHERE id=?", updates)
+        n += len(updates)
+
+def _backfill_score_parts(conn: sqlite3.Connection, batch: int = 5000) -> int:
     n = 0
-    for it in items:
-        cur.execute(
-            '''INSERT INTO items (
-                id, canonical_url, url, title, publisher, domain, published_at, retrieved_at, snippet, full_text,
-                language, tier, source_type, keywords_hit_json, collection_run_id
-               ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-               ON CONFLICT(id) DO UPDATE SET
-                canonical_url=excluded.canonical_url,
-                url=excluded.url,
-                title=excluded.title,
-                publisher=excluded.publisher,
-                domain=excluded.domain,
-                published_at=excluded.published_at,
-                retrieved_at=excluded.retrieved_at,
-                snippet=excluded.snippet,
-                full_text=COALESCE(excluded.full_text, items.full_text),
-                language=COALESCE(excluded.language, items.language),
-                tier=excluded.tier,
-                source_type=excluded.source_type,
-                keywords_hit_json=excluded.keywords_hit_json,
-                collection_run_id=excluded.collection_run_id
-            ''',
-            (
-                it["id"], it.get("canonical_url"), it["url"], it["title"], it.get("publisher"), it.get("domain"),
-                it.get("published_at"), it.get("retrieved_at"), it.get("snippet",""), it.get("full_text"),
-                it.get("language"), it.get("tier","U"), it.get("source_type","rss"),
-                json.dumps(it.get("keywords_hit",[])), it.get("collection_run_id")
-            )
+    while True:
+        rows = conn.execute(
+            "SELECT id, tier, keywords_hit_json, published_at FROM items WHERE static_score IS NULL LIMIT ?", (batch,)
+        ).fetchall()
+        if not rows:
+            return n
+        conn.executemany(
+            "UPDATE items SET static_score=?, published_ts=? WHERE id=?",
+            [(static_score(r["tier"] or "U", json.loads(r["keywords_hit_json"] or "[]")), to_epoch(r["published_at"]), r["id"])
+             for r in rows]
         )
-        n += 1
+        n += len(rows)
+
+def item_hash(it: dict[str, Any]) -> str:
+    payload = json.dumps([it.get(f) for f in HASHED_FIELDS], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _item_params(it: dict[str, Any], content_hash: str, cluster_id: str | None = None) -> tuple:
+    return (
+        it["id"], it.get("canonical_url"), it["url"], it["title"], it.get("publisher"), it.get("domain"),
+        it.get("published_at"), it.get("retrieved_at"), it.get("snippet",""), it.get("full_text"),
+        it.get("language"), it.get("tier","U"), it.get("source_type","rss"),
+        json.dumps(it.get("keywords_hit",[])), it.get("collection_run_id"), content_hash,
+        event_ts_for(it), cluster_id, static_score(it.get("tier","U"), it.get("keywords_hit",[])),
+        to_epoch(it.get("published_at")),
+    )
+
+# Stored columns needed to undo an item's rollup contribution when it is rewritten
+_PRIOR_COLUMNS = "id, content_hash, event_ts, title, snippet, publisher, domain, tier, keywords_hit_json"
+
+def _existing_rows(conn: sqlite3.Connection, ids: list[str]) -> dict[str, sqlite3.Row]:
+    out: dict[str, sqlite3.Row] = {}
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        cur = conn.execute(f"SELECT {_PRIOR_COLUMNS} FROM items WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        out.update((r["id"], r) for r in cur)
+    return out
+
+def day_for_ts(ts: int) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).date().isoformat()
+
+def rollup_keys(event_ts: int | None, publisher: str | None, domain: str | None, tier: str | None,
+                keywords: list[str], title: str | None, snippet: str | None) -> list[tuple[str, str, str]]:
+    """(day, dim, key) counts one item contributes to trend_rollup."""
+    if event_ts is None:
+        return []
+    day = day_for_ts(event_ts)
+    themes = get_matcher().scan(f"{title or ''} {snippet or ''}")["themes"]
+    return (
+        [(day, "total", ""), (day, "publisher", publisher or domain or "unknown"), (day, "tier", tier or "U")]
+        + [(day, "keyword", k) for k in keywords]
+        + [(day, "theme", t) for t in sorted(themes)]
+    )
+
+def _row_rollup_keys(r: sqlite3.Row) -> list[tuple[str, str, str]]:
+    try:
+        kws = json.loads(r["keywords_hit_json"] or "[]")
+    except Exception:
+        kws = []
+    return rollup_keys(r["event_ts"], r["publisher"], r["domain"], r["tier"], kws, r["title"], r["snippet"])
+
+def _item_rollup_keys(it: dict[str, Any]) -> list[tuple[str, str, str]]:
+    return rollup_keys(event_ts_for(it), it.get("publisher"), it.get("domain"), it.get("tier","U"),
+                       it.get("keywords_hit",[]), it.get("title"), it.get("snippet",""))
+
+def _apply_rollup_deltas(conn: sqlite3.Connection, deltas: dict[tuple[str, str, str], int]) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    conn.executemany(
+        "INSERT INTO trend_rollup(day,dim,key,n) VALUES (?,?,?,?) ON CONFLICT(day,dim,key) DO UPDATE SET n = n + excluded.n",
+        [(*k, v) for k, v in deltas.items()],
+    )
+    conn.executemany("DELETE FROM trend_rollup WHERE day=? AND dim=? AND key=? AND n <= 0",
+                     [k for k, v in deltas.items() if v < 0])
+
+def rebuild_rollups(conn: sqlite3.Connection, batch: int = 5000) -> None:
+    """Recompute trend_rollup from the items table (migration / repair)."""
+    conn.execute("DELETE FROM trend_rollup")
+    cur = conn.execute(f"SELECT {_PRIOR_COLUMNS} FROM items")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        deltas: dict[tuple[str, str, str], int] = {}
+        for r in rows:
+            for k in _row_rollup_keys(r):
+                deltas[k] = deltas.get(k, 0) + 1
+        _apply_rollup_deltas(conn, deltas)
     conn.commit()
+
+def gram_keys(event_ts: int | None, title: str | None) -> list[tuple[str, str]]:
+    """(day, gram) counts one item contributes to title_grams."""
+    if event_ts is None:
+        return []
+    day = day_for_ts(event_ts)
+    return [(day, g) for g in title_grams(title)]
+
+def _apply_gram_deltas(conn: sqlite3.Connection, deltas: dict[tuple[str, str], int]) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    conn.executemany(
+        "INSERT INTO title_grams(day,gram,n) VALUES (?,?,?) ON CONFLICT(day,gram) DO UPDATE SET n = n + excluded.n",
+        [(*k, v) for k, v in deltas.items()],
+    )
+    conn.executemany("DELETE FROM title_grams WHERE day=? AND gram=? AND n <= 0", [k for k, v in deltas.items() if v < 0])
+
+def rebuild_title_grams(conn: sqlite3.Connection, batch: int = 5000) -> None:
+    """Recompute title_grams from the items table (migration / repair)."""
+    conn.execute("DELETE FROM title_grams")
+    cur = conn.execute("SELECT event_ts, title FROM items")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        deltas: dict[tuple[str, str], int] = {}
+        for r in rows:
+            for k in gram_keys(r["event_ts"], r["title"]):
+                deltas[k] = deltas.get(k, 0) + 1
+        _apply_gram_deltas(conn, deltas)
+    conn.commit()
+
+def _assign_cluster(conn: sqlite3.Connection, item_id: str, title: str | None, snippet: str | None,
+                    pending: dict[tuple[int, str], tuple[str, set[str]]], bucket_rows: list[tuple]) -> str:
+    """Near-duplicate cluster for a new item: the cluster sharing most LSH buckets with it, else its own id.
+
+    A cluster sharing fewer than neardup.MIN_BAND_VOTES buckets is joined only if the item is at least
+    neardup.MIN_JACCARD similar to the item it collided with; an item without shingles keeps its own id.
+    `pending` / `bucket_rows` carry buckets (and shingles) of items assigned earlier in the same batch
+    but not yet written.
+    """
+    sh = neardup.shingles(title, snippet)
+    keys = neardup.shingle_keys(sh)
+    if not keys:
+        return item_id
+    votes: dict[str, int] = {}
+    # cluster -> shingles (same batch) or id of the first item it collided with
+    seen: dict[str, set[str] | str] = {}
+    for k in keys:
+        if k in pending:
+            c, other = pending[k]
+            votes[c] = votes.get(c, 0) + 1
+            seen.setdefault(c, other)
+    cur = conn.execute(
+        f"SELECT cluster_id, item_id FROM lsh_buckets WHERE (band, bucket) IN (VALUES {','.join(['(?,?)'] * len(keys))})",
+        [v for k in keys for v in k],
+    )
+    for c, other in cur:
+        votes[c] = votes.get(c, 0) + 1
+        seen.setdefault(c, other)
+
+    def similar(c: str) -> bool:
+        other = seen[c]
+        if isinstance(other, str):
+            row = conn.execute("SELECT title, snippet FROM items WHERE id = ?", (other,)).fetchone()
+            other = neardup.shingles(row[0], row[1]) if row is not None else set()
+        return neardup.jaccard(sh, other) >= neardup.MIN_JACCARD
+
+    cluster = next((c for c in sorted(votes, key=lambda c: (-votes[c], c))
+                    if votes[c] >= neardup.MIN_BAND_VOTES or similar(c)), item_id)
+    for band, bucket in keys:
+        pending.setdefault((band, bucket), (cluster, sh))
+        bucket_rows.append((band, bucket, item_id, cluster))
+    return cluster
+
+def rebuild_clusters(conn: sqlite3.Connection, batch: int = 5000) -> None:
+    """Assign near-duplicate clusters to every item in event order (migration / repair)."""
+    conn.execute("DELETE FROM lsh_buckets")
+    cur = conn.execute("SELECT id, title, snippet FROM items ORDER BY event_ts, id")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        pending: dict[tuple[int, str], tuple[str, set[str]]] = {}
+        bucket_rows: list[tuple] = []
+        updates = [(_assign_cluster(conn, r["id"], r["title"], r["snippet"], pending, bucket_rows), r["id"]) for r in rows]
+        conn.executemany("INSERT OR REPLACE INTO lsh_buckets(band,bucket,item_id,cluster_id) VALUES (?,?,?,?)", bucket_rows)
+        conn.executemany("UPDATE items SET cluster_id=? WHERE id=?", updates)
+    conn.commit()
+
+def _split_empty_clusters(conn: sqlite3.Connection) -> int:
+    """Give items without shingles back their own clusters (they all shared neardup.LEGACY_EMPTY_KEYS)."""
+    keys = neardup.LEGACY_EMPTY_KEYS
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS empty_shingles (id TEXT PRIMARY KEY)")
+    conn.execute(f"""INSERT OR IGNORE INTO temp.empty_shingles SELECT item_id FROM lsh_buckets
+                     WHERE (band, bucket) IN (VALUES {','.join(['(?,?)'] * len(keys))})""", [v for k in keys for v in k])
+    conn.execute("DELETE FROM lsh_buckets WHERE item_id IN (SELECT id FROM temp.empty_shingles)")
+    n = conn.execute("UPDATE items SET cluster_id = id WHERE cluster_id IN (SELECT id FROM temp.empty_shingles)").rowcount
+    conn.execute("DROP TABLE temp.empty_shingles")
     return n
 
-def save_daily_selected(conn: sqlite3.Connection, date: str, selected: list[tuple[str, float]]) -> None:
-    cur = conn.cursor()
-    for item_id, score in selected:
-        cur.execute(
-            "INSERT OR REPLACE INTO daily_selected(date,item_id,score) VALUES (?,?,?)",
-            (date, item_id, score),
-        )
+def pack_tag_rows(it: dict[str, Any], pack: str = DEFAULT_PACK) -> list[tuple]:
+    """item_packs rows for an item: one per entry of it["packs"] (pack -> tier/keywords_hit), else one for `pack`."""
+    packs = it.get("packs") or {pack: it}
+    ev = event_ts_for(it)
+    return [(p, it["id"], ev, t.get("tier", "U"), json.dumps(t.get("keywords_hit", [])),
+             static_score(t.get("tier", "U"), t.get("keywords_hit", [])))
+            for p, t in packs.items()]
+
+# A tag's event_ts is the items row's, so pack windows match item windows even when a re-fetch of an
+# undated item (unchanged, so not rewritten) computes a newer retrieved_at; the row's own value is
+# only used for items not in the hot table
+TAG_VALUES_SQL = "VALUES (?1, ?2, COALESCE((SELECT event_ts FROM items WHERE id = ?2), ?3), ?4, ?5, ?6)"
+
+TAG_ITEM_SQL = f'''INSERT INTO item_packs(pack, item_id, event_ts, {", ".join(PACK_FIELDS)}) {TAG_VALUES_SQL}
+   ON CONFLICT(pack, item_id) DO UPDATE SET
+    event_ts=excluded.event_ts, tier=excluded.tier, keywords_hit_json=excluded.keywords_hit_json, static_score=excluded.static_score
+   WHERE item_packs.event_ts IS NOT excluded.event_ts OR item_packs.tier IS NOT excluded.tier
+    OR item_packs.keywords_hit_json IS NOT excluded.keywords_hit_json OR item_packs.static_score IS NOT excluded.static_score
+'''
+
+def _sync_pack_event_ts(conn: sqlite3.Connection) -> int:
+    """Reset pack tags whose event_ts drifted from their items row (re-tagged undated items)."""
+    return conn.execute(
+        """UPDATE item_packs SET event_ts = (SELECT event_ts FROM items WHERE id = item_packs.item_id)
+           WHERE event_ts IS NOT (SELECT event_ts FROM items WHERE id = item_packs.item_id)
+             AND item_id IN (SELECT id FROM items)"""
+    ).rowcount
+
+def tag_all_items(conn: sqlite3.Connection, pack: str = DEFAULT_PACK) -> None:
+    """Tag every item for `pack` with its own tier/keywords/score (databases that predate item_packs)."""
+    conn.execute(
+        f"INSERT OR IGNORE INTO item_packs(pack, item_id, event_ts, {', '.join(PACK_FIELDS)}) "
+        f"SELECT ?, id, event_ts, {', '.join(PACK_FIELDS)} FROM items", (pack,)
+    )
+
+def tag_items(conn: sqlite3.Connection, rows: list[tuple], replace: bool = True) -> None:
+    """Write pack_tag_rows output; replace=False only adds packs an item is not yet tagged with."""
+    if rows:
+        conn.executemany(TAG_ITEM_SQL if replace else
+                         f"INSERT OR IGNORE INTO item_packs(pack, item_id, event_ts, {', '.join(PACK_FIELDS)}) {TAG_VALUES_SQL}",
+                         rows)
+
+def upsert_items(conn: sqlite3.Connection, items: Iterable[dict[str, Any]], pack: str = DEFAULT_PACK,
+                 outcomes: dict[str, str] | None = None) -> dict[str, int]:
+    """Write items in one transaction, skipping rows whose stored content hash is unchanged.
+
+    Every item is also tagged in item_packs, for each pack in it["packs"] or else for `pack`.
+    Returns {"inserted", "updated", "unchanged"}. Later duplicates of an id in `items` win.
+    A changed item that was archived is rehydrated into the hot table (keeping its cluster and
+    fetched text) and counted as updated; its hot row then shadows the archived one.
+    With `outcomes`, the id of every row written is mapped to "inserted" or "updated" there.
+    """
+    batch = {it["id"]: it for it in items}
+    existing = _existing_rows(conn, list(batch))
+    # Items past the archive horizon may be archived: their archived row is the prior
+    archived = archive.find_items(conn, {i: event_ts_for(it) for i, it in batch.items() if i not in existing})
+    existing.update(archived)
+    inserted, updated = [], []
+    deltas: dict[tuple[str, str, str], int] = {}
+    gram_deltas: dict[tuple[str, str], int] = {}
+    pending: dict[tuple[int, str], tuple[str, set[str]]] = {}
+    bucket_rows: list[tuple] = []
+    for item_id, it in batch.items():
+        h = item_hash(it)
+        prior = existing.get(item_id)
+        if prior is not None and prior["content_hash"] == h:
+            continue
+        if item_id in archived:
+            inserted.append(_item_params(it, h, prior.get("cluster_id")))
+        elif prior is None:
+            cluster = _assign_cluster(conn, item_id, it.get("title"), it.get("snippet"), pending, bucket_rows)
+            inserted.append(_item_params(it, h, cluster))
+        else:
+            updated.append(_item_params(it, h))
+        for k in _item_rollup_keys(it):
+            deltas[k] = deltas.get(k, 0) + 1
+        for k in (_row_rollup_keys(prior) if prior is not None else []):
+            deltas[k] = deltas.get(k, 0) - 1
+        for k in gram_keys(event_ts_for(it), it.get("title")):
+            gram_deltas[k] = gram_deltas.get(k, 0) + 1
+        for k in (gram_keys(prior["event_ts"], prior["title"]) if prior is not None else []):
+            gram_deltas[k] = gram_deltas.get(k, 0) - 1
+    conn.executemany(UPSERT_ITEM_SQL, inserted + updated)
+    conn.executemany("INSERT OR REPLACE INTO lsh_buckets(band,bucket,item_id,cluster_id) VALUES (?,?,?,?)", bucket_rows)
+    conn.executemany("UPDATE items SET full_text_z = ? WHERE id = ? AND full_text_z IS NULL",
+                     [(r["full_text_z"], i) for i, r in archived.items() if r.get("full_text_z") is not None])
+    _apply_rollup_deltas(conn, deltas)
+    _apply_gram_deltas(conn, gram_deltas)
+    _sync_fts(conn, [p[0] for p in inserted + updated])
+    tag_items(conn, [row for it in batch.values() for row in pack_tag_rows(it, pack)])
+    conn.commit()
+    rehydrated = sum(p[0] in archived for p in inserted)
+    if outcomes is not None:
+        outcomes.update((p[0], "updated" if p[0] in archived else "inserted") for p in inserted)
+        outcomes.update((p[0], "updated") for p in updated)
+    return {"inserted": len(inserted) - rehydrated, "updated": len(updated) + rehydrated,
+            "unchanged": len(batch) - len(inserted) - len(updated)}
+
+def save_daily_selected(conn: sqlite3.Connection, date: str, selected: list[tuple], pack: str = DEFAULT_PACK) -> None:
+    """`selected` holds (item_id, score) or (item_id, score, cluster_size) tuples."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO daily_selected(pack,date,item_id,score,cluster_size) VALUES (?,?,?,?,?)",
+        [(pack, date, s[0], s[1], s[2] if len(s) > 2 else 1) for s in selected],
+    )
+    conn.commit()
+
+def replace_daily_selected(conn: sqlite3.Connection, date: str, selected: list[tuple], pack: str = DEFAULT_PACK) -> int:
+    """Make `selected` ((item_id, score, cluster_size) tuples) the pack's whole selection for `date`.
+
+    Only the difference is written: rows no longer selected are deleted and new or re-scored rows
+    upserted. Returns the number of rows written or deleted.
+    """
+    old = {r["item_id"]: (r["score"], r["cluster_size"]) for r in conn.execute(
+        "SELECT item_id, score, cluster_size FROM daily_selected WHERE pack = ? AND date = ?", (pack, date))}
+    new = {s[0]: (s[1], s[2]) for s in selected}
+    dropped = [(pack, date, i) for i in old if i not in new]
+    changed = [(pack, date, i, *v) for i, v in new.items() if old.get(i) != v]
+    conn.executemany("DELETE FROM daily_selected WHERE pack = ? AND date = ? AND item_id = ?", dropped)
+    conn.executemany("INSERT OR REPLACE INTO daily_selected(pack,date,item_id,score,cluster_size) VALUES (?,?,?,?,?)", changed)
+    conn.commit()
+    return len(dropped) + len(changed)
+
+def get_selection_state(conn: sqlite3.Connection, pack: str, date: str) -> tuple[dict[str, Any], set[str]] | None:
+    """(selection_state row, candidate pool ids) for a pack and date, or None."""
+    row = conn.execute("SELECT * FROM selection_state WHERE pack = ? AND date = ?", (pack, date)).fetchone()
+    if row is None:
+        return None
+    pool = {r[0] for r in conn.execute("SELECT item_id FROM selection_pool WHERE pack = ? AND date = ?", (pack, date))}
+    return dict(row), pool
+
+def save_selection_state(conn: sqlite3.Connection, pack: str, date: str, state: dict[str, Any],
+                         added: Iterable[str], dropped: Iterable[str]) -> None:
+    """Store the state and apply a pool diff; state kept for the pack's earlier dates is discarded."""
+    conn.execute(
+        """INSERT OR REPLACE INTO selection_state(pack,date,k,span_s,floor_dated,floor_undated,tag_rowid,updated_at)
+           VALUES (?,?,?,?,?,?,?,CURRENT_TIMESTAMP)""",
+        (pack, date, state["k"], state["span_s"], state["floor_dated"], state["floor_undated"], state["tag_rowid"]))
+    conn.executemany("DELETE FROM selection_pool WHERE pack = ? AND date = ? AND item_id = ?", [(pack, date, i) for i in dropped])
+    conn.executemany("INSERT OR IGNORE INTO selection_pool(pack,date,item_id) VALUES (?,?,?)", [(pack, date, i) for i in added])
+    conn.execute("DELETE FROM selection_state WHERE pack = ? AND date < ?", (pack, date))
+    conn.execute("DELETE FROM selection_pool WHERE pack = ? AND date < ?", (pack, date))
     conn.commit()
 
+def clear_selection_state(conn: sqlite3.Connection, pack: str, date: str) -> None:
+    conn.execute("DELETE FROM selection_state WHERE pack = ? AND date = ?", (pack, date))
+    conn.execute("DELETE FROM selection_pool WHERE pack = ? AND date = ?", (pack, date))
+    conn.commit()
+
+def max_tag_rowid(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM item_packs").fetchone()[0]
+
+def get_tagged_since(conn: sqlite3.Connection, pack: str, rowid: int) -> list[str]:
+    """Ids of items tagged with `pack` after item_packs row `rowid` (new items, or new tags on old ones)."""
+    return [r[0] for r in conn.execute("SELECT item_id FROM item_packs WHERE rowid > ? AND pack = ?", (rowid, pack))]
+
+def get_pack_ids_after(conn: sqlite3.Connection, pack: str, ts: int) -> list[str]:
+    """Ids of items tagged with `pack` whose event time is after `ts` (future-dated ones)."""
+    return [r[0] for r in conn.execute("SELECT item_id FROM item_packs WHERE pack = ? AND event_ts > ?", (pack, ts))]
+
+def get_pack_rows(conn: sqlite3.Connection, pack: str, ids: Iterable[str], columns: Iterable[str]) -> list[sqlite3.Row]:
+    """Hot rows for the given ids tagged with `pack`, reading `columns` (PACK_FIELDS and event_ts from
+    item_packs) plus tag_rowid, in window-scan order: newest first, then latest tagged first."""
+    ids = list(ids)
+    cols = ", ".join(f"ip.{c} AS {c}" if c in PACK_FIELDS or c == "event_ts" else f"i.{c}" for c in columns)
+    out: list[sqlite3.Row] = []
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        out += conn.execute(
+            f"""SELECT {cols}, ip.rowid AS tag_rowid FROM item_packs ip JOIN items i ON i.id = ip.item_id
+                WHERE ip.pack = ? AND ip.item_id IN ({','.join('?' * len(chunk))})""", (pack, *chunk)).fetchall()
+    out.sort(key=lambda r: (-(r["event_ts"] or 0), -r["tag_rowid"]))
+    return out
+
+def count_pack_window(conn: sqlite3.Connection, pack: str, start_ts: int, end_ts: int) -> int:
+    return conn.execute("SELECT count(*) FROM item_packs WHERE pack = ? AND event_ts >= ? AND event_ts <= ?",
+                        (pack, start_ts, end_ts)).fetchone()[0]
+
+def count_window_clusters(conn: sqlite3.Connection, pack: str, clusters: Iterable[str], start_ts: int, end_ts: int) -> dict[str, int]:
+    """Items of `pack` in [start_ts, end_ts] per near-duplicate cluster (cluster_id, else the item's id)."""
+    clusters = list(clusters)
+    if not clusters:
+        return {}
+    marks = ",".join("?" * len(clusters))
+    counts = {c: 0 for c in clusters}
+    for r in conn.execute(
+        f"""SELECT COALESCE(i.cluster_id, i.id) AS c, count(*) AS n FROM items i
+            CROSS JOIN item_packs ip ON ip.pack = ? AND ip.item_id = i.id
+            WHERE (i.cluster_id IN ({marks}) OR i.id IN ({marks})) AND ip.event_ts >= ? AND ip.event_ts <= ?
+            GROUP BY c""", (pack, *clusters, *clusters, start_ts, end_ts)):
+        if r["c"] in counts:
+            counts[r["c"]] = r["n"]
+    return counts
+
+def _sources(conn: sqlite3.Connection, start_ts: int | None, end_ts: int | None, *tables: str) -> list[str]:
+    """Table expressions for reading [start_ts, end_ts]: the hot tables, or, when the range reaches
+    back past the archive horizon, each unioned with its archived rows (see agents/archive.py)."""
+    if archive.attach(conn, start_ts, end_ts):
+        return [archive.source(t) for t in tables]
+    return list(tables)
+
+def _date_span(start_date: str, end_date: str) -> tuple[int, int]:
+    return to_epoch(f"{start_date}T00:00:00Z"), to_epoch(f"{end_date}T23:59:59Z")
+
 def get_items_for_window(conn: sqlite3.Connection, start_iso: str, end_iso: str) -> list[sqlite3.Row]:
+    span = (to_epoch(start_iso), to_epoch(end_iso))
+    items, = _sources(conn, *span, "items")
     cur = conn.cursor()
     cur.execute(
-        '''SELECT * FROM items
-           WHERE COALESCE(published_at, retrieved_at) >= ? AND COALESCE(published_at, retrieved_at) <= ?
-           ORDER BY COALESCE(published_at, retrieved_at) DESC''',
-        (start_iso, end_iso)
+        f'''SELECT * FROM {items}
+           WHERE event_ts >= ? AND event_ts <= ?
+           ORDER BY event_ts DESC''',
+        span
     )
     return cur.fetchall()
 
-def get_selected_items_for_date(conn: sqlite3.Connection, date: str) -> list[sqlite3.Row]:
+def iter_window_chunks(conn: sqlite3.Connection, start_iso: str, end_iso: str,
+                       columns: Iterable[str] = ("id",), chunk: int = 1000,
+                       pack: str | None = None) -> Iterator[list[sqlite3.Row]]:
+    """Stream the window newest-first in lists of at most `chunk` rows, reading only `columns`.
+
+    With `pack`, only items tagged with that pack, and PACK_FIELDS hold the pack's values.
+    """
+    span = (to_epoch(start_iso), to_epoch(end_iso))
+    items, packs = _sources(conn, *span, "items", "item_packs")
+    if pack is None:
+        cols = ", ".join(c for c in columns if c in ITEM_COLUMNS)
+        cur = conn.execute(f"SELECT {cols} FROM {items} WHERE event_ts >= ? AND event_ts <= ? ORDER BY event_ts DESC", span)
+    else:
+        cols = ", ".join(f"ip.{c} AS {c}" if c in PACK_FIELDS else f"i.{c}" for c in columns if c in ITEM_COLUMNS)
+        # ties in event time come in item_packs index order (latest tagged first), as get_pack_rows sorts them
+        tie = ", ip.rowid DESC" if packs == "item_packs" else ""
+        cur = conn.execute(
+            f"""SELECT {cols} FROM {packs} ip JOIN {items} i ON i.id = ip.item_id
+                WHERE ip.pack = ? AND ip.event_ts >= ? AND ip.event_ts <= ? ORDER BY ip.event_ts DESC{tie}""",
+            (pack, *span)
+        )
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        yield rows
+
+def iter_items_for_window(conn: sqlite3.Connection, start_iso: str, end_iso: str,
+                          columns: Iterable[str] = ("id",), chunk: int = 1000) -> Iterator[sqlite3.Row]:
+    """Stream the window newest-first, reading only `columns` and holding at most `chunk` rows."""
+    for rows in iter_window_chunks(conn, start_iso, end_iso, columns, chunk):
+        yield from rows
+
+def get_selected_items_for_date(conn: sqlite3.Connection, date: str, pack: str = DEFAULT_PACK) -> list[sqlite3.Row]:
+    """Selected items for a pack and date, best first, with the pack's tier/keywords/score."""
+    cols = ", ".join(f"COALESCE(ip.{c}, i.{c}) AS {c}" if c in PACK_FIELDS else f"i.{c}" for c in ITEM_COLUMNS)
+    selected, items, packs = _sources(conn, *_date_span(date, date), "daily_selected", "items", "item_packs")
     cur = conn.cursor()
     cur.execute(
-        '''SELECT i.*, ds.score FROM daily_selected ds
-           JOIN items i ON i.id = ds.item_id
-           WHERE ds.date = ?
-           ORDER BY ds.score DESC, COALESCE(i.published_at, i.retrieved_at) DESC''',
-        (date,)
+        f'''SELECT {cols}, ds.score, ds.cluster_size, i.full_text_z IS NOT NULL AS enriched FROM {selected} ds
+           JOIN {items} i ON i.id = ds.item_id
+           LEFT JOIN {packs} ip ON ip.pack = ds.pack AND ip.item_id = ds.item_id
+           WHERE ds.pack = ? AND ds.date = ?
+           ORDER BY ds.score DESC, i.event_ts DESC''',
+        (pack, date)
     )
     return cur.fetchall()
 
 def get_items_since_days(conn: sqlite3.Connection, days: int) -> list[sqlite3.Row]:
+    since = int(time.time()) - int(days) * 86400
+    items, = _sources(conn, since, None, "items")
     cur = conn.cursor()
     cur.execute(
-        f'''SELECT * FROM items
-            WHERE datetime(COALESCE(published_at, retrieved_at)) >= datetime('now', '-{int(days)} days')
-            ORDER BY COALESCE(published_at, retrieved_at) DESC'''
+        f'''SELECT * FROM {items}
+           WHERE event_ts >= ?
+           ORDER BY event_ts DESC''',
+        (since,)
     )
     return cur.fetchall()
 
-def save_report_meta(conn: sqlite3.Connection, date: str, report_path: str, docx_path: str | None, meta: dict) -> None:
+def save_report_meta(conn: sqlite3.Connection, date: str, report_path: str, docx_path: str | None, meta: dict,
+                     pack: str = DEFAULT_PACK) -> None:
     conn.execute(
-        "INSERT OR REPLACE INTO reports(date,report_path,docx_path,meta_json) VALUES (?,?,?,?)",
-        (date, report_path, docx_path, json.dumps(meta))
+        "INSERT OR REPLACE INTO reports(pack,date,report_path,docx_path,meta_json) VALUES (?,?,?,?,?)",
+        (pack, date, report_path, docx_path, json.dumps(meta))
+    )
+    conn.commit()
+
+def quarantine_items(conn: sqlite3.Connection, rejected: list[tuple[dict[str, Any], list[str]]],
+                     pack: str = DEFAULT_PACK, run_id: str | None = None) -> int:
+    """Record (item, errors) pairs that failed validation instead of writing them; returns how many."""
+    rows = []
+    for it, errors in rejected:
+        doc = json.dumps(it, sort_keys=True, default=str)
+        item_id, source = (it.get("id"), it.get("source_type")) if isinstance(it, dict) else (None, None)
+        key = item_id if isinstance(item_id, str) and item_id else "sha1:" + hashlib.sha1(doc.encode("utf-8")).hexdigest()
+        rows.append((pack, key, source if isinstance(source, str) else None, run_id, json.dumps(errors), doc))
+    if rows:
+        conn.executemany(
+            '''INSERT INTO quarantine(pack,item_key,source_type,run_id,errors_json,item_json) VALUES (?,?,?,?,?,?)
+               ON CONFLICT(pack, item_key) DO UPDATE SET source_type=excluded.source_type, run_id=excluded.run_id,
+                 errors_json=excluded.errors_json, item_json=excluded.item_json, hits=hits+1,
+                 last_seen=CURRENT_TIMESTAMP''', rows)
+        conn.commit()
+    return len(rows)
+
+def save_run_records(conn: sqlite3.Connection, records: list[dict[str, Any]]) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO runs(run_id,kind,name,started_at,wall_s,cpu_s,peak_rss_kb,rows_read,rows_written,http_bytes,status,error,meta_json) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+        [(r["run_id"], r["kind"], r["name"], r["started_at"], r["wall_s"], r["cpu_s"], r["peak_rss_kb"], r["rows_read"],
+          r["rows_written"], r["http_bytes"], r["status"], r["error"], json.dumps(r["meta"])) for r in records],
     )
     conn.commit()
 
 def save_query_proposal(conn: sqlite3.Connection, proposal: dict, rationale: str) -> None:
     conn.execute("INSERT INTO query_proposals(proposal_json,rationale) VALUES (?,?)", (json.dumps(proposal), rationale))
     conn.commit()
+
+def get_feed_states(conn: sqlite3.Connection, urls: Iterable[str] | None = None) -> dict[str, dict[str, Any]]:
+    cur = conn.cursor()
+    cur.execute("SELECT url, etag, last_modified, seen_ids_json, seen_key FROM feed_state")
+    wanted = set(urls) if urls is not None else None
+    out = {}
+    for r in cur.fetchall():
+        if wanted is None or r["url"] in wanted:
+            out[r["url"]] = {"etag": r["etag"], "last_modified": r["last_modified"],
+                             "seen_ids": json.loads(r["seen_ids_json"] or "[]"), "seen_key": r["seen_key"]}
+    return out
+
+def save_feed_state(conn: sqlite3.Connection, url: str, etag: str | None, last_modified: str | None, seen_ids: list[str],
+                    seen_key: str | None = None) -> None:
+    conn.execute(
+        '''INSERT INTO feed_state(url,etag,last_modified,seen_ids_json,seen_key,updated_at) VALUES (?,?,?,?,?,CURRENT_TIMESTAMP)
+           ON CONFLICT(url) DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified,
+             seen_ids_json=excluded.seen_ids_json, seen_key=excluded.seen_key, updated_at=excluded.updated_at''',
+        (url, etag, last_modified, json.dumps(seen_ids), seen_key)
+    )
+    conn.commit()
+
+POLL_COLUMNS = tuple(name for name, _ in ADDED_COLUMNS["feed_state"] if name != "seen_key")
+
+def get_poll_states(conn: sqlite3.Connection) -> dict[str, dict[str, Any]]:
+    """url -> watch-daemon scheduling/health fields of every source that has been polled."""
+    cur = conn.execute(f"SELECT url, {', '.join(POLL_COLUMNS)} FROM feed_state WHERE polls > 0")
+    return {r["url"]: {c: r[c] for c in POLL_COLUMNS} for r in cur}
+
+def save_poll_state(conn: sqlite3.Connection, url: str, state: dict[str, Any]) -> None:
+    """Write the POLL_COLUMNS present in `state` for one source (validators are left alone)."""
+    cols = [c for c in POLL_COLUMNS if c in state]
+    conn.execute(
+        f"""INSERT INTO feed_state(url, {', '.join(cols)}, updated_at) VALUES (?, {', '.join('?' * len(cols))}, CURRENT_TIMESTAMP)
+            ON CONFLICT(url) DO UPDATE SET {', '.join(f'{c}=excluded.{c}' for c in cols)}, updated_at=excluded.updated_at""",
+        [url, *(state[c] for c in cols)]
+    )
+    conn.commit()
+
+def get_enrichment_candidates(conn: sqlite3.Connection, since_ts: int, tiers: Iterable[str], limit: int,
+                              refresh: bool = False, max_attempts: int = 3) -> list[sqlite3.Row]:
+    """Items since `since_ts` that were selected (any pack) or are tagged with one of `tiers`, and have no
+    body yet: never fetched, or failed fewer than `max_attempts` times. With `refresh`, previously
+    fetched items are included too (re-fetched conditionally). Selected items first, newest first.
+    """
+    tiers = list(tiers)
+    since_day = day_for_ts(since_ts)
+    tier_sql = f"OR i.id IN (SELECT item_id FROM item_packs WHERE event_ts >= ? AND tier IN ({','.join('?' * len(tiers))}))" if tiers else ""
+    return conn.execute(
+        f"""SELECT i.id, i.url, e.etag, e.last_modified, e.attempts,
+                   i.id IN (SELECT item_id FROM daily_selected WHERE date >= ?) AS selected
+            FROM items i LEFT JOIN enrichment e ON e.item_id = i.id
+            WHERE i.event_ts >= ?
+              AND (i.id IN (SELECT item_id FROM daily_selected WHERE date >= ?) {tier_sql})
+              AND (e.item_id IS NULL OR (e.status = 'error' AND e.attempts < ?) OR ?)
+            ORDER BY selected DESC, i.event_ts DESC LIMIT ?""",
+        (since_day, since_ts, since_day, *([since_ts, *tiers] if tiers else []), max_attempts, int(refresh), limit)
+    ).fetchall()
+
+def save_enrichment(conn: sqlite3.Connection, results: list[dict[str, Any]]) -> None:
+    """Store enricher results: compressed text into items.full_text_z, fetch state into enrichment, FTS refreshed.
+
+    Each result has item_id, status, http_status, etag, last_modified, error and text (None when
+    nothing new was fetched; a not_modified result keeps the stored text).
+    """
+    now = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    texts = [r for r in results if r.get("text")]
+    blobs = {r["item_id"]: compress_text(r["text"]) for r in texts}
+    conn.executemany("UPDATE items SET full_text_z = ? WHERE id = ?", [(b, i) for i, b in blobs.items()])
+    conn.executemany(
+        '''INSERT INTO enrichment(item_id, status, http_status, etag, last_modified, text_chars, stored_bytes, attempts, error, fetched_at)
+           VALUES (?,?,?,?,?,?,?,?,?,?)
+           ON CONFLICT(item_id) DO UPDATE SET status=excluded.status, http_status=excluded.http_status,
+             etag=COALESCE(excluded.etag, enrichment.etag), last_modified=COALESCE(excluded.last_modified, enrichment.last_modified),
+             text_chars=COALESCE(excluded.text_chars, enrichment.text_chars),
+             stored_bytes=COALESCE(excluded.stored_bytes, enrichment.stored_bytes),
+             attempts=CASE WHEN excluded.status = 'error' THEN enrichment.attempts + 1 ELSE 0 END,
+             error=excluded.error, fetched_at=excluded.fetched_at''',
+        [(r["item_id"], r["status"], r.get("http_status"), r.get("etag"), r.get("last_modified"),
+          len(r["text"]) if r.get("text") else None, len(blobs[r["item_id"]]) if r["item_id"] in blobs else None,
+          int(r["status"] == "error"), r.get("error"), now) for r in results]
+    )
+    _sync_fts(conn, list(blobs))
+    conn.commit()
+
+def get_item_text(conn: sqlite3.Connection, item_id: str) -> str | None:
+    """An item's article text: source-provided full_text, else the enriched body."""
+    row = conn.execute("SELECT full_text, full_text_z FROM items WHERE id = ?", (item_id,)).fetchone()
+    return None if row is None else row["full_text"] or inflate_text(row["full_text_z"])
+
+def get_rollups(conn: sqlite3.Connection, start_day: str, end_day: str) -> list[sqlite3.Row]:
+    """trend_rollup rows with start_day <= day <= end_day (ISO dates)."""
+    cur = conn.cursor()
+    cur.execute("SELECT day, dim, key, n FROM trend_rollup WHERE day >= ? AND day <= ? ORDER BY day", (start_day, end_day))
+    return cur.fetchall()
+
+def get_title_grams(conn: sqlite3.Connection, start_day: str, end_day: str) -> sqlite3.Cursor:
+    """Cursor over title_grams rows (day, gram, n) with start_day <= day <= end_day, in day order."""
+    return conn.execute("SELECT day, gram, n FROM title_grams WHERE day >= ? AND day <= ? ORDER BY day", (start_day, end_day))
+
+def get_daily_totals(conn: sqlite3.Connection, start_day: str, end_day: str) -> dict[str, int]:
+    """Items per day (the trend_rollup total) with start_day <= day <= end_day."""
+    cur = conn.execute("SELECT day, n FROM trend_rollup WHERE dim = 'total' AND key = '' AND day >= ? AND day <= ?",
+                       (start_day, end_day))
+    return {r["day"]: r["n"] for r in cur}
+
+def get_selected_dates(conn: sqlite3.Connection, start_date: str, end_date: str, pack: str = DEFAULT_PACK) -> list[str]:
+    selected, = _sources(conn, *_date_span(start_date, end_date), "daily_selected")
+    return [r["date"] for r in conn.execute(
+        f"SELECT DISTINCT date FROM {selected} WHERE pack = ? AND date >= ? AND date <= ? ORDER BY date",
+        (pack, start_date, end_date))]
+
+def get_report_rows(conn: sqlite3.Connection, dates: list[str], pack: str = DEFAULT_PACK) -> dict[str, sqlite3.Row]:
+    out = {}
+    for i in range(0, len(dates), LOOKUP_CHUNK):
+        chunk = dates[i:i + LOOKUP_CHUNK]
+        out.update((r["date"], r) for r in conn.execute(
+            f"SELECT date, report_path, docx_path, meta_json FROM reports WHERE pack = ? AND date IN ({','.join('?' * len(chunk))})",
+            (pack, *chunk)))
+    return out
+
+def get_backfill_status(conn: sqlite3.Connection, query_hash: str) -> dict[tuple[str, str], str]:
+    cur = conn.execute("SELECT slice_start, slice_end, status FROM backfill_slices WHERE query_hash=?", (query_hash,))
+    return {(r["slice_start"], r["slice_end"]): r["status"] for r in cur}
+
+def save_backfill_slice(conn: sqlite3.Connection, query_hash: str, slice_start: str, slice_end: str, status: str,
+                        items: int | None = None, error: str | None = None) -> None:
+    conn.execute(
+        """INSERT INTO backfill_slices(query_hash,slice_start,slice_end,status,items,error,updated_at)
+           VALUES (?,?,?,?,?,?,CURRENT_TIMESTAMP)
+           ON CONFLICT(query_hash,slice_start,slice_end) DO UPDATE SET
+             status=excluded.status, items=excluded.items, error=excluded.error, updated_at=excluded.updated_at""",
+        (query_hash, slice_start, slice_end, status, items, error)
+    )
+    conn.commit()
+
+def fts_phrase_query(text: str) -> str:
+    """Quote each whitespace-separated token so arbitrary user text is a valid FTS5 AND query."""
+    return " ".join('"' + tok.replace('"', '""') + '"' for tok in text.split())
+
+def search_items(conn: sqlite3.Connection, query: str, start_iso: str | None = None, end_iso: str | None = None,
+                 tiers: Iterable[str] | None = None, limit: int = 20, offset: int = 0) -> tuple[int, list[sqlite3.Row]]:
+    """Ranked full-text search (bm25; title weighted over snippet over full text).
+
+    `query` uses FTS5 syntax; if it does not parse it is retried as plain AND-ed terms.
+    Returns (total matches, rows for the requested page). Ranges reaching past the archive horizon
+    also search the archived months (indexed on first use); archived and hot matches are merged by
+    rank, which is computed per index, so the interleaving is approximate.
+    """
+    start_ts = to_epoch(start_iso) if start_iso else None
+    end_ts = to_epoch(end_iso) if end_iso else None
+    where = ["items_fts MATCH ?"]
+    params: list[Any] = []
+    if start_ts is not None:
+        where.append("i.event_ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        where.append("i.event_ts <= ?")
+        params.append(end_ts)
+    tiers = list(tiers or [])
+    if tiers:
+        where.append(f"i.tier IN ({','.join('?' * len(tiers))})")
+        params.extend(tiers)
+    schemas = ["main"]
+    if archive.attach(conn, start_ts, end_ts):
+        archive.ensure_fts(conn)
+        schemas.append("arch")
+
+    def base(schema: str) -> str:
+        hot_copy = " AND NOT EXISTS (SELECT 1 FROM main.items m WHERE m.id = i.id)" if schema == "arch" else ""
+        return (f"FROM {schema}.items_fts JOIN {schema}.items i ON i.rowid = items_fts.rowid "
+                f"WHERE {' AND '.join(where)}{hot_copy}")
+
+    for q in (query, fts_phrase_query(query)):
+        try:
+            total, rows = 0, []
+            for schema in schemas:
+                total += conn.execute(f"SELECT count(*) {base(schema)}", [q, *params]).fetchone()[0]
+                rows += conn.execute(
+                    f"""SELECT i.id, i.title, i.publisher, i.domain, i.url, i.tier, i.published_at, i.retrieved_at,
+                               bm25(items_fts, 10.0, 3.0, 1.0) AS rank,
+                               snippet(items_fts, -1, '[', ']', '…', 12) AS excerpt
+                        {base(schema)} ORDER BY rank LIMIT ? OFFSET ?""",
+                    [q, *params, limit, offset] if len(schemas) == 1 else [q, *params, offset + limit, 0]
+                ).fetchall()
+            if len(schemas) > 1:
+                rows = sorted(rows, key=lambda r: r["rank"])[offset:offset + limit]
+            return total, rows
+        except sqlite3.OperationalError:
+            if q != query:
+                raise
+    return 0, []
+
+def count_fts_matches(conn: sqlite3.Connection, match: str, start_ts: int, end_ts: int) -> int:
+    n = conn.execute(
+        """SELECT count(*) FROM items_fts JOIN items i ON i.rowid = items_fts.rowid
+           WHERE items_fts MATCH ? AND i.event_ts >= ? AND i.event_ts <= ?""",
+        (match, start_ts, end_ts)
+    ).fetchone()[0]
+    if archive.attach(conn, start_ts, end_ts):
+        archive.ensure_fts(conn)
+        n += conn.execute(
+            """SELECT count(*) FROM arch.items_fts JOIN arch.items i ON i.rowid = items_fts.rowid
+               WHERE items_fts MATCH ? AND i.event_ts >= ? AND i.event_ts <= ?
+                 AND NOT EXISTS (SELECT 1 FROM main.items m WHERE m.id = i.id)""",
+            (match, start_ts, end_ts)
+        ).fetchone()[0]
+    return n
+
+def get_fts_matches(conn: sqlite3.Connection, match: str, start_ts: int, end_ts: int, limit: int = 50) -> list[sqlite3.Row]:
+    """Hot items in [start_ts, end_ts] matching an FTS5 query, newest first (no archive fall-through)."""
+    return conn.execute(
+        """SELECT i.id, i.title, i.publisher, i.domain, i.url, i.cluster_id, i.event_ts
+           FROM items_fts JOIN items i ON i.rowid = items_fts.rowid
+           WHERE items_fts MATCH ? AND i.event_ts >= ? AND i.event_ts <= ?
+           ORDER BY i.event_ts DESC LIMIT ?""",
+        (match, start_ts, end_ts, limit)
+    ).fetchall()
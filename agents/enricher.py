@@ -0,0 +1,299 @@
+from __future__ import annotations
+import re, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from . import db as dbmod
+from . import instrument
+from .collector import USER_AGENT
+
+ENRICH_WORKERS = 8
+# Politeness per host: requests in flight, and minimum seconds between request starts
+PER_HOST_CONCURRENCY = 2
+PER_HOST_INTERVAL_S = 1.0
+FETCH_TIMEOUT_S = 15.0
+# Bounds on one article: bytes downloaded (the rest is dropped) and characters of text kept
+MAX_BYTES = 2_000_000
+MAX_TEXT_CHARS = 20_000
+# Failed fetches are retried on later runs until they have failed this many times
+MAX_ATTEMPTS = 3
+WRITE_BATCH = 50
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+class HostPool:
+    """Per-host keep-alive sessions, in-flight limits, request spacing and a robots.txt cache.
+
+    Shared by all enricher workers; each host gets its own requests.Session (connection pool of
+    `per_host`), so repeated articles from one site reuse connections.
+    """
+
+    def __init__(self, per_host: int = PER_HOST_CONCURRENCY, interval: float = PER_HOST_INTERVAL_S,
+                 timeout: float = FETCH_TIMEOUT_S):
+        self.per_host = per_host
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict[str, Any]] = {}
+
+    def _host(self, netloc: str) -> dict[str, Any]:
+        with self._lock:
+            h = self._hosts.get(netloc)
+            if h is None:
+                import requests
+                session = requests.Session()
+                session.headers["User-Agent"] = USER_AGENT
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                h = self._hosts[netloc] = {"session": session, "slots": threading.BoundedSemaphore(self.per_host),
+                                           "gate": threading.Lock(), "next": 0.0, "robots": None,
+                                           "robots_lock": threading.Lock()}
+            return h
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[Any]:
+        """Hold one of the host's in-flight slots, after waiting out its request spacing; yields the session."""
+        h = self._host(urlsplit(url).netloc)
+        with h["slots"]:
+            with h["gate"]:
+                wait = h["next"] - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                h["next"] = time.monotonic() + self.interval
+            yield h["session"]
+
+    def allowed(self, url: str) -> bool:
+        """robots.txt check for our user agent; each host's robots.txt is fetched once per pool.
+
+        As with urllib.robotparser: 401/403 disallow everything, other 4xx allow everything. A 5xx or
+        network failure disallows the host for this run.
+        """
+        parts = urlsplit(url)
+        h = self._host(parts.netloc)
+        with h["robots_lock"]:
+            if h["robots"] is None:
+                rp = RobotFileParser()
+                try:
+                    with self.slot(url) as session:
+                        r = session.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=self.timeout)
+                    instrument.add("http_bytes", len(r.content))
+                    if r.status_code in (401, 403):
+                        rp.disallow_all = True
+                    elif 400 <= r.status_code < 500:
+                        rp.allow_all = True
+                    elif r.status_code >= 500:
+                        rp.disallow_all = True
+                    else:
+                        rp.parse(r.text.splitlines())
+                except Exception:
+                    rp.disallow_all = True
+                h["robots"] = rp
+        return h["robots"].can_fetch(USER_AGENT, url)
+
+    def close(self) -> None:
+        for h in self._hosts.values():
+            h["session"].close()
+
+class _TextExtractor(HTMLParser):
+    """Paragraph text of a page, preferring paragraphs inside <article>/<main>; stops at `max_chars`."""
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "template", "iframe", "button"}
+    PARAS = {"p", "h2", "h3", "li", "blockquote"}
+    MIN_CHARS = 25
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.skip = 0
+        self.main = 0
+        self.para: list[str] | None = None
+        self.para_main = False
+        self.main_paras: list[str] = []
+        self.other_paras: list[str] = []
+        self.loose: list[str] = []
+        self.main_chars = 0
+
+    @property
+    def done(self) -> bool:
+        return self.main_chars >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip += 1
+        elif tag in ("article", "main"):
+            self.main += 1
+        elif tag in self.PARAS and not self.skip:
+            self._close_para()
+            self.para, self.para_main = [], self.main > 0
+        elif tag == "br" and self.para is not None:
+            self.para.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skip = max(0, self.skip - 1)
+        elif tag in ("article", "main"):
+            self._close_para()
+            self.main = max(0, self.main - 1)
+        elif tag in self.PARAS:
+            self._close_para()
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.para is not None:
+            self.para.append(data)
+        elif data.strip() and sum(map(len, self.loose)) < self.max_chars:
+            self.loose.append(data)
+
+    def _close_para(self):
+        if self.para is None:
+            return
+        text = re.sub(r"\s+", " ", "".join(self.para)).strip()
+        self.para = None
+        if len(text) < self.MIN_CHARS:
+            return
+        if self.para_main:
+            self.main_paras.append(text)
+            self.main_chars += len(text)
+        else:
+            self.other_paras.append(text)
+
+    def text(self) -> str:
+        self._close_para()
+        paras = self.main_paras or self.other_paras
+        if not paras:
+            paras = [re.sub(r"\s+", " ", "".join(self.loose)).strip()]
+        return "\n\n".join(paras)[:self.max_chars].strip()
+
+def extract_text(html: str, max_chars: int = MAX_TEXT_CHARS, chunk: int = 65536) -> str:
+    """Readable body text of an HTML page, at most `max_chars`; parsing stops once enough is collected."""
+    p = _TextExtractor(max_chars)
+    for i in range(0, len(html), chunk):
+        p.feed(html[i:i + chunk])
+        if p.done:
+            break
+    return p.text()
+
+def _read_bounded(r, started: float, timeout: float, max_bytes: int) -> bytes:
+    chunks, size = [], 0
+    for chunk in r.iter_content(chunk_size=65536):
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"download exceeded {timeout:g}s")
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    body = b"".join(chunks)[:max_bytes]
+    instrument.add("http_bytes", len(body))
+    return body
+
+def fetch_article(pool: HostPool, item: Any, max_bytes: int = MAX_BYTES, max_chars: int = MAX_TEXT_CHARS) -> dict[str, Any]:
+    """Fetch one item's page (conditionally, if it was fetched before) and extract its text.
+
+    Returns a result for db.save_enrichment; errors are reported in the result, not raised.
+    """
+    out: dict[str, Any] = {"item_id": item["id"], "status": "error", "http_status": None, "etag": None,
+                           "last_modified": None, "text": None, "error": None, "bytes": 0}
+    url = item["url"]
+    try:
+        if not pool.allowed(url):
+            out["status"] = "robots_disallowed"
+            return out
+        headers = {}
+        if item["etag"]:
+            headers["If-None-Match"] = item["etag"]
+        if item["last_modified"]:
+            headers["If-Modified-Since"] = item["last_modified"]
+        with pool.slot(url) as session:
+            started = time.monotonic()
+            with session.get(url, headers=headers, timeout=pool.timeout, stream=True) as r:
+                out["http_status"] = r.status_code
+                if r.status_code == 304:
+                    out["status"] = "not_modified"
+                    return out
+                r.raise_for_status()
+                out["etag"], out["last_modified"] = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                ctype = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if ctype and ctype not in TEXT_TYPES:
+                    out["status"] = "unsupported"
+                    out["error"] = ctype
+                    return out
+                body = _read_bounded(r, started, pool.timeout, max_bytes)
+                charset = "charset=" in r.headers.get("Content-Type", "").lower() and r.encoding
+        out["bytes"] = len(body)
+        doc = body.decode(charset or "utf-8", errors="replace")
+        text = doc[:max_chars].strip() if ctype == "text/plain" else extract_text(doc, max_chars)
+        out["text"] = text or None
+        out["status"] = "ok" if text else "empty"
+    except Exception as e:
+        out["status"], out["error"] = "error", str(e)
+    return out
+
+def _interleave_by_host(items: Iterable[Any]) -> list[Any]:
+    """Round-robin items across hosts (keeping each host's order) so workers are not all queued on one site."""
+    by_host: dict[str, list[Any]] = {}
+    for it in items:
+        by_host.setdefault(urlsplit(it["url"]).netloc, []).append(it)
+    out, queues = [], [iter(v) for v in by_host.values()]
+    while queues:
+        nxt = []
+        for q in queues:
+            it = next(q, None)
+            if it is not None:
+                out.append(it)
+                nxt.append(q)
+        queues = nxt
+    return out
+
+def run_enrichment(
+    db_path: str,
+    days: int = 2,
+    tiers: Iterable[str] = ("A", "B"),
+    limit: int = 200,
+    workers: int = ENRICH_WORKERS,
+    per_host: int = PER_HOST_CONCURRENCY,
+    interval: float = PER_HOST_INTERVAL_S,
+    timeout: float = FETCH_TIMEOUT_S,
+    refresh: bool = False,
+    max_bytes: int = MAX_BYTES,
+    max_chars: int = MAX_TEXT_CHARS,
+    session: dbmod.Session | None = None,
+) -> dict[str, Any]:
+    """Fetch article bodies for recent selected and `tiers` items into items.full_text_z.
+
+    Runs separately from collection (its own command), so slow publishers never hold up a daily run.
+    Workers only fetch and extract; this thread writes results in batches of WRITE_BATCH.
+    With `session`, results are written through its connection instead of one opened for `db_path`.
+    """
+    with dbmod.borrow(session, db_path) as conn:
+        since = int(time.time()) - days * 86400
+        items = dbmod.get_enrichment_candidates(conn, since, tiers, limit, refresh=refresh, max_attempts=MAX_ATTEMPTS)
+        summary: dict[str, Any] = {"candidates": len(items), "ok": 0, "not_modified": 0, "robots_disallowed": 0,
+                                   "unsupported": 0, "empty": 0, "error": 0, "bytes": 0, "text_chars": 0}
+        pool = HostPool(per_host=per_host, interval=interval, timeout=timeout)
+        pending: list[dict[str, Any]] = []
+
+        def flush():
+            if pending:
+                dbmod.save_enrichment(conn, pending)
+                pending.clear()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enricher") as ex:
+                futures = [ex.submit(fetch_article, pool, it, max_bytes, max_chars) for it in _interleave_by_host(items)]
+                for fut in as_completed(futures):
+                    res = fut.result()
+                    summary[res["status"]] += 1
+                    summary["bytes"] += res["bytes"]
+                    summary["text_chars"] += len(res["text"] or "")
+                    if res["status"] == "error":
+                        print(f"[enricher] {res['item_id']}: {res['error']}")
+                    pending.append(res)
+                    if len(pending) >= WRITE_BATCH:
+                        flush()
+            flush()
+        finally:
+            pool.close()
+        return summary
@@ -1,11 +1,12 @@
 from __future__ import annotations
 import os, re
-from docx import Document
+from .report import Report
 
 def markdown_to_docx(report_md_path: str, out_docx_path: str) -> str:
     with open(report_md_path, "r", encoding="utf-8") as f:
         lines = f.read().splitlines()
 
+    from docx import Document
     doc = Document()
     sup_re = re.compile(r"<sup>(\d+)</sup>")
 
@@ -30,6 +31,38 @@ def markdown_to_docx(report_md_path: str, out_docx_path: str) -> str:
     doc.save(out_docx_path)
     return out_docx_path
 
+def report_to_docx(report: Report, out_docx_path: str) -> str:
+    """Render the report model straight to docx (same layout as markdown_to_docx on its markdown)."""
+    from docx import Document
+    doc = Document()
+    doc.add_heading(report.title, level=1)
+    doc.add_paragraph("")
+
+    def add_section(section, blank_after=True):
+        doc.add_heading(section.heading, level=2)
+        for b in section.blocks:
+            style = None if b.indent else {"numbered": "List Number", "bullet": "List Bullet"}.get(b.kind)
+            p = doc.add_paragraph(style=style)
+            p.add_run(b.text if style == "List Bullet" else b.markdown(cites=False))
+            for n in b.cites:
+                p.add_run(str(n)).font.superscript = True
+        if blank_after:
+            doc.add_paragraph("")
+
+    for section in report.sections:
+        add_section(section)
+    doc.add_heading("Footnotes", level=2)
+    for fn in report.footnotes:
+        doc.add_paragraph(style="List Number").add_run(fn.markdown())
+    if report.appendices:
+        doc.add_paragraph("")
+    for i, section in enumerate(report.appendices, start=1):
+        add_section(section, blank_after=i < len(report.appendices))
+
+    os.makedirs(os.path.dirname(out_docx_path) or ".", exist_ok=True)
+    doc.save(out_docx_path)
+    return out_docx_path
+
 def _add_runs_with_superscript(paragraph, text):
     parts = re.split(r"(<sup>\d+</sup>)", text)
     for part in parts:
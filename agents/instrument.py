@@ -0,0 +1,130 @@
+from __future__ import annotations
+import cProfile, json, os, sqlite3, threading, time, datetime as dt
+from contextlib import contextmanager
+from typing import Any, Iterator
+from .utils import peak_rss_kb
+
+# Process-wide I/O counters. rows_read / rows_written are only counted on connections opened by
+# db.connect while a Recorder is active; http_bytes is counted by the collector's downloads.
+COUNTERS = {"rows_read": 0, "rows_written": 0, "http_bytes": 0}
+_lock = threading.Lock()
+_active = 0
+
+def active() -> bool:
+    return _active > 0
+
+def add(counter: str, n: int) -> None:
+    with _lock:
+        COUNTERS[counter] += n
+
+def counting_row(cursor: sqlite3.Cursor, row: tuple) -> sqlite3.Row:
+    """Row factory that counts every row handed back to Python."""
+    add("rows_read", 1)
+    return sqlite3.Row(cursor, row)
+
+class CountingConnection(sqlite3.Connection):
+    """Connection that adds its total_changes to the rows_written counter at each commit and when closed,
+    so a connection shared by several stages attributes writes to the stage that committed them."""
+    _counted = 0
+
+    def _count(self) -> None:
+        n = self.total_changes
+        add("rows_written", n - self._counted)
+        self._counted = n
+
+    def commit(self) -> None:
+        super().commit()
+        self._count()
+
+    def close(self) -> None:
+        self._count()
+        super().close()
+
+def _now_iso() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+def _seconds(ms: float | None) -> float | None:
+    return None if ms is None else ms / 1000
+
+class Recorder:
+    """Per-run timing and resource records for stages and sources.
+
+    Each record has wall and CPU seconds, the process peak RSS at the end of the stage, and the
+    rows read, rows written and HTTP bytes counted while it ran. With `profile_dir`, every stage
+    also runs under cProfile and dumps `<run_id>-<stage>.prof` (main thread only).
+    """
+
+    def __init__(self, run_id: str | None = None, profile_dir: str | None = None):
+        self.run_id = run_id or dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        self.profile_dir = profile_dir
+        self.records: list[dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._cpu = time.process_time()
+        self._io = dict(COUNTERS)
+
+    def __enter__(self) -> "Recorder":
+        global _active
+        _active += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global _active
+        _active -= 1
+
+    def _record(self, kind: str, name: str, **fields: Any) -> dict[str, Any]:
+        rec = {"run_id": self.run_id, "kind": kind, "name": name, "started_at": None, "wall_s": None,
+               "cpu_s": None, "peak_rss_kb": None, "rows_read": 0, "rows_written": 0, "http_bytes": 0,
+               "status": "ok", "error": None, "meta": {}}
+        rec.update(fields)
+        self.records.append(rec)
+        return rec
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict[str, Any]]:
+        """Time the block; the yielded record's "meta" dict can carry stage-specific numbers."""
+        rec = self._record("stage", name, started_at=_now_iso())
+        io = dict(COUNTERS)
+        prof = cProfile.Profile() if self.profile_dir else None
+        t0, c0 = time.perf_counter(), time.process_time()
+        if prof:
+            prof.enable()
+        try:
+            yield rec
+        except BaseException as e:
+            rec.update(status="error", error=str(e))
+            raise
+        finally:
+            if prof:
+                prof.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                prof.dump_stats(os.path.join(self.profile_dir, f"{self.run_id}-{name}.prof"))
+            rec.update(wall_s=round(time.perf_counter() - t0, 4), cpu_s=round(time.process_time() - c0, 4),
+                       peak_rss_kb=peak_rss_kb(), **{k: COUNTERS[k] - io[k] for k in COUNTERS})
+
+    def source(self, st: dict[str, Any]) -> dict[str, Any]:
+        """Record one collector source from its stats (latency, CPU, bytes, entries parsed, and the rows
+        its items inserted or updated; items kept and quarantined go in meta)."""
+        return self._record(
+            "source", st["name"], wall_s=_seconds(st.get("latency_ms")), cpu_s=_seconds(st.get("cpu_ms")),
+            rows_read=st.get("entries", 0), rows_written=st.get("inserted", 0) + st.get("updated", 0),
+            http_bytes=st.get("bytes", 0), status=st.get("status", "ok"), error=st.get("error"),
+            meta={"type": st.get("type"), "items": st.get("items", 0), "quarantined": st.get("quarantined", 0)},
+        )
+
+    def finish(self, name: str, status: str = "ok", error: str | None = None) -> dict[str, Any]:
+        """Whole-run record covering everything since the recorder was created."""
+        return self._record(
+            "run", name, wall_s=round(time.perf_counter() - self._started, 4),
+            cpu_s=round(time.process_time() - self._cpu, 4), peak_rss_kb=peak_rss_kb(), status=status, error=error,
+            **{k: COUNTERS[k] - self._io[k] for k in COUNTERS},
+        )
+
+    def write_jsonl(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for rec in self.records:
+                f.write(json.dumps(rec) + "\n")
+
+    def summary(self) -> list[dict[str, Any]]:
+        keys = ("kind", "name", "wall_s", "cpu_s", "peak_rss_kb", "rows_read", "rows_written", "http_bytes", "status")
+        return [{k: r[k] for k in keys} for r in self.records]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Any, Iterable
+
+THEME_LEXICON = {
+    "asylum": ["asylum", "asylum seeker", "asylum seekers", "asylum claim"],
+    "border": ["border", "crossing", "deport", "returns"],
+    "resettlement": ["resettlement", "third-country", "relocation"],
+    "funding": ["funding", "aid", "appeal", "shortfall", "donor"],
+    "camp_conditions": ["camp", "shelter", "winterization", "cholera", "food"]
+}
+
+REGION_HINTS = ["syria","sudan","ukraine","gaza","myanmar","congo","afghanistan","haiti","ethiopia","sahel"]
+
+GROUPS = ("keywords", "negatives", "themes", "regions")
+
+_END = ""
+
+def _trie_pattern(node: dict) -> str:
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if _END in node else body
+
+class Matcher:
+    """Every keyword, negative, theme phrase and region hint compiled into one pattern.
+
+    Semantics are case-insensitive substring matching, i.e. the same as `term.lower() in text.lower()`
+    for each term, but the text is scanned once whatever the number of terms. The pattern is the
+    terms' trie rendered as a regex inside a lookahead, so at each position the engine follows one
+    trie path and reports the longest term starting there; the shorter terms that are prefixes of it
+    are filled in from a table computed at build time.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str] = (),
+        negatives: Iterable[str] = (),
+        themes: dict[str, list[str]] | None = None,
+        regions: Iterable[str] = (),
+    ):
+        self.labels: dict[str, list[tuple[str, str]]] = {}
+        for k in keywords:
+            self._add(k, "keywords", k)
+        for n in negatives:
+            self._add(n, "negatives", n)
+        for theme, phrases in (themes or {}).items():
+            for p in phrases:
+                self._add(p, "themes", theme)
+        for rg in regions:
+            self._add(rg, "regions", rg)
+
+        trie: dict = {}
+        for term in self.labels:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[_END] = True
+        # term -> every term (itself included) that is a prefix of it
+        self.prefix_terms: dict[str, tuple[str, ...]] = {}
+        for term in self.labels:
+            node, found = trie, []
+            for i, ch in enumerate(term, start=1):
+                node = node[ch]
+                if _END in node:
+                    found.append(term[:i])
+            self.prefix_terms[term] = tuple(found)
+        self.pattern = re.compile(f"(?=({_trie_pattern(trie)}))", re.DOTALL) if trie else None
+
+    def _add(self, term: str, group: str, label: str) -> None:
+        t = term.lower()
+        if t and (group, label) not in self.labels.get(t, []):
+            self.labels.setdefault(t, []).append((group, label))
+
+    def scan(self, text: str | None) -> dict[str, set[str]]:
+        """All hits in one pass: {"keywords", "negatives", "themes", "regions"} -> set of labels."""
+        hits: dict[str, set[str]] = {g: set() for g in GROUPS}
+        if self.pattern is None or not text:
+            return hits
+        longest = {m.group(1) for m in self.pattern.finditer(text.lower())}
+        longest.discard("")
+        for term in longest:
+            for t in self.prefix_terms[term]:
+                for group, label in self.labels[t]:
+                    hits[group].add(label)
+        return hits
+
+    def keyword_hits(self, text: str | None) -> list[str]:
+        return sorted(self.scan(text)["keywords"])
+
+    def has_negative(self, text: str | None) -> bool:
+        return bool(self.scan(text)["negatives"])
+
+@lru_cache(maxsize=32)
+def get_matcher(keywords: tuple[str, ...] = (), negatives: tuple[str, ...] = ()) -> Matcher:
+    """Cached matcher for a keyword/negative set, always including the theme lexicon and region hints."""
+    return Matcher(keywords, negatives, THEME_LEXICON, REGION_HINTS)
+
+def matcher_for(query_pack: dict[str, Any]) -> Matcher:
+    return get_matcher(tuple(query_pack.get("keywords", [])), tuple(query_pack.get("negative_keywords", [])))
@@ -0,0 +1,57 @@
+from __future__ import annotations
+import hashlib, random, re
+
+# MinHash LSH: BANDS x ROWS permutations. Two items share a bucket with probability 1-(1-J^ROWS)^BANDS,
+# which is ~0.8 at Jaccard 0.6 and under 5% at 0.3 on title/snippet shingles.
+BANDS = 20
+ROWS = 5
+NUM_PERM = BANDS * ROWS
+SNIPPET_TOKENS = 40
+# A cluster sharing fewer buckets than this with a new item is only joined if the item's shingles
+# are at least MIN_JACCARD similar to those of the item it collided with
+MIN_BAND_VOTES = 2
+MIN_JACCARD = 0.5
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def shingles(title: str | None, snippet: str | None = None) -> set[str]:
+    """Unigrams and bigrams of the normalised title plus the first snippet tokens."""
+    toks = _TOKEN_RE.findall((title or "").lower())
+    out = set(toks) | {f"{a} {b}" for a, b in zip(toks, toks[1:])}
+    out.update(_TOKEN_RE.findall((snippet or "").lower())[:SNIPPET_TOKENS])
+    return out
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+def signature(sh: set[str]) -> list[int]:
+    """MinHash signature of a shingle set; empty for an empty set, which has nothing to match on."""
+    hs = [_h64(s) for s in sh]
+    if not hs:
+        return []
+    return [min((a * x + b) % _PRIME for x in hs) for a, b in _PERMS]
+
+def _bands(sig: list[int]) -> list[tuple[int, str]]:
+    out = []
+    for b in range(BANDS if sig else 0):
+        rows = ",".join(str(v) for v in sig[b * ROWS:(b + 1) * ROWS])
+        out.append((b, hashlib.blake2b(rows.encode("ascii"), digest_size=8).hexdigest()))
+    return out
+
+def shingle_keys(sh: set[str]) -> list[tuple[int, str]]:
+    """(band, bucket) pairs for a shingle set; none for an empty one."""
+    return _bands(signature(sh))
+
+def band_keys(title: str | None, snippet: str | None = None) -> list[tuple[int, str]]:
+    """(band, bucket) pairs for an item; items sharing any pair are near-duplicate candidates."""
+    return shingle_keys(shingles(title, snippet))
+
+# The keys every item without shingles was given before they got none (its signature was that of
+# a single 0 hash), for the migration that splits the cluster they were all merged into
+LEGACY_EMPTY_KEYS = _bands([b for _, b in _PERMS])
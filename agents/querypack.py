@@ -0,0 +1,174 @@
+from __future__ import annotations
+import copy, hashlib, json, os
+from typing import Any
+
+from .matcher import Matcher, THEME_LEXICON, REGION_HINTS
+
+# Compiled query packs: a pack file is hashed (sha256 of its bytes) and compiled once into a
+# CompiledPack holding its normalized settings, its keyword/negative/theme matcher and a domain
+# trie for source tiers. The settings and trie are written as JSON to
+# <cache dir>/<digest>-v<ARTIFACT_VERSION>.json (see cache_dir_for), so a pack is only normalized
+# again when its contents or this format change; the matcher's regexes are rebuilt from the
+# settings on load. Within a process, loads are served from memory until the file's mtime or size changes.
+
+# Bump whenever CompiledPack, DomainTrie, Matcher or normalize() change, or stale artifacts are loaded
+ARTIFACT_VERSION = 2
+
+_TIER = ""
+_loaded: dict[str, tuple[tuple[int, int], "CompiledPack"]] = {}
+_by_digest: dict[str, "CompiledPack"] = {}
+
+class QueryPack(dict):
+    """A pack's normalized settings, as a plain dict, carrying the CompiledPack it came from.
+
+    The matcher and tiers are those of the file; editing keywords or tiers in the dict does not
+    recompile them (edit the file instead).
+    """
+    compiled: "CompiledPack"
+
+class DomainTrie:
+    """Source tiers keyed by domain labels, last label first ("news.un.org" -> org, un, news).
+
+    A host matches a listed domain when it is that domain or a subdomain of it, so "notun.org"
+    does not match "un.org"; the longest listed suffix wins. Lookup cost depends on the number of
+    labels in the host, not on the number of listed domains.
+    """
+
+    def __init__(self, source_tiers: dict[str, list[str]] | None = None):
+        self.root: dict[str, Any] = {}
+        for tier, domains in (source_tiers or {}).items():
+            for d in domains:
+                self.add(d, tier)
+
+    @classmethod
+    def from_root(cls, root: dict[str, Any]) -> "DomainTrie":
+        """A trie around nodes saved from another trie's `root`."""
+        trie = cls()
+        trie.root = root
+        return trie
+
+    @staticmethod
+    def labels(domain: str) -> list[str]:
+        host = domain.strip().lower().split(":")[0].rstrip(".")
+        return host.split(".")[::-1] if host else []
+
+    def add(self, domain: str, tier: str) -> None:
+        """List a domain under a tier; a domain listed under several tiers keeps the first."""
+        node = self.root
+        for label in self.labels(domain):
+            node = node.setdefault(label, {})
+        if node is not self.root:
+            node.setdefault(_TIER, tier)
+
+    def tier(self, domain: str, default: str = "U") -> str:
+        node, found = self.root, default
+        for label in self.labels(domain):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(_TIER, found)
+        return found
+
+class CompiledPack:
+    """Everything collection needs from a query pack, built once per pack content."""
+
+    def __init__(self, settings: dict[str, Any], digest: str, domains: DomainTrie | None = None):
+        self.digest = digest
+        self.version = ARTIFACT_VERSION
+        self.settings = settings
+        self.matcher = Matcher(settings["keywords"], settings["negative_keywords"], THEME_LEXICON, REGION_HINTS)
+        self.domains = domains or DomainTrie(settings["source_tiers"])
+
+    def artifact(self) -> dict[str, Any]:
+        return {"version": self.version, "digest": self.digest, "settings": self.settings, "domains": self.domains.root}
+
+    @classmethod
+    def from_artifact(cls, doc: Any, digest: str) -> "CompiledPack | None":
+        """The pack saved by artifact(), or None if `doc` is not one for this digest and format."""
+        if not (isinstance(doc, dict) and doc.get("version") == ARTIFACT_VERSION and doc.get("digest") == digest
+                and isinstance(doc.get("settings"), dict) and isinstance(doc.get("domains"), dict)):
+            return None
+        return cls(doc["settings"], digest, DomainTrie.from_root(doc["domains"]))
+
+    def tier_for_domain(self, domain: str) -> str:
+        return self.domains.tier(domain)
+
+    def pack(self) -> QueryPack:
+        """A fresh settings dict for callers to use (and extend) as the query pack."""
+        q = QueryPack(copy.deepcopy(self.settings))
+        q.compiled = self
+        return q
+
+def normalize(raw: dict[str, Any]) -> dict[str, Any]:
+    """Settings with defaults filled in, keywords stripped and deduplicated, tier domains lower-cased."""
+    q = dict(raw)
+    for key in ("keywords", "negative_keywords"):
+        q[key] = list(dict.fromkeys(k.strip() for k in q.get(key, []) if k.strip()))
+    q["source_tiers"] = {tier: list(dict.fromkeys(d.strip().lower() for d in domains if d.strip()))
+                         for tier, domains in q.get("source_tiers", {}).items()}
+    q.setdefault("rss_feeds", [])
+    q["report"] = dict(q.get("report") or {})
+    return q
+
+def digest_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def cache_dir_for(db_path: str) -> str:
+    """Where artifacts for packs used with a database are kept: .cache/query_packs beside it."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ".cache", "query_packs")
+
+def compile_bytes(data: bytes, cache_dir: str | None = None) -> CompiledPack:
+    """The CompiledPack for a pack file's bytes: from memory, else the artifact in `cache_dir`, else
+    compiled (and, with `cache_dir`, written there)."""
+    digest = digest_of(data)
+    cp = _by_digest.get(digest)
+    if cp is not None:
+        return cp
+    path = os.path.join(cache_dir, f"{digest}-v{ARTIFACT_VERSION}.json") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cp = CompiledPack.from_artifact(json.load(f), digest)
+        except (OSError, ValueError, KeyError, TypeError):
+            cp = None
+    if cp is None:
+        cp = CompiledPack(normalize(json.loads(data)), digest)
+        if path:
+            _save(path, cp)
+    _by_digest[digest] = cp
+    return cp
+
+def _save(path: str, cp: CompiledPack) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cp.artifact(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError as e:
+        # a read-only location still works, compiling in memory every run
+        print(f"[querypack] could not cache {path}: {e}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def load(path: str, cache_dir: str | None = None) -> CompiledPack:
+    """The CompiledPack for a pack file, using artifacts in `cache_dir` (none: compiled in memory);
+    a repeat load in the same process only stats the file."""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    cached = _loaded.get(key)
+    if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size):
+        return cached[1]
+    with open(path, "rb") as f:
+        cp = compile_bytes(f.read(), cache_dir)
+    _loaded[key] = ((st.st_mtime_ns, st.st_size), cp)
+    return cp
+
+def compiled(query_pack: dict[str, Any]) -> CompiledPack:
+    """The CompiledPack behind a pack dict: the one it was loaded with, else one compiled from its
+    contents (kept in memory only, e.g. for packs built in code)."""
+    cp = getattr(query_pack, "compiled", None)
+    if cp is not None:
+        return cp
+    return compile_bytes(json.dumps(query_pack, sort_keys=True).encode("utf-8"), cache_dir=None)
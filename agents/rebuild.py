@@ -0,0 +1,134 @@
+from __future__ import annotations
+import json, os, datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from . import db as dbmod
+from .editor import qa_and_append
+from .trends import trends_from_rollups
+from .writer import compose_report, report_dir
+
+REBUILD_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Days of rollups each report's trend appendix looks back over (see trends.rolling_trends)
+TREND_SPAN_DAYS = 30
+
+# Per-worker state set by _init_worker: read-only session, rollup snapshot, output settings
+_worker: dict[str, Any] = {}
+
+def rollup_snapshot(conn, start: dt.date, end: dt.date, span: int = TREND_SPAN_DAYS) -> list[dict[str, Any]]:
+    """Every trend_rollup row any report in [start, end] needs, as plain dicts (picklable for workers)."""
+    first = (start - dt.timedelta(days=span - 1)).isoformat()
+    return [dict(r) for r in dbmod.get_rollups(conn, first, end.isoformat())]
+
+def _init_worker(db_path: str, rollups: list[dict[str, Any]], out_root: str, docx_dates: frozenset[str],
+                 pack: str = dbmod.DEFAULT_PACK) -> None:
+    _worker.update(session=dbmod.Session(db_path, readonly=True), rollups=rollups, out_root=out_root,
+                   docx_dates=docx_dates, pack=pack)
+
+def _atomic_write(path: str, write) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+def _write_text(text: str):
+    def write(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return write
+
+def rebuild_day(date_key: str) -> dict[str, Any] | None:
+    """Regenerate one date's report (and docx) from the worker's session and rollup snapshot.
+
+    Files are written to a temporary name and renamed into place. Returns the fields for the
+    reports row, or None when the date has no selection.
+    """
+    pack = _worker["pack"]
+    rows = dbmod.get_selected_items_for_date(_worker["session"].conn, date_key, pack)
+    if not rows:
+        return None
+    report = compose_report(date_key, rows, pack)
+    trends = trends_from_rollups(_worker["rollups"], dt.date.fromisoformat(date_key), (7, 30), TREND_SPAN_DAYS)
+    emeta = qa_and_append(report, trends=trends)
+    out_dir = report_dir(date_key, pack, _worker["out_root"])
+    report.path = _atomic_write(os.path.join(out_dir, "report.md"), _write_text(report.to_markdown()))
+    docx_path = None
+    if date_key in _worker["docx_dates"]:
+        from .export_docx import report_to_docx
+        docx_path = _atomic_write(os.path.join(out_dir, "report.docx"), lambda p: report_to_docx(report, p))
+    return {
+        "date": date_key,
+        "report_path": report.path,
+        "docx_path": docx_path,
+        "meta": {
+            "items_selected": len(rows),
+            "footnotes": emeta["footnotes"],
+            "tier_breakdown": emeta["tier_breakdown"],
+            "regions": report.regions,
+            "publishers": [p for p, _ in emeta["top_publishers"]],
+            "editor": emeta,
+        },
+    }
+
+def run_rebuild(
+    db_path: str,
+    start: dt.date,
+    end: dt.date,
+    workers: int = REBUILD_WORKERS,
+    out_root: str = "data",
+    export_docx: bool = False,
+    pack: str = dbmod.DEFAULT_PACK,
+) -> dict[str, Any]:
+    """Regenerate one pack's reports, appendices, docx files and reports.meta_json for every selected date in [start, end].
+
+    Workers each hold a read-only session and a copy of one rollup snapshot covering the whole
+    range, so no worker re-reads trend data per date. Only the parent writes to the database; fields
+    a rebuild cannot recompute (collector stats, items_collected) are kept from the existing meta.
+    docx is regenerated for dates that already had one, or for all dates with `export_docx`.
+    """
+    session = dbmod.Session(db_path)
+    conn = session.conn
+    dates = dbmod.get_selected_dates(conn, start.isoformat(), end.isoformat(), pack)
+    existing = dbmod.get_report_rows(conn, dates, pack)
+    rollups = rollup_snapshot(conn, start, end)
+    docx_dates = frozenset(d for d in dates if export_docx or (d in existing and existing[d]["docx_path"]))
+    init_args = (db_path, rollups, out_root, docx_dates, pack)
+    summary = {"dates": len(dates), "rebuilt": 0, "skipped": 0, "docx": 0, "failed": []}
+
+    def save(date_key: str, res: dict[str, Any] | None) -> None:
+        if res is None:
+            summary["skipped"] += 1
+            return
+        old = existing.get(date_key)
+        meta = json.loads(old["meta_json"] or "{}") if old else {"date": date_key, "items_collected": None}
+        meta.update(res["meta"], rebuilt_at=dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z")
+        dbmod.save_report_meta(conn, date_key, res["report_path"], res["docx_path"], meta, pack=pack)
+        summary["rebuilt"] += 1
+        summary["docx"] += res["docx_path"] is not None
+
+    if workers <= 1 or len(dates) <= 1:
+        _init_worker(*init_args)
+        try:
+            for d in dates:
+                try:
+                    save(d, rebuild_day(d))
+                except Exception as e:
+                    print(f"[rebuild] {d} failed: {e}")
+                    summary["failed"].append(d)
+        finally:
+            _worker.pop("session").close()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as ex:
+            futures = [(d, ex.submit(rebuild_day, d)) for d in dates]
+            for d, fut in futures:
+                try:
+                    save(d, fut.result())
+                except Exception as e:
+                    print(f"[rebuild] {d} failed: {e}")
+                    summary["failed"].append(d)
+    session.close()
+    return summary
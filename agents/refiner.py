@@ -1,53 +1,150 @@
 from __future__ import annotations
-import json, collections
+import json, math, datetime as dt
+from typing import Any, Iterable
 from . import db as dbmod
+from .matcher import get_matcher
+from .terms import fts_query, title_grams
+from .utils import to_epoch
 
-SAFE_EXPANSIONS = {
-    "refugee": ["refugee influx", "refugee camp", "refugee agency"],
-    "displaced": ["forced displacement", "mass displacement"],
-    "internally displaced": ["IDP camp", "IDP settlement"],
-    "asylum seeker": ["asylum application", "asylum claim"],
-    "resettlement": ["resettlement program", "third-country resettlement"]
-}
+# Emerging terms: title-gram counts over the last RECENT_DAYS (today included) against the
+# BASELINE_DAYS before them, scaled by item volume. A term bursts when it was seen at least
+# MIN_COUNT times and Z_THRESHOLD Poisson standard deviations above its expected count.
+RECENT_DAYS = 2
+BASELINE_DAYS = 28
+MIN_COUNT = 3
+Z_THRESHOLD = 3.0
+# A unigram is dropped in favour of a bursting bigram containing it that explains this share of it
+BIGRAM_SHARE = 0.5
+# Guardrails: a proposed term must be seen in this many near-duplicate clusters (not one syndicated story)
+MIN_CLUSTERS = 2
+MAX_PROPOSALS = 10
+EXAMPLE_TITLES = 3
+# Mission-statement words too generic to anchor a term to the mission
+GENERIC_MISSION_WORDS = {"monitor", "news", "reporting", "people", "persons"}
 
-def propose(db_path: str = dbmod.DB_PATH, query_pack_path: str = "config/query_pack.json") -> tuple[dict, str]:
+def detect_bursts(rows: Iterable[tuple[str, str, int]], totals: dict[str, int], recent_start: str) -> list[dict[str, Any]]:
+    """Bursting terms from day-ordered (day, gram, n) rows in one pass.
+
+    Rows before `recent_start` form the baseline. A term's expected recent count is its baseline
+    rate per item times the recent item volume (from `totals`, items per day), and its score is
+    z = (count - expected) / sqrt(expected + 1), so a term never seen before needs about
+    Z_THRESHOLD ** 2 recent hits. Sorted by z, highest first.
+    """
+    base: dict[str, int] = {}
+    recent: dict[str, int] = {}
+    for day, gram, n in rows:
+        side = recent if day >= recent_start else base
+        side[gram] = side.get(gram, 0) + n
+    base_items = sum(n for d, n in totals.items() if d < recent_start)
+    recent_items = sum(n for d, n in totals.items() if d >= recent_start)
+    out = []
+    for gram, count in recent.items():
+        if count < MIN_COUNT:
+            continue
+        b = base.get(gram, 0)
+        expected = recent_items * b / base_items if base_items else 0.0
+        z = (count - expected) / math.sqrt(expected + 1.0)
+        if z >= Z_THRESHOLD:
+            out.append({"term": gram, "count": count, "baseline": b, "expected": round(expected, 2), "z": round(z, 2)})
+    out.sort(key=lambda b: (-b["z"], b["term"]))
+    # "cholera outbreak" bursting makes "cholera" and "outbreak" burst too; keep the bigram
+    bigrams = [b for b in out if " " in b["term"]]
+    return [b for b in out if " " in b["term"] or not any(
+        b["term"] in g["term"].split() and g["count"] >= BIGRAM_SHARE * b["count"] for g in bigrams)]
+
+def mission_anchors(q: dict) -> set[str]:
+    """Words that tie a term to the mission: the mission statement's and current keywords' words."""
+    texts = [q.get("mission", ""), *q.get("keywords", [])]
+    return {w for t in texts for w in title_grams(t) if " " not in w} - GENERIC_MISSION_WORDS
+
+def guardrail(term: str, q: dict, anchors: set[str], evidence: dict[str, Any] | None) -> str | None:
+    """Why a bursting term may not be proposed, or None if it may."""
+    lowered = [k.lower() for k in q.get("keywords", [])]
+    if any(k in term for k in lowered):
+        return "already matched by a current keyword"
+    if any(n.lower() in term or term in n.lower() for n in q.get("negative_keywords", [])):
+        return "overlaps a negative keyword"
+    if not (anchors & set(term.split()) or get_matcher().scan(term)["themes"]):
+        return "not anchored to the mission (no mission, keyword or theme word)"
+    if evidence is not None:
+        if evidence["clusters"] < MIN_CLUSTERS:
+            return f"seen in {evidence['clusters']} story cluster(s) only"
+        if evidence["source_name"]:
+            return "names a source rather than a development"
+    return None
+
+def term_evidence(conn, term: str, start_ts: int, end_ts: int) -> dict[str, Any]:
+    """Titles, publishers and near-duplicate clusters of recent items whose title has the term."""
+    rows = dbmod.get_fts_matches(conn, fts_query(term), start_ts, end_ts)
+    sources = [f"{r['publisher'] or ''} {r['domain'] or ''}".lower() for r in rows]
+    return {
+        "items": len(rows),
+        "clusters": len({r["cluster_id"] or r["id"] for r in rows}),
+        "publishers": sorted({r["publisher"] or r["domain"] or "unknown" for r in rows}),
+        "source_name": bool(rows) and all(w in s for s in sources for w in term.split()),
+        "examples": [r["title"] for r in rows[:EXAMPLE_TITLES]],
+    }
+
+def propose(db_path: str = dbmod.DB_PATH, query_pack_path: str = "config/query_pack.json",
+            session: dbmod.Session | None = None, as_of: dt.date | None = None) -> tuple[dict, str]:
+    """Propose emerging title terms as keyword additions, with the evidence for each.
+
+    Reads only the per-day title_grams and item totals for the trailing window (plus a bounded
+    full-text lookup per bursting term), never the items themselves. The mission and existing
+    keywords are never changed; terms failing a guardrail are listed with the reason.
+    """
     with open(query_pack_path, "r", encoding="utf-8") as f:
         q = json.load(f)
-    conn = dbmod.connect(db_path)
-    rows = dbmod.get_items_since_days(conn, 14)
-    conn.close()
-
-    title_tokens = collections.Counter()
-    publishers = collections.Counter()
-    for r in rows:
-        title = (r["title"] or "").lower()
-        for tok in title.replace("/", " ").replace("-", " ").split():
-            tok = tok.strip(",.():;!?\"\'")
-            if len(tok) < 4:
-                continue
-            title_tokens[tok] += 1
-        publishers[r["domain"] or r["publisher"] or "unknown"] += 1
-
-    new_keywords = []
-    for kw in q["keywords"]:
-        for s in SAFE_EXPANSIONS.get(kw, []):
-            if s not in q["keywords"]:
-                new_keywords.append(s)
+    as_of = as_of or dt.datetime.utcnow().date()
+    recent_start = (as_of - dt.timedelta(days=RECENT_DAYS - 1)).isoformat()
+    first = (as_of - dt.timedelta(days=RECENT_DAYS + BASELINE_DAYS - 1)).isoformat()
+    start_ts, end_ts = to_epoch(f"{recent_start}T00:00:00Z"), to_epoch(f"{as_of.isoformat()}T23:59:59Z")
+    anchors = mission_anchors(q)
+
+    proposals, held = [], []
+    with dbmod.borrow(session, db_path) as conn:
+        totals = dbmod.get_daily_totals(conn, first, as_of.isoformat())
+        bursts = detect_bursts(dbmod.get_title_grams(conn, first, as_of.isoformat()), totals, recent_start)
+        fts = dbmod.has_fts(conn)
+        for b in bursts:
+            if len(proposals) == MAX_PROPOSALS:
+                break
+            reason = guardrail(b["term"], q, anchors, None)
+            if reason is None:
+                b["evidence"] = term_evidence(conn, b["term"], start_ts, end_ts) if fts else None
+                reason = guardrail(b["term"], q, anchors, b["evidence"])
+            if reason:
+                held.append(dict(b, reason=reason))
+            else:
+                proposals.append(b)
 
     proposed = dict(q)
     proposed["version"] = int(q.get("version",1)) + 1
-    proposed["keywords"] = sorted(set(q["keywords"] + new_keywords))
+    proposed["keywords"] = sorted(set(q["keywords"]) | {p["term"] for p in proposals})
 
+    recent_items = sum(n for d, n in totals.items() if d >= recent_start)
     rationale_lines = [
         "# Query Pack Proposal Rationale",
         "",
-        "Guardrails: mission unchanged; only safe term expansions proposed; no source auto-removals.",
+        "Guardrails: mission unchanged; additions only; each term is bursting in titles, tied to the mission "
+        f"vocabulary, not covered by a current or negative keyword, and seen in at least {MIN_CLUSTERS} story clusters.",
         "",
-        f"Observed items in last 14 days: {len(rows)}",
-        f"Top publishers/domains: {publishers.most_common(10)}",
-        f"Top title tokens: {title_tokens.most_common(20)}",
+        f"Window: {recent_start}..{as_of.isoformat()} ({recent_items} items) against the {BASELINE_DAYS} days before "
+        f"({sum(totals.values()) - recent_items} items); burst when count >= {MIN_COUNT} and z >= {Z_THRESHOLD}.",
         "",
         "Proposed additions:",
-    ] + [f"- {k}" for k in new_keywords]
+    ]
+    for p in proposals:
+        rationale_lines.append(f"- {p['term']}: {p['count']} titles (expected {p['expected']}, "
+                               f"baseline {p['baseline'] / BASELINE_DAYS:.2f}/day), z={p['z']}")
+        ev = p.get("evidence")
+        if ev:
+            rationale_lines.append(f"  - {ev['clusters']} story clusters; publishers: {', '.join(ev['publishers'][:5])}")
+            rationale_lines += [f"  - \"{t}\"" for t in ev["examples"]]
+    if not proposals:
+        rationale_lines.append("- (none)")
+    if held:
+        rationale_lines += ["", "Bursting but held back:"]
+        rationale_lines += [f"- {h['term']} ({h['count']} titles, z={h['z']}): {h['reason']}" for h in held[:20]]
 
     return proposed, "\n".join(rationale_lines)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+@dataclass
+class Block:
+    """One list item or paragraph. `text` is inline markdown without citation markers."""
+    kind: str  # bullet | numbered | text
+    text: str
+    cites: list[int] = field(default_factory=list)
+    number: int | None = None
+    indent: int = 0
+
+    def markdown(self, cites: bool = True) -> str:
+        sups = "".join(f"<sup>{n}</sup>" for n in self.cites) if cites else ""
+        marker = {"bullet": "- ", "numbered": f"{self.number}. "}.get(self.kind, "")
+        return f"{'  ' * self.indent}{marker}{self.text}{sups}"
+
+@dataclass
+class Section:
+    heading: str
+    blocks: list[Block] = field(default_factory=list)
+
+@dataclass
+class Footnote:
+    number: int
+    item_id: str
+    publisher: str
+    title: str
+    date: str
+    url: str
+    accessed: str
+
+    def markdown(self) -> str:
+        return f"{self.number}. {self.publisher}, “{self.title},” {self.date}, {self.url} (accessed {self.accessed})."
+
+@dataclass
+class Report:
+    """A daily brief: body sections, footnotes, and the appendices the editor adds after QA.
+
+    `rows` are the selected items the report was built from, so later stages need not re-query
+    them. Markdown and docx are both rendered from this object.
+    """
+    date: str
+    title: str
+    sections: list[Section] = field(default_factory=list)
+    footnotes: list[Footnote] = field(default_factory=list)
+    appendices: list[Section] = field(default_factory=list)
+    rows: list[Any] = field(default_factory=list, repr=False)
+    regions: list[str] = field(default_factory=list)
+    path: str | None = None
+
+    def body_lines(self) -> Iterator[tuple[str, str]]:
+        """(kind, markdown line) for the title, sections and footnotes; kind is h1|h2|blank|bullet|numbered|text."""
+        yield "h1", f"# {self.title}"
+        yield "blank", ""
+        for s in self.sections:
+            yield "h2", f"## {s.heading}"
+            for b in s.blocks:
+                yield b.kind, b.markdown()
+            yield "blank", ""
+        yield "h2", "## Footnotes"
+        for fn in self.footnotes:
+            yield "numbered", fn.markdown()
+
+    def appendix_lines(self) -> Iterator[tuple[str, str]]:
+        for s in self.appendices:
+            yield "h2", f"## {s.heading}"
+            for b in s.blocks:
+                yield b.kind, b.markdown()
+            yield "blank", ""
+
+    def body_markdown(self) -> str:
+        return "\n".join(ln for _, ln in self.body_lines()) + "\n"
+
+    def appendix_markdown(self) -> str:
+        return "\n".join([""] + [ln for _, ln in self.appendix_lines()]) if self.appendices else ""
+
+    def to_markdown(self) -> str:
+        return self.body_markdown() + self.appendix_markdown()
+
+    def write_markdown(self, path: str | None = None) -> str:
+        self.path = path or self.path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(self.to_markdown())
+        return self.path
+
+    def citation_count(self) -> int:
+        return sum(len(b.cites) for s in self.sections for b in s.blocks)
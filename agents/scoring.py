@@ -0,0 +1,42 @@
+from __future__ import annotations
+import datetime as dt
+from typing import Any, Sequence
+
+TIER_WEIGHTS = {"A": 3.0, "B": 2.0, "C": 1.0, "U": 0.7}
+
+# recency() falls by 1 per DECAY_S of age until it bottoms out at LINEAR_AGE_S, so within that span
+# every dated item loses score at the same rate and their order never changes
+DECAY_S = 48 * 3600
+LINEAR_AGE_S = 1.4 * DECAY_S
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+_US = dt.timedelta(microseconds=1)
+
+def static_score(tier: str | None, keywords: Sequence[str]) -> float:
+    """Time-independent part of an item's score: tier weight + capped keyword bonus."""
+    return TIER_WEIGHTS.get(tier, 0.7) + min(len(keywords), 4) * 0.5
+
+def epoch_us(now: dt.datetime | None = None) -> int:
+    """Integer microseconds since the epoch, so ages match datetime subtraction exactly."""
+    return ((now or dt.datetime.now(dt.timezone.utc)) - _EPOCH) // _US
+
+def recency(published_ts: int | None, now_us: int) -> float:
+    if published_ts is None:
+        return 1.0
+    age_h = max((now_us - published_ts * 1_000_000) / 1_000_000 / 3600, 0)
+    return max(0.1, 1.5 - min(age_h / 48, 1.4))
+
+def score_rows(rows: Sequence[Any], now_us: int) -> list[float]:
+    """Scores for a chunk of rows carrying precomputed `static_score` and `published_ts`."""
+    return [round((r["static_score"] if r["static_score"] is not None else 0.7) + recency(r["published_ts"], now_us), 3)
+            for r in rows]
+
+def decay_key(static: float | None, published_ts: int | None) -> float:
+    """Time-independent ranking key behind score_rows.
+
+    For a dated item this is static + 1.5 + published_ts / DECAY_S, and its unrounded score at
+    time t is key - t / DECAY_S while its age is within [0, LINEAR_AGE_S] (less when it is
+    future-dated). An undated item scores static + 1.0 whatever the time, which is its key.
+    """
+    static = static if static is not None else 0.7
+    return static + 1.0 if published_ts is None else static + 1.5 + published_ts / DECAY_S
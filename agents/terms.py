@@ -0,0 +1,37 @@
+from __future__ import annotations
+import re
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Tokens shorter than this, numbers and these words are not counted and break bigrams
+MIN_TOKEN_LEN = 3
+STOPWORDS = frozenset("""
+a about after again against all also amid an and any are as at be been before but by can could did do does
+for from had has have he her his how if in into is it its just more most new not now of off on one or other
+our out over says said she so some than that the their them then there these they this those through to
+two under up us very was we were what when where which while who why will with would you your
+""".split())
+
+def _kept(tok: str) -> bool:
+    return len(tok) >= MIN_TOKEN_LEN and not tok.isdigit() and tok not in STOPWORDS
+
+def title_grams(title: str | None) -> set[str]:
+    """Distinct unigrams and bigrams of a title's lower-cased word tokens.
+
+    Stopwords, numbers and short tokens are dropped and a bigram never spans one, so "return to
+    Sudan" gives "return" and "sudan" but no bigram.
+    """
+    out: set[str] = set()
+    prev = None
+    for tok in _TOKEN_RE.findall((title or "").lower()):
+        if not _kept(tok):
+            prev = None
+            continue
+        out.add(tok)
+        if prev is not None:
+            out.add(f"{prev} {tok}")
+        prev = tok
+    return out
+
+def fts_query(gram: str) -> str:
+    """FTS5 query matching a gram's words as a phrase in item titles."""
+    return "{title} : \"" + gram.replace('"', '""') + "\""
@@ -1,16 +1,10 @@
 from __future__ import annotations
-import json, collections
+import json, collections, datetime as dt
 from . import db as dbmod
-
-THEME_LEXICON = {
-    "asylum": ["asylum", "asylum seeker", "asylum seekers", "asylum claim"],
-    "border": ["border", "crossing", "deport", "returns"],
-    "resettlement": ["resettlement", "third-country", "relocation"],
-    "funding": ["funding", "aid", "appeal", "shortfall", "donor"],
-    "camp_conditions": ["camp", "shelter", "winterization", "cholera", "food"]
-}
+from .matcher import THEME_LEXICON, get_matcher
 
 def _scan(rows):
+    matcher = get_matcher()
     kw_counter = collections.Counter()
     pub_counter = collections.Counter()
     tier_counter = collections.Counter()
@@ -26,9 +20,8 @@ def _scan(rows):
             kw_counter.update(kws)
         except Exception:
             pass
-        for theme, phrases in THEME_LEXICON.items():
-            if any(p.lower() in txt for p in phrases):
-                theme_counter[theme] += 1
+        found = matcher.scan(txt)["themes"]
+        theme_counter.update(t for t in THEME_LEXICON if t in found)
     return {
         "keywords": kw_counter.most_common(15),
         "publishers": pub_counter.most_common(10),
@@ -36,9 +29,101 @@ def _scan(rows):
         "themes": theme_counter.most_common()
     }
 
-def rolling_trends(db_path: str = dbmod.DB_PATH) -> dict:
-    conn = dbmod.connect(db_path)
-    rows7 = dbmod.get_items_since_days(conn, 7)
-    rows30 = dbmod.get_items_since_days(conn, 30)
-    conn.close()
-    return {"7d": _scan(rows7), "30d": _scan(rows30), "counts": {"7d": len(rows7), "30d": len(rows30)}}
+# rollup dim -> (output name, top-N; None keeps every key)
+DIMS = {"keyword": ("keywords", 15), "publisher": ("publishers", 10), "tier": ("tiers", None), "theme": ("themes", None)}
+
+def summarize_rollups(rollups, as_of: dt.date, days: int) -> dict:
+    """Trend summary for the `days` calendar days ending on `as_of`, from trend_rollup rows."""
+    first = (as_of - dt.timedelta(days=days - 1)).isoformat()
+    last = as_of.isoformat()
+    totals = {dim: collections.Counter() for dim in DIMS}
+    count = 0
+    for r in rollups:
+        if not first <= r["day"] <= last:
+            continue
+        if r["dim"] == "total":
+            count += r["n"]
+        elif r["dim"] in totals:
+            totals[r["dim"]][r["key"]] += r["n"]
+    out = {}
+    for dim, (name, top) in DIMS.items():
+        ranked = sorted(totals[dim].items(), key=lambda kv: (-kv[1], kv[0]))
+        out[name] = dict(ranked) if dim == "tier" else ranked[:top]
+    out["count"] = count
+    return out
+
+def series_from_rollups(rollups, as_of: dt.date, days: int, keys: dict[str, list[str]] | None = None) -> dict:
+    """Per-day counts over the `days` days ending on `as_of`: {"days", "totals", <dim name>: {key: [n per day]}}.
+
+    `keys` limits each dim (by output name) to the given keys; by default every key seen is kept.
+    """
+    day_list = [(as_of - dt.timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1)]
+    pos = {d: i for i, d in enumerate(day_list)}
+    out = {"days": day_list, "totals": [0] * days}
+    out.update({name: {} for name, _ in DIMS.values()})
+    for r in rollups:
+        i = pos.get(r["day"])
+        if i is None:
+            continue
+        if r["dim"] == "total":
+            out["totals"][i] += r["n"]
+            continue
+        if r["dim"] not in DIMS:
+            continue
+        name = DIMS[r["dim"]][0]
+        if keys is not None and r["key"] not in keys.get(name, ()):
+            continue
+        out[name].setdefault(r["key"], [0] * days)[i] += r["n"]
+    return out
+
+def trends_from_rollups(rollups, as_of: dt.date, windows: tuple[int, ...] = (7, 30), series_days: int = 30) -> dict:
+    out: dict = {}
+    for n in windows:
+        summary = summarize_rollups(rollups, as_of, n)
+        out.setdefault("counts", {})[f"{n}d"] = summary.pop("count")
+        out[f"{n}d"] = summary
+    widest = out[f"{max(windows)}d"]
+    keys = {name: [k for k, _ in (widest[name].items() if isinstance(widest[name], dict) else widest[name])]
+            for name, _ in DIMS.values()}
+    out["series"] = series_from_rollups(rollups, as_of, series_days, keys)
+    return out
+
+def theme_fts_query(phrases: list[str]) -> str:
+    """FTS5 query for a theme: any phrase as a word-prefix match in title or snippet."""
+    quoted = ['"' + p.replace('"', '""') + '"*' for p in phrases]
+    return "{title snippet} : (" + " OR ".join(quoted) + ")"
+
+def theme_counts_fts(conn, start_ts: int, end_ts: int) -> list[tuple[str, int]]:
+    """Theme counts over [start_ts, end_ts] from the FTS index instead of scanning rows in Python.
+
+    FTS matches whole-word prefixes ("deport" finds "deported" but not "redeport"), so counts can be
+    slightly below the substring counts kept in trend_rollup.
+    """
+    counts = {theme: dbmod.count_fts_matches(conn, theme_fts_query(ps), start_ts, end_ts) for theme, ps in THEME_LEXICON.items()}
+    return sorted(((t, n) for t, n in counts.items() if n), key=lambda kv: (-kv[1], kv[0]))
+
+def trend_window(db_path: str = dbmod.DB_PATH, days: int = 7, as_of: dt.date | None = None,
+                 session: dbmod.Session | None = None) -> dict:
+    """Trend summary for an arbitrary N-day window, summed from at most N days of rollup rows."""
+    as_of = as_of or dt.datetime.utcnow().date()
+    with dbmod.borrow(session, db_path) as conn:
+        rows = dbmod.get_rollups(conn, (as_of - dt.timedelta(days=days - 1)).isoformat(), as_of.isoformat())
+    return summarize_rollups(rows, as_of, days)
+
+def rolling_trends(db_path: str = dbmod.DB_PATH, as_of: dt.date | None = None, series_days: int = 30,
+                   theme_source: str = "rollup", session: dbmod.Session | None = None) -> dict:
+    """7-day and 30-day trends plus a per-day series, read from trend_rollup (cost independent of archive size).
+
+    Windows are calendar days (UTC) ending on `as_of`, today by default. theme_source="fts" takes
+    the window theme counts from the full-text index instead of the rollups.
+    """
+    as_of = as_of or dt.datetime.utcnow().date()
+    span = max(30, series_days)
+    with dbmod.borrow(session, db_path) as conn:
+        rows = dbmod.get_rollups(conn, (as_of - dt.timedelta(days=span - 1)).isoformat(), as_of.isoformat())
+        out = trends_from_rollups(rows, as_of, (7, 30), series_days)
+        if theme_source == "fts" and dbmod.has_fts(conn):
+            end_ts = int(dt.datetime.combine(as_of + dt.timedelta(days=1), dt.time(), dt.timezone.utc).timestamp()) - 1
+            for n in (7, 30):
+                out[f"{n}d"]["themes"] = theme_counts_fts(conn, end_ts + 1 - n * 86400, end_ts)
+    return out
@@ -1,7 +1,10 @@
 from __future__ import annotations
 import hashlib
 import re
+import datetime as dt
+import sys
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from .matcher import get_matcher
 
 TRACKING_PARAMS = {"utm_source","utm_medium","utm_campaign","utm_term","utm_content","fbclid","gclid"}
 
@@ -26,16 +29,41 @@ def norm_text(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "")).strip()
 
 def has_negative(text: str, negatives: list[str]) -> bool:
-    t = (text or "").lower()
-    return any(n.lower() in t for n in negatives)
+    return get_matcher(negatives=tuple(negatives)).has_negative(text)
 
 def keyword_hits(text: str, keywords: list[str]) -> list[str]:
-    t = (text or "").lower()
-    hits = [k for k in keywords if k.lower() in t]
-    return sorted(set(hits))
+    return get_matcher(keywords=tuple(keywords)).keyword_hits(text)
+
+def to_epoch(value: str | None) -> int | None:
+    """UTC epoch seconds for an ISO-8601 (or other dateutil-parsable) timestamp; naive values are taken as UTC."""
+    if not value:
+        return None
+    try:
+        t = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        from dateutil import parser as dtparser
+        try:
+            t = dtparser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=dt.timezone.utc)
+    return int(t.timestamp())
+
+def iso_from_epoch(ts: float) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 def domain_from_url(url: str) -> str:
     try:
         return urlparse(url).netloc.lower().replace("www.","")
     except Exception:
         return ""
+
+def peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KiB (None where the resource module is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
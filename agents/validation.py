@@ -0,0 +1,114 @@
+from __future__ import annotations
+import json, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+# Runtime checks against schemas/*.schema.json with jsonschema's Draft7Validator, built once per
+# schema per process. jsonschema is imported on first use, so commands that never check a
+# document (search, status, ...) do not pay its import cost.
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas")
+RAW_ITEM = "raw_item"
+REPORT_META = "report_meta"
+REQUIRED_HEADERS = (
+    "# Displacement Watch Brief",
+    "## Executive Summary",
+    "## Top Developments",
+    "## Footnotes",
+    "## Appendix A: Quality & Methods Notes",
+    "## Appendix B: Trend Signals",
+)
+# Errors kept per document; the rest are counted
+MAX_ERRORS = 5
+VALIDATE_WORKERS = min(8, os.cpu_count() or 1)
+
+class Validator:
+    """A schema's Draft7Validator, checked and built once; `errors(doc)` lists what is wrong with a
+    document (empty if valid), each prefixed with where ("publisher: ...", "(root): ...")."""
+
+    def __init__(self, schema: dict[str, Any], name: str = ""):
+        from jsonschema import Draft7Validator
+        Draft7Validator.check_schema(schema)
+        self.name = name
+        self.schema = schema
+        self._validator = Draft7Validator(schema)
+
+    def errors(self, doc: Any) -> list[str]:
+        return [f"{e.json_path.removeprefix('$.') if e.path else '(root)'}: {e.message}"
+                for e in self._validator.iter_errors(doc)]
+
+    def partition(self, docs: Iterable[Any]) -> tuple[list[Any], list[tuple[Any, list[str]]]]:
+        """(valid documents, [(invalid document, errors)]), both in input order."""
+        valid, invalid = [], []
+        for d in docs:
+            errors = self.errors(d)
+            if errors:
+                invalid.append((d, errors))
+            else:
+                valid.append(d)
+        return valid, invalid
+
+_validators: dict[str, Validator] = {}
+
+def validator(name: str) -> Validator:
+    """The validator for schemas/<name>.schema.json (built on first use)."""
+    v = _validators.get(name)
+    if v is None:
+        with open(os.path.join(SCHEMA_DIR, f"{name}.schema.json"), "r", encoding="utf-8") as f:
+            v = _validators[name] = Validator(json.load(f), name)
+    return v
+
+def screen_items(items: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[tuple[dict[str, Any], list[str]]]]:
+    """Split collected items into (schema-valid, [(invalid, errors)]) for the write path."""
+    return validator(RAW_ITEM).partition(items)
+
+def check_report(date: str, row: Any | None, report_path: str) -> dict[str, Any]:
+    """Problems with one day's report: meta_json (from its reports row, if any) against report_meta,
+    and the report's required headers. `report_path` is where to look when there is no row."""
+    out: dict[str, Any] = {"date": date, "errors": []}
+    path = row["report_path"] if row is not None else report_path
+    if row is None and not os.path.exists(path):
+        out["status"] = "missing"
+        return out
+    errors = out["errors"]
+    if row is not None and not row["meta_json"]:
+        errors.append("meta_json: missing")
+    elif row is not None:
+        try:
+            meta = json.loads(row["meta_json"])
+        except ValueError as e:
+            errors.append(f"meta_json: not JSON ({e})")
+        else:
+            errors += [f"meta_json: {e}" for e in validator(REPORT_META).errors(meta)]
+            if isinstance(meta, dict) and meta.get("date") not in (None, date):
+                errors.append(f"meta_json: date {meta['date']!r} does not match the report date")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, TypeError) as e:
+        errors.append(f"report: cannot read {path} ({e.__class__.__name__})")
+    else:
+        errors += [f"report: missing header {h!r}" for h in REQUIRED_HEADERS if h not in text]
+    out["status"] = "invalid" if errors else "ok"
+    if len(errors) > MAX_ERRORS:
+        out["errors"] = errors[:MAX_ERRORS] + [f"... {len(errors) - MAX_ERRORS} more"]
+    return out
+
+def validate_reports(dates: list[str], rows: dict[str, Any], report_path: Callable[[str], str],
+                     workers: int = VALIDATE_WORKERS) -> dict[str, Any]:
+    """Check each date's report on a thread pool; a summary with the problems found.
+
+    `rows` maps dates to their reports rows; a date without one is checked at `report_path(date)`
+    (headers only) and is missing if there is no file. The work per day is one small file read and
+    a schema check, so threads overlapping the reads are enough; worker processes would cost more
+    to start than they save.
+    """
+    validator(REPORT_META)  # built once, before the workers share it
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="validate") as ex:
+        results = list(ex.map(lambda d: check_report(d, rows.get(d), report_path(d)), dates))
+    counts = {"ok": 0, "invalid": 0, "missing": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    return {"days": len(dates), **counts,
+            "problems": [{"date": r["date"], "errors": r["errors"]} for r in results if r["status"] == "invalid"],
+            "missing_dates": [r["date"] for r in results if r["status"] == "missing"]}
@@ -0,0 +1,265 @@
+from __future__ import annotations
+import signal, threading, time, datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable
+from . import db as dbmod, validation
+from .utils import iso_from_epoch
+from .collector import (FETCH_WORKERS, MAX_SEEN_IDS, SOURCE_TIMEOUT_S, USER_AGENT, _is_timeout, collect_feed,
+                        evaluate_packs, fetch_gdelt, filter_gdelt, pack_name, select_packs)
+
+# Adaptive polling: each source's interval tracks TARGET_NEW_PER_POLL / its publish rate (an EWMA
+# of new entries per second, weight RATE_ALPHA), within these bounds (seconds). A quiet source's
+# interval at most doubles per poll.
+MIN_INTERVAL_S = 300
+MAX_INTERVAL_S = 6 * 3600
+DEFAULT_INTERVAL_S = 900
+TARGET_NEW_PER_POLL = 1.0
+RATE_ALPHA = 0.3
+LATENCY_ALPHA = 0.3
+# Circuit breaker: consecutive failures that suspend a source, and its cool-down (doubling per
+# further failure, capped); after the cool-down one trial poll decides whether it closes again
+FAILURE_THRESHOLD = 3
+COOLDOWN_S = 900
+MAX_COOLDOWN_S = 12 * 3600
+# Longest single sleep of the loop (seconds), so a stop request or clock change is noticed
+MAX_SLEEP_S = 60.0
+
+def next_interval(interval: float, rate: float | None, new: int, elapsed: float | None,
+                  lo: float = MIN_INTERVAL_S, hi: float = MAX_INTERVAL_S) -> tuple[float, float | None]:
+    """(next interval, updated publish rate) after a successful poll that found `new` entries.
+
+    `elapsed` is the time since the previous successful poll; without it (first poll) the rate is
+    left unset and the interval kept, since everything in a first fetch looks new.
+    """
+    if elapsed is None or elapsed <= 0:
+        return interval, rate
+    observed = new / elapsed
+    rate = observed if rate is None else RATE_ALPHA * observed + (1 - RATE_ALPHA) * rate
+    target = TARGET_NEW_PER_POLL / rate if rate > 0 else hi
+    return max(lo, min(hi, target, interval * 2)), rate
+
+def circuit(state: dict[str, Any], now: float) -> str:
+    """"closed" (polling normally), "open" (suspended until open_until) or "half_open" (trial poll due)."""
+    if (state.get("failures") or 0) < FAILURE_THRESHOLD:
+        return "closed"
+    return "open" if now < (state.get("open_until") or 0) else "half_open"
+
+def record_success(state: dict[str, Any], now: float, new: int, latency_ms: float, status: str = "ok",
+                   lo: float = MIN_INTERVAL_S, hi: float = MAX_INTERVAL_S) -> None:
+    elapsed = now - state["last_ok_ts"] if state.get("last_ok_ts") else None
+    state["interval_s"], state["new_rate"] = next_interval(state.get("interval_s") or DEFAULT_INTERVAL_S,
+                                                           state.get("new_rate"), new, elapsed, lo, hi)
+    ewma = state.get("latency_ewma_ms")
+    state.update(
+        last_poll_ts=int(now), last_ok_ts=int(now), last_status=status, last_error=None, failures=0, open_until=None,
+        latency_ms=latency_ms, polls=(state.get("polls") or 0) + 1, new_entries=(state.get("new_entries") or 0) + new,
+        latency_ewma_ms=round(latency_ms if ewma is None else LATENCY_ALPHA * latency_ms + (1 - LATENCY_ALPHA) * ewma, 1),
+        next_poll_ts=int(now + state["interval_s"]),
+    )
+
+def record_failure(state: dict[str, Any], now: float, status: str, error: str) -> None:
+    """Count a failed poll; at FAILURE_THRESHOLD consecutive failures the circuit opens."""
+    failures = (state.get("failures") or 0) + 1
+    state.update(last_poll_ts=int(now), last_status=status, last_error=error[:500], failures=failures,
+                 polls=(state.get("polls") or 0) + 1)
+    if failures >= FAILURE_THRESHOLD:
+        cooldown = min(MAX_COOLDOWN_S, COOLDOWN_S * 2 ** (failures - FAILURE_THRESHOLD))
+        state.update(open_until=int(now + cooldown), next_poll_ts=int(now + cooldown))
+    else:
+        state["next_poll_ts"] = int(now + (state.get("interval_s") or DEFAULT_INTERVAL_S))
+
+def next_cutoff(now: float, cutoff: str) -> float:
+    """Epoch of the first daily `cutoff` ("HH:MM", UTC) after `now`."""
+    hh, mm = (int(x) for x in cutoff.split(":"))
+    t = dt.datetime.fromtimestamp(now, dt.timezone.utc).replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if t.timestamp() <= now:
+        t += dt.timedelta(days=1)
+    return t.timestamp()
+
+class Watcher:
+    """Long-running collector: polls each feed (and GDELT query) on its own adaptive schedule.
+
+    One HTTP session (keep-alive pool shared by the fetch workers) and one database Session live
+    for the whole process. Fetches run on a worker pool; parsing results are written on the calling
+    thread. Scheduling and health state is kept per source in feed_state, so a restart resumes the
+    same schedule. At the daily cutoff every pack's selection is run over the last `since_hours`
+    and `on_cutoff(meta, session)` is called to write the reports.
+    """
+
+    def __init__(self, db_path: str, packs: list[dict[str, Any]], cutoff: str = "23:30", since_hours: int = 24,
+                 max_gdelt: int = 100, workers: int = FETCH_WORKERS, timeout: float = SOURCE_TIMEOUT_S,
+                 min_interval: float = MIN_INTERVAL_S, max_interval: float = MAX_INTERVAL_S,
+                 on_cutoff: Callable[[dict[str, Any], dbmod.Session], Any] | None = None,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], Any] | None = None):
+        import requests
+        self.packs = packs
+        self.cutoff, self.since_hours, self.max_gdelt, self.timeout = cutoff, since_hours, max_gdelt, timeout
+        self.min_interval, self.max_interval = min_interval, max_interval
+        self.on_cutoff = on_cutoff
+        self.clock = clock
+        self.stop = threading.Event()
+        self.sleep = sleep or self.stop.wait
+        self.db = dbmod.Session(db_path)
+        self.conn = self.db.conn
+        self.http = requests.Session()
+        self.http.headers["User-Agent"] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=max(1, workers))
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="watcher")
+        self.sources = self._sources()
+        self.next_cutoff = next_cutoff(self.clock(), cutoff)
+        self.run_id = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        self._reset_counts()
+
+    def _sources(self) -> dict[str, dict[str, Any]]:
+        """Sources keyed by feed URL or "gdelt:<query>", each with the packs listing it and its saved state."""
+        multi = len(self.packs) > 1
+        sources: dict[str, dict[str, Any]] = {}
+        for p in self.packs:
+            for feed in p["rss_feeds"]:
+                sources.setdefault(feed["url"], {"name": feed["name"], "type": "rss", "feed": feed, "packs": []})["packs"].append(p)
+        queries: dict[str, list[dict[str, Any]]] = {}
+        for p in self.packs:
+            queries.setdefault(p["gdelt_query"], []).append(p)
+        for query, group in queries.items():
+            name = "GDELT" if len(queries) == 1 else f"GDELT ({', '.join(pack_name(p) for p in group)})"
+            sources[f"gdelt:{query}"] = {"name": name, "type": "gdelt", "query": query, "packs": group}
+        validators = dbmod.get_feed_states(self.conn, list(sources))
+        polls = dbmod.get_poll_states(self.conn)
+        for key, src in sources.items():
+            src["multi"] = multi
+            src["validators"] = validators.get(key) or {}
+            src["state"] = dict(polls.get(key) or {}, name=src["name"])
+        return sources
+
+    def _reset_counts(self) -> None:
+        self.counts = {"polls": 0, "failures": 0, "new_entries": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+                       "quarantined": 0, "bytes_fetched": 0}
+
+    def due(self, now: float, force: bool = False) -> list[str]:
+        """Sources whose next poll time has come (all sources with `force`) and whose circuit is not open."""
+        return [k for k, s in self.sources.items()
+                if circuit(s["state"], now) != "open" and (force or (s["state"].get("next_poll_ts") or 0) <= now)]
+
+    def _fetch(self, key: str) -> tuple[list[dict[str, Any]], dict[str, Any] | None, int, dict[str, Any]]:
+        """(items, new validators or None, new entries, stats) for one source; runs on a worker."""
+        src, stats = self.sources[key], {}
+        if src["type"] == "rss":
+            items, validators = collect_feed(src["feed"], src["packs"], self.run_id, src["validators"], self.timeout,
+                                             stats, src["multi"], session=self.http)
+            new = 0 if validators is None else stats.get("entries", 0) - stats.get("entries_skipped", 0)
+            return items, validators, new, stats
+        articles = fetch_gdelt(src["query"], self.max_gdelt, timeout=self.timeout, stats=stats, session=self.http)
+        seen = set(src["validators"].get("seen_ids") or [])
+        urls = [a.get("url") for a in articles if a.get("url")]
+        items = evaluate_packs(src["packs"], lambda p: filter_gdelt(articles, p, self.run_id), src["multi"])
+        validators = {"etag": None, "last_modified": None, "seen_ids": urls[:MAX_SEEN_IDS]}
+        return items, validators, sum(u not in seen for u in urls), stats
+
+    def poll(self, keys: list[str]) -> None:
+        """Fetch `keys` concurrently; write each source's items and state as it finishes."""
+        started = {k: time.monotonic() for k in keys}
+        futures = {self.pool.submit(self._fetch, k): k for k in keys}
+        for fut in as_completed(futures):
+            key = futures[fut]
+            src = self.sources[key]
+            now = self.clock()
+            self.counts["polls"] += 1
+            try:
+                items, validators, new, stats = fut.result()
+            except Exception as e:
+                record_failure(src["state"], now, "timeout" if _is_timeout(e) else "error", str(e))
+                self.counts["failures"] += 1
+                print(f"[watch] {src['type']} failed: {src['name']}: {e}")
+            else:
+                latency_ms = round((time.monotonic() - started[key]) * 1000, 1)
+                pack = pack_name(self.packs[0])
+                items, rejected = validation.screen_items(items)
+                if rejected:
+                    self.counts["quarantined"] += dbmod.quarantine_items(self.conn, rejected, pack=pack, run_id=self.run_id)
+                if items:
+                    for k, n in dbmod.upsert_items(self.conn, items, pack=pack).items():
+                        self.counts[k] += n
+                if validators is not None:
+                    src["validators"] = validators
+                    dbmod.save_feed_state(self.conn, key, validators["etag"], validators["last_modified"],
+                                          validators["seen_ids"], validators.get("seen_key"))
+                record_success(src["state"], now, new, latency_ms, "ok" if validators is not None else "not_modified",
+                               self.min_interval, self.max_interval)
+                self.counts["new_entries"] += new
+                self.counts["bytes_fetched"] += stats.get("bytes", 0)
+            dbmod.save_poll_state(self.conn, key, src["state"])
+
+    def run_cutoff(self, at: float) -> dict[str, Any]:
+        """Select every pack's items for the day ending at `at` and hand the result to on_cutoff."""
+        end = dt.datetime.fromtimestamp(at, dt.timezone.utc)
+        date_key = end.date().isoformat()
+        selections = select_packs(self.conn, self.packs, iso_from_epoch(int(at) - self.since_hours * 3600),
+                                  iso_from_epoch(int(at)), date_key, now=end)
+        first = selections[pack_name(self.packs[0])]
+        meta = {"run_id": self.run_id, "mode": "watch", "date": date_key, **first, "packs": selections,
+                **self.counts, "inserted_or_updated": self.counts["inserted"] + self.counts["updated"],
+                "sources": status_rows(self.conn, at)}
+        self._reset_counts()
+        if self.on_cutoff is not None:
+            self.on_cutoff(meta, self.db)
+        return meta
+
+    def run(self, max_cycles: int | None = None) -> None:
+        """Poll due sources and run cutoffs until stop is set (or `max_cycles` loop iterations)."""
+        cycles = 0
+        while not self.stop.is_set() and (max_cycles is None or cycles < max_cycles):
+            cycles += 1
+            now = self.clock()
+            if now >= self.next_cutoff:
+                at, self.next_cutoff = self.next_cutoff, next_cutoff(now, self.cutoff)
+                try:
+                    self.run_cutoff(at)
+                except Exception as e:
+                    print(f"[watch] cutoff for {dt.datetime.fromtimestamp(at, dt.timezone.utc):%Y-%m-%d} failed: {e}")
+            due = self.due(now)
+            if due:
+                self.poll(due)
+            wake = min([self.next_cutoff] + [s["state"].get("next_poll_ts") or 0 for s in self.sources.values()])
+            self.sleep(max(0.0, min(wake - self.clock(), MAX_SLEEP_S)))
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.http.close()
+        self.db.close()
+
+def status_rows(conn, now: float | None = None) -> list[dict[str, Any]]:
+    """Per-source schedule and health from feed_state, for `cli.py status` and cutoff report meta.
+
+    churn_per_day is the smoothed publish rate (new entries per day); latency is the last poll's
+    and its moving average.
+    """
+    now = time.time() if now is None else now
+    out = []
+    for url, s in sorted(dbmod.get_poll_states(conn).items(), key=lambda kv: kv[1].get("name") or kv[0]):
+        out.append({
+            "name": s["name"], "url": url, "circuit": circuit(s, now), "status": s["last_status"],
+            "interval_s": round(s["interval_s"] or DEFAULT_INTERVAL_S),
+            "next_poll_in_s": None if s["next_poll_ts"] is None else int(s["next_poll_ts"] - now),
+            "churn_per_day": None if s["new_rate"] is None else round(s["new_rate"] * 86400, 1),
+            "latency_ms": s["latency_ms"], "latency_ewma_ms": s["latency_ewma_ms"], "failures": s["failures"],
+            "polls": s["polls"], "new_entries": s["new_entries"], "last_error": s["last_error"],
+        })
+    return out
+
+def run_watch(db_path: str, packs: list[dict[str, Any]], once: bool = False, **kwargs: Any) -> Watcher:
+    """Run a Watcher until SIGINT/SIGTERM (or, with `once`, poll every source not suspended once)."""
+    w = Watcher(db_path, packs, **kwargs)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: w.stop.set())
+    try:
+        if once:
+            w.poll(w.due(w.clock(), force=True))
+        else:
+            w.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        w.close()
+    return w
@@ -1,6 +1,8 @@
 from __future__ import annotations
-import os, json, datetime as dt
+import os, datetime as dt
 from . import db as dbmod
+from .matcher import REGION_HINTS, get_matcher
+from .report import Block, Footnote, Report, Section
 
 def _fmt_date(iso: str | None) -> str:
     if not iso:
@@ -13,88 +15,88 @@ def _fmt_date(iso: str | None) -> str:
         except Exception:
             return iso
 
-def build_report(date_key: str, db_path: str = dbmod.DB_PATH, out_dir: str | None = None) -> tuple[str, dict]:
-    conn = dbmod.connect(db_path)
-    rows = dbmod.get_selected_items_for_date(conn, date_key)
-    conn.close()
-    if not rows:
-        raise RuntimeError(f"No selected items for {date_key}. Run collector first.")
+def _similar(row) -> str:
+    n = (row["cluster_size"] or 1) - 1
+    return f"; +{n} similar report{'s' if n > 1 else ''}" if n > 0 else ""
 
-    if out_dir is None:
-        out_dir = os.path.join("data", date_key)
-    os.makedirs(out_dir, exist_ok=True)
-    report_path = os.path.join(out_dir, "report.md")
+def report_dir(date_key: str, pack: str = dbmod.DEFAULT_PACK, root: str = "data") -> str:
+    """data/<date> for the default pack, data/<pack>/<date> for the others."""
+    return os.path.join(root, date_key) if pack == dbmod.DEFAULT_PACK else os.path.join(root, pack, date_key)
 
-    footnotes = []
-    fn_map = {}
+def compose_report(date_key: str, rows: list, pack: str = dbmod.DEFAULT_PACK) -> Report:
+    """Build the report model from the day's selected rows (best first)."""
+    label = "" if pack == dbmod.DEFAULT_PACK else f" ({pack})"
+    report = Report(date=date_key, title=f"Displacement Watch Brief{label} — {date_key}", rows=list(rows))
+    fn_map: dict[str, int] = {}
+    accessed = dt.datetime.utcnow().strftime("%B %d, %Y").replace(" 0"," ")
     def cite(row):
         key = row["id"]
         if key not in fn_map:
-            fn_map[key] = len(footnotes) + 1
-            footnotes.append(row)
+            fn_map[key] = len(report.footnotes) + 1
+            report.footnotes.append(Footnote(
+                number=fn_map[key], item_id=key, publisher=row["publisher"] or row["domain"] or "Unknown",
+                title=(row["title"] or "").replace("\n"," ").strip(),
+                date=_fmt_date(row["published_at"] or row["retrieved_at"]), url=row["url"], accessed=accessed,
+            ))
         return fn_map[key]
 
     # Executive summary (simple extraction + ranking)
     top_rows = rows[: min(8, len(rows))]
-    exec_bullets = []
-    for r in top_rows[:5]:
-        n = cite(r)
-        exec_bullets.append(f"- {r['title']}<sup>{n}</sup>")
+    exec_bullets = [Block("bullet", r["title"], [cite(r)]) for r in top_rows[:5]]
 
     by_region = {}
-    region_hints = ["syria","sudan","ukraine","gaza","myanmar","congo","afghanistan","haiti","ethiopia","sahel"]
+    matcher = get_matcher()
     for r in rows:
-        t = (r["title"] or "").lower() + " " + (r["snippet"] or "").lower()
-        for rg in region_hints:
-            if rg in t:
+        found = matcher.scan((r["title"] or "") + " " + (r["snippet"] or ""))["regions"]
+        for rg in REGION_HINTS:
+            if rg in found:
                 by_region.setdefault(rg.title(), []).append(r)
-    top_dev = []
-    for r in top_rows:
-        n = cite(r)
-        pubdate = _fmt_date(r["published_at"] or r["retrieved_at"])
-        top_dev.append(f"1. **{r['title']}** ({r['publisher']}; {pubdate})<sup>{n}</sup>")
-    top_dev = [f"{i+1}. **{r['title']}** ({r['publisher']}; {_fmt_date(r['published_at'] or r['retrieved_at'])})<sup>{cite(r)}</sup>" for i,r in enumerate(top_rows)]
+    top_dev = [Block("numbered", f"**{r['title']}** ({r['publisher']}; {_fmt_date(r['published_at'] or r['retrieved_at'])}{_similar(r)})",
+                     [cite(r)], number=i + 1) for i, r in enumerate(top_rows)]
 
-    lines = []
-    lines.append(f"# Displacement Watch Brief — {date_key}")
-    lines.append("")
-    lines.append("## Executive Summary")
-    lines.extend(exec_bullets)
-    lines.append("")
-    lines.append("## Top Developments")
-    lines.extend(top_dev)
-    lines.append("")
+    report.regions = sorted(by_region.keys())
+    report.sections.append(Section("Executive Summary", exec_bullets))
+    report.sections.append(Section("Top Developments", top_dev))
     if by_region:
-        lines.append("## Regional Snapshot")
-        for rg, rs in sorted(by_region.items(), key=lambda kv: len(kv[1]), reverse=True)[:5]:
-            n = cite(rs[0])
-            lines.append(f"- **{rg}:** {len(rs)} relevant item(s); representative item: {rs[0]['title']}<sup>{n}</sup>")
-        lines.append("")
-    lines.append("## What to Watch")
-    lines.append("- Any changes in asylum policy language, border measures, or returns framing across major outlets.")
-    lines.append("- Whether humanitarian funding shortfalls or aid access constraints recur across multiple regions.")
-    lines.append("- Whether the same event is being framed differently by Tier A vs Tier B outlets.")
-    lines.append("")
-    lines.append("## Footnotes")
-    accessed = dt.datetime.utcnow().strftime("%B %d, %Y").replace(" 0"," ")
-    for i, r in enumerate(footnotes, start=1):
-        pubdate = _fmt_date(r["published_at"] or r["retrieved_at"])
-        title = (r["title"] or "").replace("\n"," ").strip()
-        pub = r["publisher"] or r["domain"] or "Unknown"
-        url = r["url"]
-        lines.append(f"{i}. {pub}, “{title},” {pubdate}, {url} (accessed {accessed}).")
+        report.sections.append(Section("Regional Snapshot", [
+            Block("bullet", f"**{rg}:** {len(rs)} relevant item(s); representative item: {rs[0]['title']}", [cite(rs[0])])
+            for rg, rs in sorted(by_region.items(), key=lambda kv: len(kv[1]), reverse=True)[:5]
+        ]))
+    report.sections.append(Section("What to Watch", [
+        Block("bullet", "Any changes in asylum policy language, border measures, or returns framing across major outlets."),
+        Block("bullet", "Whether humanitarian funding shortfalls or aid access constraints recur across multiple regions."),
+        Block("bullet", "Whether the same event is being framed differently by Tier A vs Tier B outlets."),
+    ]))
+    return report
 
-    content = "\n".join(lines) + "\n"
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(content)
+def build_report(date_key: str, db_path: str = dbmod.DB_PATH, out_dir: str | None = None,
+                 rows: list | None = None, pack: str = dbmod.DEFAULT_PACK,
+                 session: dbmod.Session | None = None) -> tuple[Report, dict]:
+    """Compose the day's report, write its body to <out_dir>/report.md, and return (report, meta).
+
+    Pass `rows` (from get_selected_items_for_date) to skip the database read, and `session` to read
+    through the run's connection instead of opening one for `db_path`.
+    """
+    if rows is None:
+        with dbmod.borrow(session, db_path) as conn:
+            rows = dbmod.get_selected_items_for_date(conn, date_key, pack=pack)
+    if not rows:
+        raise RuntimeError(f"No selected items for {date_key}. Run collector first.")
+
+    if out_dir is None:
+        out_dir = report_dir(date_key, pack)
+    report = compose_report(date_key, rows, pack)
+    report.write_markdown(os.path.join(out_dir, "report.md"))
 
     meta = {
         "date": date_key,
+        "pack": pack,
         "items_collected": None,
         "items_selected": len(rows),
-        "footnotes": len(footnotes),
+        "footnotes": len(report.footnotes),
+        "cluster_sizes": {r["id"]: r["cluster_size"] for r in rows},
         "tier_breakdown": {},
-        "regions": sorted(by_region.keys()),
+        "regions": report.regions,
         "publishers": sorted({(r['publisher'] or r['domain'] or 'Unknown') for r in rows}),
     }
-    return report_path, meta
+    return report, meta
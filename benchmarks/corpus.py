@@ -0,0 +1,166 @@
+"""Deterministic synthetic corpus: RSS documents, GDELT ArtList payloads and pre-populated databases.
+
+Everything is a pure function of (size, seed, anchor date), so two runs of the suite on the same
+commit see byte-identical inputs. Populated databases are cached under benchmarks/.cache.
+"""
+from __future__ import annotations
+import json, os, random, datetime as dt
+from email.utils import format_datetime
+from typing import Any, Iterator
+from xml.sax.saxutils import escape
+
+from agents import db as dbmod
+from agents.collector import load_query_pack
+from agents.matcher import matcher_for
+from agents.scoring import static_score
+from agents.utils import iso_from_epoch, stable_id
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERY_PACK = os.path.join(ROOT, "config", "query_pack.json")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# Fixed anchor so cached databases and their windows line up across runs
+ANCHOR = dt.date(2026, 3, 1)
+SPAN_DAYS = 60
+
+PUBLISHERS = [
+    ("ReliefWeb", "reliefweb.int", "A"), ("UNHCR", "unhcr.org", "A"), ("IOM", "iom.int", "A"),
+    ("UN News", "news.un.org", "A"), ("Reuters", "reuters.com", "B"), ("AP", "apnews.com", "B"),
+    ("BBC", "bbc.com", "B"), ("Al Jazeera", "aljazeera.com", "B"), ("The Guardian", "theguardian.com", "B"),
+    ("The New Humanitarian", "thenewhumanitarian.org", "U"), ("Local Daily", "localdaily.example", "U"),
+    ("Wire Digest", "wiredigest.example", "U"),
+]
+KEYWORD_PHRASES = ["refugees", "displaced families", "internally displaced people", "IDPs", "asylum seekers",
+                   "resettlement", "camp residents", "forced displacement"]
+ACTORS = ["UNHCR", "IOM", "Aid agencies", "Officials", "Local authorities", "Donors", "NGOs", "Health workers"]
+VERBS = ["warn of", "report", "respond to", "appeal over", "struggle with", "document", "scale up aid amid"]
+THEME_WORDS = ["funding shortfall", "border crossings", "cholera outbreak", "winterization needs", "food aid cuts",
+               "relocation plans", "shelter shortages", "returns", "asylum claims"]
+REGIONS = ["Syria", "Sudan", "Ukraine", "Gaza", "Myanmar", "Congo", "Afghanistan", "Haiti", "Ethiopia", "the Sahel"]
+OFF_TOPIC = ["Central bank holds rates as inflation cools in {r}", "Election campaign heats up in {r}",
+             "Fantasy football picks for the weekend", "Stock displacement in {r} engine plants",
+             "Lens displacement study wins award", "Storm season forecast for {r}"]
+FILLER = ("Humanitarian partners said needs continue to rise as access remains constrained. "
+          "Coordination meetings were held with local authorities and community representatives. ")
+
+def _headline(rng: random.Random) -> tuple[str, str, bool]:
+    """(title, snippet, on_topic) with roughly 70% of items mentioning a tracked keyword."""
+    region = rng.choice(REGIONS)
+    if rng.random() < 0.3:
+        title = rng.choice(OFF_TOPIC).format(r=region)
+        return title, f"{title}. {FILLER}", False
+    kw = rng.choice(KEYWORD_PHRASES)
+    title = f"{rng.choice(ACTORS)} {rng.choice(VERBS)} {rng.choice(THEME_WORDS)} as {kw} in {region} {rng.choice(['grow', 'wait', 'return', 'flee'])}"
+    snippet = f"{rng.randint(2, 900)},000 {rng.choice(KEYWORD_PHRASES)} affected. {FILLER * rng.randint(1, 3)}"
+    return title, snippet, True
+
+def _anchor_ts(anchor: dt.date) -> int:
+    return int(dt.datetime.combine(anchor, dt.time(23, 59, 59), dt.timezone.utc).timestamp())
+
+def synth_rss(n: int, seed: int = 1, anchor: dt.date = ANCHOR, name: str = "Synthetic") -> bytes:
+    """An RSS 2.0 document with n entries published over the day ending at `anchor`."""
+    rng = random.Random(f"rss-{seed}-{n}")
+    end = _anchor_ts(anchor)
+    out = ['<?xml version="1.0" encoding="utf-8"?>', '<rss version="2.0"><channel>',
+           f"<title>{escape(name)}</title><link>https://feed.example/</link><description>bench</description>"]
+    for i in range(n):
+        title, snippet, _ = _headline(rng)
+        pub = dt.datetime.fromtimestamp(end - rng.randint(0, 86399), dt.timezone.utc)
+        link = f"https://feed.example/{seed}/{i}?utm_source=rss"
+        out.append(f"<item><title>{escape(title)}</title><link>{escape(link)}</link><guid>{seed}-{i}</guid>"
+                   f"<pubDate>{format_datetime(pub)}</pubDate><description>{escape(snippet)}</description></item>")
+    out.append("</channel></rss>")
+    return "\n".join(out).encode("utf-8")
+
+def synth_gdelt(n: int, seed: int = 1, anchor: dt.date = ANCHOR) -> bytes:
+    """A GDELT Doc API ArtList JSON payload with n articles seen on the day ending at `anchor`."""
+    rng = random.Random(f"gdelt-{seed}-{n}")
+    end = _anchor_ts(anchor)
+    arts = []
+    for i in range(n):
+        title, _, _ = _headline(rng)
+        _, domain, _ = rng.choice(PUBLISHERS)
+        seen = dt.datetime.fromtimestamp(end - rng.randint(0, 86399), dt.timezone.utc)
+        arts.append({"url": f"https://{domain}/news/{seed}-{i}", "title": title, "seendate": seen.strftime("%Y%m%dT%H%M%SZ"),
+                     "domain": domain, "language": "English", "sourcecountry": rng.choice(REGIONS)})
+    return json.dumps({"articles": arts}).encode("utf-8")
+
+def synth_items(n: int, seed: int = 1, anchor: dt.date = ANCHOR, span_days: int = SPAN_DAYS,
+                offset: int = 0) -> Iterator[dict[str, Any]]:
+    """Collector-shaped, on-topic items spread evenly over `span_days` days ending at `anchor`.
+
+    About one item in eight repeats an earlier title (syndicated copy) so near-duplicate clusters
+    have realistic sizes; keywords_hit comes from the real query pack's matcher.
+    """
+    rng = random.Random(f"items-{seed}")
+    matcher = matcher_for(load_query_pack(QUERY_PACK))
+    end = _anchor_ts(anchor)
+    recent: list[tuple[str, str]] = []
+    for i in range(offset, offset + n):
+        if recent and rng.random() < 0.125:
+            title, snippet = rng.choice(recent)
+        else:
+            title, snippet, on_topic = _headline(rng)
+            while not on_topic:
+                title, snippet, on_topic = _headline(rng)
+            recent = (recent + [(title, snippet)])[-64:]
+        publisher, domain, tier = rng.choice(PUBLISHERS)
+        ev = end - int((i - offset) * span_days * 86400 / max(n, 1)) - rng.randint(0, 600)
+        pub_ts = ev if rng.random() > 0.1 else None
+        kws = matcher.keyword_hits(f"{title} {snippet}")
+        url = f"https://{domain}/story/{i}"
+        yield {
+            "id": stable_id(url, title), "canonical_url": url, "url": url, "title": title, "publisher": publisher,
+            "domain": domain, "published_at": iso_from_epoch(pub_ts) if pub_ts is not None else None,
+            "retrieved_at": iso_from_epoch(ev), "event_ts": ev, "snippet": snippet[:1000], "full_text": None,
+            "language": "en", "tier": tier, "keywords_hit": kws, "source_type": rng.choice(["rss", "gdelt"]),
+            "collection_run_id": f"bench-{seed}",
+        }
+
+def populate(db_path: str, n: int, seed: int = 1, batch: int = 20000) -> None:
+    """Fill a fresh database with n items by direct insert, then derive pack tags, rollups and the FTS index.
+
+    Bypasses upsert_items (whose own cost is a separate stage); every item is its own cluster
+    except exact title repeats, which share one, so selection sees realistic cluster sizes.
+    """
+    dbmod.init_db(db_path)
+    conn = dbmod.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    cols = dbmod.ITEM_COLUMNS
+    sql = f"INSERT OR IGNORE INTO items ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+    clusters: dict[str, str] = {}
+    rows = []
+    for it in synth_items(n, seed):
+        it["cluster_id"] = clusters.setdefault(it["title"], it["id"])
+        it["static_score"] = static_score(it["tier"], it["keywords_hit"])
+        it["published_ts"] = it["event_ts"] if it["published_at"] else None
+        it["keywords_hit_json"] = json.dumps(it["keywords_hit"])
+        it["content_hash"] = dbmod.item_hash(it)
+        rows.append(tuple(it.get(c) for c in cols))
+        if len(rows) >= batch:
+            conn.executemany(sql, rows)
+            rows.clear()
+        if len(clusters) > 4096:
+            clusters.clear()
+    conn.executemany(sql, rows)
+    dbmod.tag_all_items(conn)
+    conn.commit()
+    dbmod.rebuild_rollups(conn)
+    if dbmod.has_fts(conn):
+        dbmod.rebuild_fts(conn)
+    conn.commit()
+    conn.close()
+
+def cached_db(n: int, seed: int = 1) -> str:
+    """Path to a populated database of n items, building it on first use (and migrating it after)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"items-{n}-s{seed}.db")
+    if not os.path.exists(path):
+        tmp = path + ".building"
+        for p in (tmp, tmp + "-wal", tmp + "-shm"):
+            if os.path.exists(p):
+                os.remove(p)
+        populate(tmp, n, seed)
+        os.replace(tmp, path)
+    else:
+        dbmod.init_db(path)  # bring a cache built by an older commit up to the current schema
+    return path
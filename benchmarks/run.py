@@ -0,0 +1,194 @@
+"""Pipeline benchmark suite: time each stage on the synthetic corpus and compare with a baseline.
+
+    python benchmarks/run.py                               # 10k-item database, compare with baseline.json
+    python benchmarks/run.py --sizes 10000 1000000 5000000 # larger databases (built once, cached)
+    python benchmarks/run.py --update-baseline             # record this machine's numbers as the baseline
+
+Input-sized stages (parse_feed, query_gdelt, upsert_items, screen_items) run once; database-sized stages run
+against each populated size. Each stage is repeated and its fastest run is compared, so the
+threshold measures slowdowns rather than scheduler noise. Exits 1 on any regression.
+"""
+from __future__ import annotations
+import argparse, dataclasses, json, os, platform, shutil, sqlite3, statistics, subprocess, sys, tempfile, threading, time
+import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import db as dbmod, validation
+from agents.collector import load_query_pack, parse_feed, query_gdelt, select_for_window, selection_size
+from agents.editor import qa_and_append
+from agents.export_docx import markdown_to_docx, report_to_docx
+from agents.refiner import propose
+from agents.trends import rolling_trends
+from agents.writer import build_report
+from benchmarks import corpus
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+# Relative slowdown that counts as a regression, and an absolute floor below which differences are noise
+THRESHOLD = 0.25
+NOISE_FLOOR_S = 0.005
+
+def timed(fn: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None) -> dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"min_s": round(min(runs), 6), "median_s": round(statistics.median(runs), 6), "runs": repeat}
+
+def _serve(payload: bytes) -> tuple[ThreadingHTTPServer, str]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/api/v2/doc/doc"
+
+def bench_inputs(q: dict, tmp: str, feed_entries: int, gdelt_records: int, upsert_n: int, repeat: int) -> dict[str, dict]:
+    out = {}
+    rss = corpus.synth_rss(feed_entries)
+    out[f"parse_feed@{feed_entries}"] = timed(lambda: parse_feed("bench://rss", "Synthetic", q, "bench", content=rss), repeat)
+
+    srv, url = _serve(corpus.synth_gdelt(gdelt_records))
+    try:
+        out[f"query_gdelt@{gdelt_records}"] = timed(lambda: query_gdelt(q, gdelt_records, "bench", base_url=url), repeat)
+    finally:
+        srv.shutdown()
+
+    items = list(corpus.synth_items(upsert_n, seed=2))
+    path = os.path.join(tmp, "upsert.db")
+
+    def fresh():
+        for p in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(p):
+                os.remove(p)
+        dbmod.init_db(path)
+
+    def upsert():
+        conn = dbmod.connect(path)
+        dbmod.upsert_items(conn, items)
+        conn.close()
+
+    out[f"upsert_items@{upsert_n}"] = timed(upsert, repeat, setup=fresh)
+    out[f"screen_items@{upsert_n}"] = timed(lambda: validation.screen_items(items), repeat)
+    return out
+
+def bench_db(q: dict, size: int, tmp: str, repeat: int) -> dict[str, dict]:
+    db_path = corpus.cached_db(size)
+    day = corpus.ANCHOR
+    date_key = day.isoformat()
+    start, end = f"{date_key}T00:00:00Z", f"{date_key}T23:59:59Z"
+    now = dt.datetime.combine(day, dt.time(23, 59, 59), dt.timezone.utc)
+    out_dir = os.path.join(tmp, f"report-{size}")
+    report = os.path.join(out_dir, "report.md")
+    pristine = os.path.join(tmp, f"report-{size}.md")
+    out = {}
+
+    def window():
+        conn = dbmod.connect(db_path)
+        dbmod.get_items_for_window(conn, start, end)
+        conn.close()
+
+    def select():
+        conn = dbmod.connect(db_path)
+        select_for_window(conn, start, end, date_key, selection_size(q), now=now)
+        conn.close()
+
+    out[f"get_items_for_window@{size}"] = timed(window, repeat)
+    out[f"select_for_window@{size}"] = timed(select, repeat)
+    out[f"rolling_trends@{size}"] = timed(lambda: rolling_trends(db_path, as_of=day), repeat)
+    out[f"propose@{size}"] = timed(lambda: propose(db_path, corpus.QUERY_PACK, as_of=day), repeat)
+    out[f"build_report@{size}"] = timed(lambda: build_report(date_key, db_path=db_path, out_dir=out_dir), repeat)
+    model, _ = build_report(date_key, db_path=db_path, out_dir=out_dir)
+    shutil.copyfile(report, pristine)
+    fresh = {}
+
+    def reset():
+        shutil.copyfile(pristine, report)
+        fresh["model"] = dataclasses.replace(model, appendices=[])
+
+    out[f"qa_and_append@{size}"] = timed(lambda: qa_and_append(fresh["model"], db_path=db_path), repeat, setup=reset)
+    out[f"markdown_to_docx@{size}"] = timed(lambda: markdown_to_docx(report, os.path.join(out_dir, "report.docx")), repeat)
+    out[f"report_to_docx@{size}"] = timed(lambda: report_to_docx(fresh["model"], os.path.join(out_dir, "model.docx")), repeat)
+    return out
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[dict[str, Any]]:
+    """Stages whose fastest run is more than `threshold` slower than the baseline's (and above the noise floor)."""
+    out = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        ratio = cur["min_s"] / base["min_s"] if base["min_s"] else float("inf")
+        if ratio > 1 + threshold and cur["min_s"] - base["min_s"] > NOISE_FLOOR_S:
+            out.append({"stage": key, "baseline_s": base["min_s"], "current_s": cur["min_s"], "ratio": round(ratio, 2)})
+    return out
+
+def _meta() -> dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=HERE, timeout=10).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {"timestamp": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z", "git_rev": rev,
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Time each pipeline stage on a deterministic synthetic corpus")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="Populated database sizes (items)")
+    ap.add_argument("--feed-entries", type=int, default=2000)
+    ap.add_argument("--gdelt-records", type=int, default=250)
+    ap.add_argument("--upsert-items", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=os.path.join(HERE, "results", "latest.json"))
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed relative slowdown (0.25 = 25%%)")
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args()
+
+    q = load_query_pack(corpus.QUERY_PACK)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = bench_inputs(q, tmp, args.feed_entries, args.gdelt_records, args.upsert_items, args.repeat)
+        for size in args.sizes:
+            results.update(bench_db(q, size, tmp, args.repeat))
+
+    doc = {"meta": _meta(), "threshold": args.threshold, "results": results}
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        doc["baseline_rev"] = baseline.get("meta", {}).get("git_rev")
+        doc["regressions"] = compare(results, baseline.get("results", {}), args.threshold)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": doc["meta"], "results": results}, f, indent=2)
+
+    for key, r in results.items():
+        base = (baseline or {}).get("results", {}).get(key)
+        vs = f"  (baseline {base['min_s']:.4f}s, x{r['min_s'] / base['min_s']:.2f})" if base and base["min_s"] else ""
+        print(f"{key:32s} {r['min_s']:.4f}s{vs}")
+    if doc.get("regressions"):
+        for r in doc["regressions"]:
+            print(f"[regression] {r['stage']}: {r['baseline_s']:.4f}s -> {r['current_s']:.4f}s (x{r['ratio']})")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""CLI startup benchmark: import time and heavy modules loaded by each subcommand.
+
+    python benchmarks/startup.py            # print per-command import time, exit 1 over budget
+
+Each command runs for real in a fresh interpreter under `python -X importtime`, in an empty
+workspace (run-daily against a local feed/GDELT server), and the time spent importing modules is
+summed. Commands that do not need a heavy dependency must not load it at all.
+"""
+from __future__ import annotations
+import json, os, subprocess, sys, tempfile, threading
+import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+
+HEAVY = ("requests", "feedparser", "dateutil", "docx", "lxml", "jsonschema")
+# Import-time budget per subcommand (seconds, including interpreter start-up imports), and the heavy
+# modules each one may load
+BUDGET_S = {"init-db": 0.12, "validate": 0.12, "search": 0.12, "rebuild": 0.12, "backfill": 0.15, "enrich": 0.15,
+            "archive": 0.12, "status": 0.12, "run-daily": 0.3, "watch": 0.3}
+ALLOWED = {"init-db": (), "validate": ("jsonschema",), "search": (), "rebuild": (), "backfill": ("requests", "jsonschema"),
+           "enrich": ("requests",), "archive": (), "status": (), "run-daily": ("requests", "feedparser", "dateutil", "jsonschema"),
+           "watch": ("requests", "feedparser", "dateutil", "jsonschema")}
+
+_CHILD = """
+import os, sys
+sys.path.insert(0, {root!r})
+import cli
+if os.environ.get("DW_GDELT_URL"):
+    from agents import collector
+    collector.GDELT_URL = os.environ["DW_GDELT_URL"]
+try:
+    cli.main(sys.argv[1:])
+except SystemExit:
+    pass
+"""
+
+def _serve() -> tuple[ThreadingHTTPServer, str]:
+    today = dt.datetime.utcnow().date()
+    rss, gdelt = corpus.synth_rss(20, anchor=today), corpus.synth_gdelt(10, anchor=today)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = rss if self.path.startswith("/rss") else gdelt
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+def parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    """(seconds spent in top-level imports, top-level package names imported) from -X importtime output."""
+    total_us, packages = 0, set()
+    for ln in stderr.splitlines():
+        if not ln.startswith("import time:") or "cumulative" in ln:
+            continue
+        _, cumulative, name = ln[len("import time:"):].split("|", 2)
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+        packages.add(name.strip().split(".")[0])
+    return total_us / 1e6, packages
+
+def profile_command(argv: list[str], cwd: str, env: dict[str, str] | None = None) -> dict[str, Any]:
+    code = _CHILD.format(root=corpus.ROOT)
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", code, *argv], cwd=cwd, capture_output=True,
+                       text=True, env={**os.environ, **(env or {})}, timeout=120)
+    if r.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed: {r.stderr.splitlines()[-1] if r.stderr else r.returncode}")
+    import_s, packages = parse_importtime(r.stderr)
+    return {"import_s": round(import_s, 4), "heavy": sorted(p for p in HEAVY if p in packages)}
+
+def profile_commands() -> dict[str, dict[str, Any]]:
+    """Run every subcommand once in a scratch workspace and profile its imports."""
+    srv, base = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(corpus.QUERY_PACK, "r", encoding="utf-8") as f:
+                pack = json.load(f)
+            pack["rss_feeds"] = [{"name": "bench", "url": f"{base}/rss"}]
+            with open(os.path.join(tmp, "bench.json"), "w", encoding="utf-8") as f:
+                json.dump(pack, f)
+            db = ["--db", os.path.join(tmp, "startup.db")]
+            commands = {
+                "init-db": [],
+                "run-daily": ["--pack", "bench.json", "--run-log", "", "--max-gdelt", "10"],
+                "validate": ["--date", "2000-01-01"],
+                "search": ["refugees"],
+                "rebuild": ["--start", "2000-01-01", "--end", "2000-01-02", "--workers", "1"],
+                "backfill": ["--start", "2000-01-02", "--end", "2000-01-01", "--pack", "bench.json"],
+                "enrich": ["--days", "0"],
+                "archive": ["--older-than", "36500"],
+                "watch": ["--pack", "bench.json", "--once", "--run-log", "", "--max-gdelt", "10"],
+                "status": [],
+            }
+            return {name: profile_command(db + [name] + args, tmp, {"DW_GDELT_URL": f"{base}/gdelt"})
+                    for name, args in commands.items()}
+    finally:
+        srv.shutdown()
+
+def unexpected_imports(results: dict[str, dict[str, Any]]) -> list[str]:
+    """Commands that loaded a heavy module they are not allowed; independent of machine speed."""
+    out = []
+    for name, r in results.items():
+        extra = set(r["heavy"]) - set(ALLOWED[name])
+        if extra:
+            out.append(f"{name}: loaded {', '.join(sorted(extra))}")
+    return out
+
+def over_budget(results: dict[str, dict[str, Any]]) -> list[str]:
+    out = [f"{name}: imports took {r['import_s']:.3f}s (budget {BUDGET_S[name]:.2f}s)"
+           for name, r in results.items() if r["import_s"] > BUDGET_S[name]]
+    return out + unexpected_imports(results)
+
+def main() -> None:
+    results = profile_commands()
+    for name, r in results.items():
+        print(f"{name:10s} {r['import_s']:.4f}s  {' '.join(r['heavy'])}")
+    problems = over_budget(results)
+    for p in problems:
+        print(f"[over budget] {p}")
+    if problems:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,242 @@
 from __future__ import annotations
 import argparse, os, json, datetime as dt
-from jsonschema import validate as js_validate
 
+# Only agents.db is loaded up front. Each command imports the agents it uses (and through them
+# requests, feedparser, python-docx, ...) when it runs, so cheap commands start fast.
 from agents import db as dbmod
-from agents.collector import collect_and_persist
-from agents.refiner import propose
-from agents.writer import build_report
-from agents.editor import qa_and_append
-from agents.export_docx import markdown_to_docx
 
 def cmd_init_db(args):
     dbmod.init_db(args.db)
     print(f"Initialized DB at {args.db}")
 
 def cmd_run_daily(args):
-    dbmod.init_db(args.db)
-    cmeta = collect_and_persist(args.db, since_hours=args.since_hours, max_gdelt=args.max_gdelt)
+    from agents.instrument import Recorder
+    # One connection (and its statement cache) for every stage of the run
+    with Recorder(profile_dir=args.profile_dir if args.profile else None) as rec, dbmod.Session(args.db) as session:
+        try:
+            result = _run_daily(args, rec, session)
+        except BaseException as e:
+            rec.finish("run-daily", status="error", error=str(e))
+            raise
+        else:
+            rec.finish("run-daily")
+        finally:
+            dbmod.save_run_records(session.conn, rec.records)
+            if args.run_log:
+                rec.write_jsonl(args.run_log)
+    result["timings"] = rec.summary()
+    print(json.dumps(result, indent=2))
+
+def _run_daily(args, rec, session) -> dict:
+    from agents.collector import collect_and_persist, load_query_packs, pack_name
+    paths = args.pack or ["config/query_pack.json"]
+    packs = load_query_packs(paths, args.db)
+    with rec.stage("collect") as st:
+        cmeta = collect_and_persist(args.db, since_hours=args.since_hours, max_gdelt=args.max_gdelt,
+                                    max_workers=args.fetch_workers, deadline=args.fetch_deadline,
+                                    batch_size=args.batch_size, run_id=rec.run_id, packs=packs, session=session)
+        st["meta"] = {"inserted": cmeta["inserted"], "updated": cmeta["updated"], "window_items": cmeta["window_items"],
+                      "packs": cmeta["packs"]}
+    for source in cmeta["sources"]:
+        rec.source(source)
+
+    reports = {}
+    for path, q in zip(paths, packs):
+        pack = pack_name(q)
+        reports[pack] = _report_pack(args, rec, session, cmeta, pack, path, tag="" if len(packs) == 1 else f"[{pack}]")
+    first = reports[pack_name(packs[0])]
+    out = {"date": cmeta["date"], "report": first["report"], "docx": first["docx"], "collector": cmeta}
+    if len(packs) > 1:
+        out["reports"] = reports
+    return out
+
+def _report_pack(args, rec, session, cmeta: dict, pack: str, pack_path: str, tag: str = "") -> dict:
+    """Write, QA, export and (optionally) refine one pack's report for the collected date."""
+    from agents.editor import qa_and_append
+    from agents.writer import build_report, report_dir
     date_key = cmeta["date"]
-    out_dir = os.path.join("data", date_key)
+    out_dir = report_dir(date_key, pack)
     os.makedirs(out_dir, exist_ok=True)
 
-    report_path, wmeta = build_report(date_key, db_path=args.db, out_dir=out_dir)
-    emeta = qa_and_append(date_key, report_path, db_path=args.db)
+    with rec.stage("write" + tag):
+        report, wmeta = build_report(date_key, out_dir=out_dir, pack=pack, session=session)
+    with rec.stage("qa" + tag):
+        emeta = qa_and_append(report, session=session)
+    report_path = report.path
 
     docx_path = None
     if args.export_docx:
         docx_path = os.path.join(out_dir, "report.docx")
-        markdown_to_docx(report_path, docx_path)
+        with rec.stage("docx" + tag):
+            from agents.export_docx import report_to_docx
+            report_to_docx(report, docx_path)
 
     if args.refine:
-        proposal, rationale = propose(args.db, "config/query_pack.json")
-        with open(os.path.join(out_dir, "query_pack.proposed.json"), "w", encoding="utf-8") as f:
-            json.dump(proposal, f, indent=2)
-        with open(os.path.join(out_dir, "query_pack.rationale.md"), "w", encoding="utf-8") as f:
-            f.write(rationale + "\n")
-        conn = dbmod.connect(args.db)
-        dbmod.save_query_proposal(conn, proposal, rationale)
-        conn.close()
+        with rec.stage("refine" + tag):
+            from agents.refiner import propose
+            proposal, rationale = propose(query_pack_path=pack_path, session=session)
+            with open(os.path.join(out_dir, "query_pack.proposed.json"), "w", encoding="utf-8") as f:
+                json.dump(proposal, f, indent=2)
+            with open(os.path.join(out_dir, "query_pack.rationale.md"), "w", encoding="utf-8") as f:
+                f.write(rationale + "\n")
+            dbmod.save_query_proposal(session.conn, proposal, rationale)
 
     # enrich and save report meta
-    conn = dbmod.connect(args.db)
-    selected = dbmod.get_selected_items_for_date(conn, date_key)
-    tier_breakdown = {}
-    for r in selected:
-        tier_breakdown[r["tier"] or "U"] = tier_breakdown.get(r["tier"] or "U", 0) + 1
-    final_meta = {
-        "date": date_key,
-        "items_collected": cmeta["window_items"],
-        "items_selected": len(selected),
-        "footnotes": emeta["footnotes"],
-        "tier_breakdown": tier_breakdown,
-        "regions": emeta["trends"]["7d"]["themes"] if isinstance(emeta.get("trends"), dict) else [],
-        "publishers": [p for p,_ in emeta["top_publishers"]],
-        "collector": cmeta,
-        "editor": emeta,
-    }
-    dbmod.save_report_meta(conn, date_key, report_path, docx_path, final_meta)
-    conn.close()
-
-    print(json.dumps({"date": date_key, "report": report_path, "docx": docx_path, "collector": cmeta}, indent=2))
+    with rec.stage("save_meta" + tag):
+        selected = report.rows
+        tier_breakdown = {}
+        for r in selected:
+            tier_breakdown[r["tier"] or "U"] = tier_breakdown.get(r["tier"] or "U", 0) + 1
+        final_meta = {
+            "date": date_key,
+            "items_collected": cmeta["packs"][pack]["window_items"],
+            "items_selected": len(selected),
+            "footnotes": emeta["footnotes"],
+            "tier_breakdown": tier_breakdown,
+            "regions": report.regions,
+            "publishers": [p for p,_ in emeta["top_publishers"]],
+            "collector": cmeta,
+            "editor": emeta,
+        }
+        dbmod.save_report_meta(session.conn, date_key, report_path, docx_path, final_meta, pack=pack)
+
+    return {"report": report_path, "docx": docx_path}
 
 def cmd_validate(args):
-    date_key = args.date
-    out_dir = os.path.join("data", date_key)
-    report_path = os.path.join(out_dir, "report.md")
-    if not os.path.exists(report_path):
-        raise SystemExit(f"Missing {report_path}")
-
-    # basic report validation
-    txt = open(report_path, "r", encoding="utf-8").read()
-    required_headers = [
-        "# Displacement Watch Brief",
-        "## Executive Summary",
-        "## Top Developments",
-        "## Footnotes",
-        "## Appendix A: Quality & Methods Notes",
-        "## Appendix B: Trend Signals",
-    ]
-    missing = [h for h in required_headers if h not in txt]
-    if missing:
-        raise SystemExit(f"Report validation failed; missing headers: {missing}")
-
-    print(f"Report validated: {report_path}")
+    from agents.validation import VALIDATE_WORKERS, validate_reports
+    from agents.writer import report_dir
+    if args.date and not (args.start or args.end):
+        start = end = dt.date.fromisoformat(args.date)
+    elif args.start and args.end and not args.date:
+        start, end = dt.date.fromisoformat(args.start), dt.date.fromisoformat(args.end)
+    else:
+        raise SystemExit("validate needs --date, or --start and --end")
+    dates = [(start + dt.timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    rows = {}
+    if os.path.exists(args.db):
+        with dbmod.Session(args.db, readonly=True) as session:
+            rows = dbmod.get_report_rows(session.conn, dates, pack=args.pack)
+
+    def path_for(date_key: str) -> str:
+        return os.path.join(report_dir(date_key, args.pack), "report.md")
+
+    summary = validate_reports(dates, rows, path_for, workers=args.workers or VALIDATE_WORKERS)
+    if args.date:
+        path = rows[args.date]["report_path"] if args.date in rows else path_for(args.date)
+        if summary["missing"]:
+            raise SystemExit(f"Missing {path}")
+        if summary["invalid"]:
+            raise SystemExit(f"Report validation failed: {'; '.join(summary['problems'][0]['errors'])}")
+        print(f"Report validated: {path}")
+        return
+    print(json.dumps(summary, indent=2))
+    if summary["invalid"]:
+        raise SystemExit(f"{summary['invalid']} of {summary['days']} day(s) failed validation")
+
+def cmd_search(args):
+    start = args.start + "T00:00:00Z" if args.start else None
+    end = args.end + "T23:59:59Z" if args.end else None
+    if args.days and not start:
+        start = (dt.datetime.utcnow() - dt.timedelta(days=args.days)).replace(microsecond=0).isoformat() + "Z"
+    with dbmod.Session(args.db, readonly=True) as session:
+        total, rows = dbmod.search_items(session.conn, args.query, start, end, args.tier, limit=args.limit,
+                                         offset=(max(args.page, 1) - 1) * args.limit)
+    if args.json:
+        print(json.dumps({"total": total, "page": args.page, "results": [dict(r) for r in rows]}, indent=2))
+        return
+    first = (max(args.page, 1) - 1) * args.limit
+    print(f"{total} match(es); showing {first + 1 if rows else 0}-{first + len(rows)}")
+    for i, r in enumerate(rows, start=first + 1):
+        print(f"{i}. [{r['tier']}] {r['title']} ({r['publisher'] or r['domain']}; {(r['published_at'] or r['retrieved_at'] or '')[:10]})")
+        print(f"   {r['url']}")
+        if r["excerpt"]:
+            print(f"   {r['excerpt']}")
 
 def cmd_backfill(args):
-    # Stub scaffold: iterate dates, run collector/writer/editor. Historical coverage depends on source support.
+    # GDELT only: RSS feeds do not expose history. Re-running resumes from the checkpointed slices.
+    from agents.backfill import run_backfill
+    from agents.collector import load_query_packs
     dbmod.init_db(args.db)
-    print(f"Backfill scaffold: start={args.start} end={args.end} (implement source-specific backfill for RSS/GDELT).")
+    summary = run_backfill(
+        args.db, dt.date.fromisoformat(args.start), dt.date.fromisoformat(args.end),
+        slice_hours=args.slice_hours, workers=args.workers, max_records=args.max_records,
+        reports=not args.no_reports, query_pack=load_query_packs([args.pack], args.db)[0] if args.pack else None,
+    )
+    print(json.dumps(summary, indent=2))
+
+def cmd_rebuild(args):
+    from agents.rebuild import REBUILD_WORKERS, run_rebuild
+    summary = run_rebuild(args.db, dt.date.fromisoformat(args.start), dt.date.fromisoformat(args.end),
+                          workers=args.workers or REBUILD_WORKERS, export_docx=args.export_docx, pack=args.pack)
+    print(json.dumps(summary, indent=2))
+
+def cmd_enrich(args):
+    from agents.enricher import run_enrichment
+    with dbmod.Session(args.db) as session:
+        summary = run_enrichment(args.db, days=args.days, tiers=args.tier or ("A", "B"), limit=args.limit,
+                                 workers=args.workers, per_host=args.per_host, interval=args.interval,
+                                 refresh=args.refresh, session=session)
+    print(json.dumps(summary, indent=2))
+
+def cmd_watch(args):
+    from agents.collector import load_query_packs, pack_name
+    from agents.instrument import Recorder
+    from agents.watcher import run_watch
+    paths = args.pack or ["config/query_pack.json"]
+    packs = load_query_packs(paths, args.db)
+
+    def on_cutoff(cmeta, session):
+        with Recorder(run_id=cmeta["run_id"] + "-" + cmeta["date"]) as rec:
+            status, error = "ok", None
+            try:
+                for path, q in zip(paths, packs):
+                    pack = pack_name(q)
+                    out = _report_pack(args, rec, session, cmeta, pack, path, tag="" if len(packs) == 1 else f"[{pack}]")
+                    print(f"[watch] {cmeta['date']} report: {out['report']}")
+            except Exception as e:
+                status, error = "error", str(e)
+                raise
+            finally:
+                rec.finish("watch-cutoff", status=status, error=error)
+                dbmod.save_run_records(session.conn, rec.records)
+                if args.run_log:
+                    rec.write_jsonl(args.run_log)
+
+    print(f"[watch] polling {sum(len(q['rss_feeds']) for q in packs)} feed(s); daily cutoff {args.cutoff} UTC")
+    w = run_watch(args.db, packs, once=args.once, cutoff=args.cutoff, since_hours=args.since_hours,
+                  max_gdelt=args.max_gdelt, workers=args.fetch_workers, min_interval=args.min_interval,
+                  max_interval=args.max_interval, on_cutoff=on_cutoff)
+    print(json.dumps(w.counts, indent=2))
+
+def _fmt(v, spec: str = "") -> str:
+    return "-" if v is None else format(v, spec)
+
+def cmd_status(args):
+    from agents.watcher import status_rows
+    rows = []
+    if os.path.exists(args.db):
+        with dbmod.Session(args.db, readonly=True) as session:
+            rows = status_rows(session.conn)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        print("No sources polled yet (start `watch`).")
+        return
+    print(f"{'source':28s} {'circuit':9s} {'status':12s} {'every':>7s} {'next':>7s} {'new/day':>8s} {'ms':>7s} {'avg ms':>7s} {'fails':>5s}")
+    for r in rows:
+        print(f"{r['name'][:28]:28s} {r['circuit']:9s} {_fmt(r['status']):12s} {_fmt(r['interval_s'], 'd'):>7s} "
+              f"{_fmt(r['next_poll_in_s'], 'd'):>7s} {_fmt(r['churn_per_day']):>8s} {_fmt(r['latency_ms']):>7s} "
+              f"{_fmt(r['latency_ewma_ms']):>7s} {_fmt(r['failures'], 'd'):>5s}")
+        if r["last_error"]:
+            print(f"    {r['last_error'][:120]}")
+
+def cmd_archive(args):
+    from agents.archive import archive_older_than
+    cutoff = dt.datetime.utcnow().date() - dt.timedelta(days=args.older_than)
+    with dbmod.Session(args.db) as session:
+        summary = archive_older_than(args.db, cutoff, vacuum=not args.no_vacuum, session=session)
+    print(json.dumps(summary, indent=2))
 
 def build_parser():
     p = argparse.ArgumentParser(description="Displacement Watch v2 CLI")
@@ -99,21 +249,92 @@ def build_parser():
     a = sub.add_parser("run-daily")
     a.add_argument("--since-hours", type=int, default=24)
     a.add_argument("--max-gdelt", type=int, default=100)
+    a.add_argument("--fetch-workers", type=int, default=8, help="max concurrent source fetches")
+    a.add_argument("--fetch-deadline", type=float, default=120.0, help="total fetch deadline in seconds")
+    a.add_argument("--batch-size", type=int, default=500, help="items per write transaction")
+    a.add_argument("--pack", action="append", help="query pack JSON (repeatable; default config/query_pack.json). "
+                   "Feeds shared by packs are fetched once; each pack gets its own selection and report.")
     a.add_argument("--refine", action="store_true")
     a.add_argument("--export-docx", action="store_true")
+    a.add_argument("--run-log", default=os.path.join("data", "runs.jsonl"), help="JSON-lines stage/source timing log ('' to disable)")
+    a.add_argument("--profile", action="store_true", help="write cProfile output for each stage")
+    a.add_argument("--profile-dir", default=os.path.join("data", "profiles"))
     a.set_defaults(func=cmd_run_daily)
 
-    a = sub.add_parser("validate")
-    a.add_argument("--date", required=True)
+    a = sub.add_parser("validate", help="check reports and their stored meta against the required headers and schema")
+    a.add_argument("--date", help="one day (YYYY-MM-DD)")
+    a.add_argument("--start", help="first day of a range (YYYY-MM-DD)")
+    a.add_argument("--end", help="last day of a range (YYYY-MM-DD)")
+    a.add_argument("--pack", default=dbmod.DEFAULT_PACK, help="pack name whose reports to check")
+    a.add_argument("--workers", type=int, help="days checked in parallel (default: CPU count, at most 8)")
     a.set_defaults(func=cmd_validate)
 
+    a = sub.add_parser("search", help="ranked full-text search over the item archive")
+    a.add_argument("query", help="FTS5 query, e.g. 'sudan AND returns' or '\"asylum seekers\"'")
+    a.add_argument("--days", type=int, help="only items from the last N days")
+    a.add_argument("--start", help="YYYY-MM-DD")
+    a.add_argument("--end", help="YYYY-MM-DD")
+    a.add_argument("--tier", action="append", choices=["A", "B", "C", "U"], help="repeatable")
+    a.add_argument("--limit", type=int, default=20)
+    a.add_argument("--page", type=int, default=1)
+    a.add_argument("--json", action="store_true")
+    a.set_defaults(func=cmd_search)
+
     a = sub.add_parser("backfill")
     a.add_argument("--start", required=True)
     a.add_argument("--end", required=True)
+    a.add_argument("--slice-hours", type=int, default=24)
+    a.add_argument("--workers", type=int, default=4, help="slices fetched in parallel")
+    a.add_argument("--max-records", type=int, default=250)
+    a.add_argument("--no-reports", action="store_true", help="collect only; skip per-day selection and reports")
+    a.add_argument("--pack", help="query pack JSON (default config/query_pack.json)")
     a.set_defaults(func=cmd_backfill)
+
+    a = sub.add_parser("enrich", help="fetch article text for recent selected and Tier A/B items")
+    a.add_argument("--days", type=int, default=2, help="items from the last N days")
+    a.add_argument("--tier", action="append", choices=["A", "B", "C", "U"], help="repeatable; default A and B")
+    a.add_argument("--limit", type=int, default=200, help="max articles per run")
+    a.add_argument("--workers", type=int, default=8)
+    a.add_argument("--per-host", type=int, default=2, help="max requests in flight per host")
+    a.add_argument("--interval", type=float, default=1.0, help="min seconds between requests to one host")
+    a.add_argument("--refresh", action="store_true", help="re-fetch (conditionally) items already enriched")
+    a.set_defaults(func=cmd_enrich)
+
+    a = sub.add_parser("rebuild", help="regenerate reports, docx and report meta for a date range")
+    a.add_argument("--start", required=True)
+    a.add_argument("--end", required=True)
+    a.add_argument("--workers", type=int, help="worker processes (default: CPU count, at most 4)")
+    a.add_argument("--export-docx", action="store_true", help="write docx for every date, not only those that had one")
+    a.add_argument("--pack", default=dbmod.DEFAULT_PACK, help="pack name whose reports to rebuild")
+    a.set_defaults(func=cmd_rebuild)
+
+    a = sub.add_parser("watch", help="keep polling feeds on adaptive schedules; report at a daily cutoff")
+    a.add_argument("--pack", action="append", help="query pack JSON (repeatable; default config/query_pack.json)")
+    a.add_argument("--cutoff", default="23:30", help="daily selection/report time, HH:MM UTC")
+    a.add_argument("--since-hours", type=int, default=24, help="selection window ending at the cutoff")
+    a.add_argument("--max-gdelt", type=int, default=100)
+    a.add_argument("--fetch-workers", type=int, default=8, help="max concurrent source fetches")
+    a.add_argument("--min-interval", type=float, default=300, help="shortest per-source poll interval (seconds)")
+    a.add_argument("--max-interval", type=float, default=6 * 3600, help="longest per-source poll interval (seconds)")
+    a.add_argument("--once", action="store_true", help="poll every source once and exit")
+    a.add_argument("--refine", action="store_true")
+    a.add_argument("--export-docx", action="store_true")
+    a.add_argument("--run-log", default=os.path.join("data", "runs.jsonl"), help="JSON-lines timing log of cutoff runs ('' to disable)")
+    a.set_defaults(func=cmd_watch)
+
+    a = sub.add_parser("status", help="per-source polling schedule, churn, latency and circuit state")
+    a.add_argument("--json", action="store_true")
+    a.set_defaults(func=cmd_status)
+
+    a = sub.add_parser("archive", help="move old items and selections into compressed monthly files")
+    a.add_argument("--older-than", type=int, required=True, help="archive items and selections older than N days")
+    a.add_argument("--no-vacuum", action="store_true", help="skip compacting the database afterwards")
+    a.set_defaults(func=cmd_archive)
     return p
 
-if __name__ == "__main__":
-    parser = build_parser()
-    args = parser.parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
     args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import datetime as dt, json
+from agents import archive, db as dbmod
+from agents.rebuild import run_rebuild
+
+def _item(month, day, i, title=None):
+    key = f"2026-{month:02d}-{day:02d}"
+    return {"id": f"m{month}d{day}-{i}", "url": f"https://unhcr.org/{key}/{i}",
+            "title": title or f"Refugees in Sudan update {key} {i}", "publisher": "UNHCR", "domain": "unhcr.org",
+            "published_at": f"{key}T0{i}:00:00Z", "retrieved_at": f"{key}T10:00:00Z", "snippet": "camp funding",
+            "tier": "A", "keywords_hit": ["refugees"], "source_type": "rss"}
+
+def _arch_attached(conn):
+    return "arch" in [r[1] for r in conn.execute("PRAGMA database_list")]
+
+def test_archived_months_stay_readable(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    items = [_item(m, d, i) for m in (1, 2, 5) for d in (3, 4) for i in range(3)]
+    items[0]["title"] = "Glacier flooding forces herders from valley"
+    dbmod.upsert_items(conn, items)
+    for m in (1, 2, 5):
+        for d in (3, 4):
+            dbmod.save_daily_selected(conn, f"2026-{m:02d}-{d:02d}", [(f"m{m}d{d}-{i}", 3.0 - i) for i in range(2)])
+    before = {r["id"]: dict(r) for r in dbmod.get_items_for_window(conn, "2026-01-01T00:00:00Z", "2026-01-31T23:59:59Z")}
+    conn.close()
+
+    summary = archive.archive_older_than(db, dt.date(2026, 3, 1))
+    assert summary["items"] == 12 and summary["daily_selected"] == 8 and summary["months"] == ["2026-01", "2026-02"]
+    directory = archive.archive_dir(db)
+    idx = json.loads(open(f"{directory}/index.json", encoding="utf-8").read())
+    assert idx["horizon"] == "2026-03-01" and idx["partitions"]["2026-01"]["items"] == 6
+    assert (tmp_path / "t-archive").is_dir()
+
+    conn = dbmod.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 6
+    assert conn.execute("SELECT COUNT(*) FROM daily_selected").fetchone()[0] == 4
+    # recent reads never touch the archive
+    assert len(dbmod.get_items_for_window(conn, "2026-05-01T00:00:00Z", "2026-05-31T23:59:59Z")) == 6
+    assert not _arch_attached(conn)
+
+    after = {r["id"]: dict(r) for r in dbmod.get_items_for_window(conn, "2026-01-01T00:00:00Z", "2026-01-31T23:59:59Z")}
+    assert after == before
+    assert [r["id"] for r in dbmod.get_selected_items_for_date(conn, "2026-02-03")] == ["m2d3-0", "m2d3-1"]
+    assert dbmod.get_selected_dates(conn, "2026-01-01", "2026-12-31") == [
+        "2026-01-03", "2026-01-04", "2026-02-03", "2026-02-04", "2026-05-03", "2026-05-04"]
+    total, rows = dbmod.search_items(conn, "glacier")
+    assert total == 1 and rows[0]["id"] == "m1d3-0"
+
+    # an unchanged archived item stays archived; a changed one comes back hot and shadows its copy
+    assert dbmod.upsert_items(conn, [items[1]]) == {"inserted": 0, "updated": 0, "unchanged": 1}
+    changed = dict(items[2], title="Refugees in Sudan update, revised")
+    assert dbmod.upsert_items(conn, [changed]) == {"inserted": 0, "updated": 1, "unchanged": 0}
+    rows = dbmod.get_items_for_window(conn, "2026-01-01T00:00:00Z", "2026-01-31T23:59:59Z")
+    assert len(rows) == 6 and {r["title"] for r in rows if r["id"] == changed["id"]} == {changed["title"]}
+    conn.close()
+
+    # loading more months, or the archive's full-text index, leaves the caller's transaction open
+    conn = dbmod.connect(db)
+    dbmod.get_items_for_window(conn, "2026-01-01T00:00:00Z", "2026-01-31T23:59:59Z")
+    conn.execute("DELETE FROM items WHERE id = 'm5d3-0'")
+    assert len(dbmod.get_items_for_window(conn, "2026-02-01T00:00:00Z", "2026-02-28T23:59:59Z")) == 6
+    assert dbmod.search_items(conn, "glacier")[0] == 1
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM items WHERE id = 'm5d3-0'").fetchone()[0] == 1
+    conn.close()
+
+    out = run_rebuild(db, dt.date(2026, 1, 1), dt.date(2026, 2, 28), workers=1, out_root=str(tmp_path / "out"))
+    assert out == {"dates": 4, "rebuilt": 4, "skipped": 0, "docx": 0, "failed": []}
+    assert "Refugees in Sudan update 2026-01-04 0" in (tmp_path / "out" / "2026-01-04" / "report.md").read_text(encoding="utf-8")
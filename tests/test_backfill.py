@@ -0,0 +1,100 @@
+import json, threading, datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from agents import backfill, db as dbmod
+from agents.backfill import run_backfill, time_slices
+
+PACK = {"keywords": ["refugees"], "negative_keywords": [], "gdelt_query": "refugees",
+        "source_tiers": {"A": ["unhcr.org"]}, "rss_feeds": [], "report": {"max_top_developments": 8}}
+
+class _Gdelt(BaseHTTPRequestHandler):
+    fail_once = {"20260202000000"}
+    calls = []
+
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        start = qs["startdatetime"][0]
+        type(self).calls.append(start)
+        if start in self.fail_once:
+            self.fail_once.discard(start)
+            self.send_response(500)
+            self.end_headers()
+            return
+        day = dt.datetime.strptime(start, "%Y%m%d%H%M%S")
+        arts = [{"title": f"Refugees story {day:%d} number {i}", "url": f"https://unhcr.org/{day:%d}/{i}",
+                 "seendate": (day + dt.timedelta(hours=i)).strftime("%Y%m%dT%H%M%SZ"), "domain": "unhcr.org"}
+                for i in range(3)]
+        body = json.dumps({"articles": arts}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_time_slices_cover_range():
+    sl = time_slices(dt.date(2026, 2, 1), dt.date(2026, 2, 2), 12)
+    assert len(sl) == 4 and sl[-1][1] == dt.datetime(2026, 2, 2, 23, 59, 59)
+
+def test_backfill_resumes_and_reports(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Gdelt)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/api/v2/doc/doc"
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    try:
+        kw = dict(base_url=url, query_pack=PACK, out_root=str(tmp_path / "data"), workers=2)
+        first = run_backfill(db, dt.date(2026, 2, 1), dt.date(2026, 2, 3), **kw)
+        assert first["done"] == 2 and first["failed"] == 1
+        _Gdelt.calls.clear()
+        second = run_backfill(db, dt.date(2026, 2, 1), dt.date(2026, 2, 3), **kw)
+    finally:
+        srv.shutdown()
+    assert _Gdelt.calls == ["20260202000000"]
+    assert second["already_done"] == 2 and second["done"] == 1 and second["inserted"] == 3
+    conn = dbmod.connect(db)
+    assert len(dbmod.get_selected_items_for_date(conn, "2026-02-02")) == 1
+    assert {r["date"] for r in conn.execute("SELECT date FROM reports")} == {"2026-02-01", "2026-02-02", "2026-02-03"}
+    conn.close()
+    assert (tmp_path / "data" / "2026-02-02" / "report.md").exists()
+
+class _Busy(_Gdelt):
+    """Fills maxrecords for slices longer than 6 hours on Feb 1, and for every slice on Feb 2."""
+    calls = []
+
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        start, end = (dt.datetime.strptime(qs[k][0], "%Y%m%d%H%M%S") for k in ("startdatetime", "enddatetime"))
+        type(self).calls.append((start, end))
+        n = int(qs["maxrecords"][0]) if start.day == 2 or end - start >= dt.timedelta(hours=6) else 2
+        arts = [{"title": f"Refugees story {start:%d%H} number {i}", "url": f"https://unhcr.org/{start:%d%H}/{i}",
+                 "seendate": start.strftime("%Y%m%dT%H%M%SZ"), "domain": "unhcr.org"} for i in range(n)]
+        body = json.dumps({"articles": arts}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def test_backfill_splits_saturated_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "MIN_SLICE_SECONDS", 6 * 3600)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Busy)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/api/v2/doc/doc"
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    try:
+        kw = dict(base_url=url, query_pack=PACK, reports=False, workers=2, max_records=5)
+        first = run_backfill(db, dt.date(2026, 2, 1), dt.date(2026, 2, 2), **kw)
+        _Busy.calls.clear()
+        second = run_backfill(db, dt.date(2026, 2, 1), dt.date(2026, 2, 2), **kw)
+    finally:
+        srv.shutdown()
+    # each day -> two 12h halves -> four 6h quarters, which Feb 1 no longer fills and Feb 2 still does
+    assert (first["split"], first["done"], first["truncated"]) == (6, 4, 4)
+    assert first["inserted"] == 4 * 2 + 4 * 5
+    assert second["already_done"] == 2 and _Busy.calls == []
+    conn = dbmod.connect(db)
+    rows = conn.execute("SELECT status, COUNT(*) FROM backfill_slices GROUP BY status").fetchall()
+    conn.close()
+    assert dict(map(tuple, rows)) == {"split": 6, "done": 4, "truncated": 4}
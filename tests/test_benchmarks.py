@@ -0,0 +1,16 @@
+from agents.collector import load_query_pack, parse_feed
+from benchmarks import corpus
+from benchmarks.run import compare
+
+def test_corpus_is_deterministic_and_filterable():
+    assert corpus.synth_rss(50) == corpus.synth_rss(50)
+    assert corpus.synth_gdelt(20, seed=3) == corpus.synth_gdelt(20, seed=3)
+    a = [it["id"] for it in corpus.synth_items(30)]
+    assert a == [it["id"] for it in corpus.synth_items(30)] and len(set(a)) == 30
+    kept = parse_feed("bench://rss", "Synthetic", load_query_pack(corpus.QUERY_PACK), "t", content=corpus.synth_rss(200))
+    assert 0 < len(kept) < 200
+
+def test_compare_flags_only_real_slowdowns():
+    base = {"a": {"min_s": 0.100}, "b": {"min_s": 0.001}, "c": {"min_s": 0.100}}
+    cur = {"a": {"min_s": 0.140}, "b": {"min_s": 0.003}, "c": {"min_s": 0.110}, "d": {"min_s": 1.0}}
+    assert [r["stage"] for r in compare(cur, base, 0.25)] == ["a"]
@@ -0,0 +1,18 @@
+from benchmarks import startup
+
+def test_parse_importtime_sums_top_level_imports():
+    err = ("import time: self [us] | cumulative | imported package\n"
+           "import time:       100 |        100 |   urllib3.util\n"
+           "import time:       200 |        300 | requests\n"
+           "import time:        50 |         50 | json\n")
+    assert startup.parse_importtime(err) == (0.00035, {"urllib3", "requests", "json"})
+
+def test_subcommands_load_only_allowed_heavy_modules():
+    # import-time budgets depend on the machine; `python benchmarks/startup.py` checks them
+    assert startup.unexpected_imports(startup.profile_commands()) == []
+
+def test_budget_check_reports_time_and_modules():
+    results = {"search": {"import_s": 0.5, "heavy": []}, "status": {"import_s": 0.01, "heavy": ["docx"]},
+               "run-daily": {"import_s": 0.01, "heavy": ["requests", "feedparser"]}}
+    assert startup.unexpected_imports(results) == ["status: loaded docx"]
+    assert startup.over_budget(results) == ["search: imports took 0.500s (budget 0.12s)", "status: loaded docx"]
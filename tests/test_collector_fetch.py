@@ -0,0 +1,132 @@
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents import collector, db as dbmod
+
+RSS = b'''<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><guid>a</guid><title>Refugees cross border</title><link>https://reliefweb.int/a</link><description>camp</description></item>
+<item><guid>b</guid><title>Fantasy football displaced</title><link>https://example.com/b</link></item>
+</channel></rss>'''
+
+PACK = {
+    "keywords": ["refugees", "camp"], "negative_keywords": ["fantasy football"],
+    "source_tiers": {"A": ["reliefweb.int"]}, "gdelt_query": "refugee",
+    "rss_feeds": [{"name": "slow", "url": "http://slow"}, {"name": "fast", "url": "http://fast"}],
+}
+
+def test_fetch_sources_parallel_with_deadline(monkeypatch):
+    def fake_feed(url, timeout=None, state=None, session=None):
+        if url == "http://slow":
+            time.sleep(1.0)
+        return {"status": 200, "content": RSS, "bytes": len(RSS), "etag": None, "last_modified": None}
+    monkeypatch.setattr(collector, "fetch_feed", fake_feed)
+    monkeypatch.setattr(collector, "fetch_url", lambda url, timeout=None, params=None, session=None: b'{"articles": []}')
+    items, stats = collector.fetch_sources(PACK, "run", deadline=0.5)
+    by_name = {s["name"]: s for s in stats}
+    assert by_name["slow"]["status"] == "deadline_exceeded"
+    assert by_name["fast"]["status"] == "ok" and by_name["fast"]["items"] == 1
+    assert by_name["GDELT"]["status"] == "ok"
+    assert [s["name"] for s in stats] == ["slow", "fast", "GDELT"]
+    assert len(items) == 1 and items[0]["tier"] == "A"
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(RSS)))
+        self.end_headers()
+        self.wfile.write(RSS)
+
+    def log_message(self, *args):
+        pass
+
+def test_conditional_fetch_and_seen_entries(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/feed.xml"
+    try:
+        first = collector.fetch_feed(url)
+        assert first["status"] == 200 and first["etag"] == '"v1"' and first["bytes"] == len(RSS)
+        again = collector.fetch_feed(url, state={"etag": first["etag"]})
+        assert again["status"] == 304 and again["content"] is None
+    finally:
+        srv.shutdown()
+
+    stats = {}
+    items = collector.parse_feed(url, "f", PACK, "run", content=RSS, seen={"a"}, stats=stats)
+    assert items == [] and stats["entries_skipped"] == 1 and stats["entry_ids"] == ["a", "b"]
+
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    dbmod.save_feed_state(conn, url, '"v1"', None, ["a", "b"], "k1")
+    assert dbmod.get_feed_states(conn)[url] == {"etag": '"v1"', "last_modified": None, "seen_ids": ["a", "b"],
+                                                "seen_key": "k1"}
+    conn.close()
+
+def test_seen_entries_are_keyed_by_pack(monkeypatch):
+    calls = []
+
+    def fake_feed(url, timeout=None, state=None, session=None):
+        calls.append(dict(state or {}))
+        return {"status": 200, "content": RSS, "bytes": len(RSS), "etag": '"v1"', "last_modified": None}
+    monkeypatch.setattr(collector, "fetch_feed", fake_feed)
+    feed = {"name": "f", "url": "http://f"}
+    items, state = collector.collect_feed(feed, [PACK], "run")
+    assert [it["url"] for it in items] == ["https://reliefweb.int/a"] and state["seen_ids"] == ["a", "b"]
+    # same pack: both entries skipped, including the one it filtered out
+    assert collector.collect_feed(feed, [PACK], "run", state=state)[0] == []
+    assert calls[-1]["etag"] == '"v1"'
+    # an edited pack fetches in full and evaluates the entry the old one dropped
+    edited = dict(PACK, negative_keywords=[], keywords=["displaced"])
+    items, again = collector.collect_feed(feed, [edited], "run", state=state)
+    assert calls[-1] == {} and [it["url"] for it in items] == ["https://example.com/b"]
+    assert again["seen_key"] == collector.seen_key([edited]) != state["seen_key"]
+
+def test_feed_finishing_after_deadline_keeps_its_old_state(tmp_path, monkeypatch):
+    finished = threading.Event()
+    def fake_feed(url, timeout=None, state=None, session=None):
+        if url == "http://slow":
+            time.sleep(0.6)
+            finished.set()
+        return {"status": 200, "content": RSS, "bytes": len(RSS), "etag": f'"{url[7:]}"', "last_modified": None}
+    monkeypatch.setattr(collector, "fetch_feed", fake_feed)
+    monkeypatch.setattr(collector, "fetch_url", lambda url, timeout=None, params=None, session=None: b'{"articles": []}')
+    upsert = dbmod.upsert_items
+
+    def late_write(*args, **kwargs):
+        # the abandoned fetch completes while the run is still writing
+        assert finished.wait(2)
+        time.sleep(0.05)
+        return upsert(*args, **kwargs)
+    monkeypatch.setattr(dbmod, "upsert_items", late_write)
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    meta = collector.collect_and_persist(db, packs=[dict(PACK, report={})], deadline=0.3)
+    assert {s["name"]: s["status"] for s in meta["sources"]} == {"slow": "deadline_exceeded", "fast": "ok", "GDELT": "ok"}
+    conn = dbmod.connect(db)
+    states = dbmod.get_feed_states(conn)
+    conn.close()
+    # the slow feed's entries were never written, so it must not be marked fetched or its entries seen
+    assert list(states) == ["http://fast"] and states["http://fast"]["etag"] == '"fast"'
+
+def test_deadline_is_checked_between_results(monkeypatch):
+    timeouts = {}
+
+    def fake_feed(url, timeout=None, state=None, session=None):
+        timeouts[url] = timeout
+        time.sleep({"http://slow": 0.2, "http://fast": 0.0}[url])
+        return {"status": 200, "content": RSS, "bytes": len(RSS), "etag": None, "last_modified": None}
+    monkeypatch.setattr(collector, "fetch_feed", fake_feed)
+    monkeypatch.setattr(collector, "fetch_url", lambda url, timeout=None, params=None, session=None: b'{"articles": []}')
+    statuses = {}
+    for _, st, _, _ in collector.iter_sources(PACK, "run", deadline=1.0, source_timeout=20):
+        statuses[st["name"]] = st["status"]
+        if st["name"] == "fast":
+            time.sleep(1.2)  # the caller writes past the deadline while the slow feed finishes
+    # a source that finished before the deadline was checked again is kept, not abandoned
+    assert statuses == {"fast": "ok", "slow": "ok", "GDELT": "ok"}
+    assert all(collector.MIN_REQUEST_TIMEOUT_S <= t <= 1.0 for t in timeouts.values())
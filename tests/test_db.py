@@ -0,0 +1,110 @@
+import sqlite3
+import pytest
+from agents import db as dbmod
+
+def _item(i, title="Refugees arrive"):
+    return {"id": f"id{i}", "url": f"https://unhcr.org/{i}", "title": title, "publisher": "UNHCR",
+            "domain": "unhcr.org", "published_at": "2026-02-20T10:00:00Z", "retrieved_at": f"2026-02-20T1{i % 10}:00:00Z",
+            "snippet": "", "tier": "A", "keywords_hit": ["refugees"], "source_type": "rss", "collection_run_id": "r1"}
+
+def test_upsert_counts_and_skips_unchanged(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    assert dbmod.upsert_items(conn, [_item(i) for i in range(5)]) == {"inserted": 5, "updated": 0, "unchanged": 0}
+    again = [_item(i) for i in range(5)]
+    again[0]["retrieved_at"] = "2026-02-21T00:00:00Z"
+    again[1]["title"] = "Refugees arrive at border"
+    assert dbmod.upsert_items(conn, again + [_item(9)]) == {"inserted": 1, "updated": 1, "unchanged": 4}
+    row = conn.execute("SELECT title, retrieved_at FROM items WHERE id='id1'").fetchone()
+    assert row["title"] == "Refugees arrive at border"
+    assert conn.execute("SELECT retrieved_at FROM items WHERE id='id0'").fetchone()[0] == "2026-02-20T10:00:00Z"
+    conn.close()
+
+def test_window_queries_use_event_ts_index(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    a, b = _item(1), _item(2)
+    b["published_at"] = "Fri, 20 Feb 2026 12:30:00 +0100"
+    c = _item(3)
+    c["published_at"] = None
+    dbmod.upsert_items(conn, [a, b, c])
+    rows = dbmod.get_items_for_window(conn, "2026-02-20T10:00:00Z", "2026-02-20T14:00:00Z")
+    assert [r["id"] for r in rows] == ["id3", "id2", "id1"]
+    plan = " ".join(r[-1] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM items WHERE event_ts >= 0 AND event_ts <= 1 ORDER BY event_ts DESC"))
+    assert "idx_items_event_ts" in plan
+    conn.close()
+
+def test_rollups_match_row_scan(tmp_path):
+    import datetime as dt
+    from agents import trends
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    today = dt.datetime.utcnow().date()
+    items = []
+    for i in range(40):
+        it = _item(i, title=["Refugees in camp", "Asylum funding shortfall", "Border returns"][i % 3])
+        it["published_at"] = f"{today - dt.timedelta(days=i % 10)}T08:00:00Z"
+        it["publisher"] = ["UNHCR", "IOM"][i % 2]
+        items.append(it)
+    dbmod.upsert_items(conn, items)
+    items[0]["title"] = "Aid appeal"
+    dbmod.upsert_items(conn, items[:1])
+    first = (today - dt.timedelta(days=6)).isoformat()
+    rows = [r for r in conn.execute("SELECT * FROM items") if r["published_at"][:10] >= first]
+    conn.close()
+
+    got = trends.rolling_trends(db)
+    expected = trends._scan(rows)
+    assert got["counts"]["7d"] == len(rows)
+    assert got["7d"]["tiers"] == expected["tiers"]
+    assert dict(got["7d"]["themes"]) == dict(expected["themes"])
+    assert dict(got["7d"]["publishers"]) == dict(expected["publishers"])
+    assert sum(got["series"]["totals"]) == 40
+
+def test_fts_search_tracks_updates(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    a, b = _item(1, "Sudan returns stall as camps fill"), _item(2, "Ukraine shelter appeal")
+    b["tier"] = "B"
+    dbmod.upsert_items(conn, [a, b])
+    total, rows = dbmod.search_items(conn, "sudan returns")
+    assert total == 1 and rows[0]["id"] == "id1"
+    a["title"] = "Syria returns stall"
+    dbmod.upsert_items(conn, [a])
+    assert dbmod.search_items(conn, "sudan")[0] == 0
+    assert dbmod.search_items(conn, "returns OR shelter", tiers=["B"])[0] == 1
+    assert dbmod.search_items(conn, 'stall"')[0] == 1
+    conn.close()
+
+def test_session_migrates_once_and_tunes_connection(tmp_path):
+    db = str(tmp_path / "t.db")
+    with dbmod.Session(db) as session:
+        conn = session.conn
+        assert dbmod.schema_version(conn) == dbmod.SCHEMA_VERSION
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert not dbmod.migrate(conn)
+        dbmod.upsert_items(conn, [_item(1)])
+        with dbmod.borrow(session) as same:
+            assert same is conn
+    with dbmod.Session(db, readonly=True) as reader:
+        assert reader.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+        try:
+            reader.conn.execute("DELETE FROM items")
+        except sqlite3.OperationalError as e:
+            assert "readonly" in str(e)
+        else:
+            raise AssertionError("read-only session accepted a write")
+    # a failing run's uncommitted work is rolled back, not committed on close
+    with pytest.raises(RuntimeError):
+        with dbmod.Session(db) as session:
+            session.conn.execute("DELETE FROM items")
+            raise RuntimeError("stage failed")
+    with dbmod.Session(db, readonly=True) as reader:
+        assert reader.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
@@ -0,0 +1,92 @@
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents import db as dbmod
+from agents.enricher import extract_text, run_enrichment
+
+ARTICLE = ("<html><head><script>var x = 'ignored script text here';</script></head><body>"
+           "<nav><p>Home | World | Sudan | Subscribe to our newsletter</p></nav><article>"
+           "<h1>Camp</h1><p>Aid agencies said water trucking to the Adre camp resumed on Tuesday.</p>"
+           "<p>More than 12,000 refugees crossed the border last week, according to UNHCR.</p></article>"
+           "<footer><p>Copyright notice and other footer boilerplate text</p></footer></body></html>").encode()
+
+class _Site(BaseHTTPRequestHandler):
+    hits: list = []
+    inflight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits.append(self.path)
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        try:
+            time.sleep(0.05)
+            if self.path == "/robots.txt":
+                body, ctype = b"User-agent: *\nDisallow: /private/\n", "text/plain"
+            elif self.path.endswith(".pdf"):
+                body, ctype = b"%PDF-1.4", "application/pdf"
+            elif self.headers.get("If-None-Match") == '"a1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            else:
+                body, ctype = ARTICLE, "text/html; charset=utf-8"
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("ETag", '"a1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.inflight -= 1
+
+    def log_message(self, *args):
+        pass
+
+def _item(base, path, tier="A"):
+    return {"id": path, "url": f"{base}{path}", "title": f"Item {path}", "publisher": "P", "domain": "127.0.0.1",
+            "published_at": None, "retrieved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "snippet": "", "tier": tier, "keywords_hit": [], "source_type": "rss"}
+
+def test_extract_text_prefers_article_and_is_bounded():
+    text = extract_text(ARTICLE.decode())
+    assert text.startswith("Aid agencies said") and "12,000 refugees" in text
+    assert "newsletter" not in text and "ignored" not in text and "Copyright" not in text
+    assert len(extract_text(ARTICLE.decode(), max_chars=30)) == 30
+
+def test_enrich_against_local_site(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    paths = [f"/news/{i}" for i in range(6)] + ["/private/x", "/doc.pdf"]
+    dbmod.upsert_items(conn, [_item(base, p) for p in paths] + [_item(base, "/news/tier-u", tier="U")])
+    conn.close()
+    try:
+        summary = run_enrichment(db, workers=8, per_host=2, interval=0)
+        assert summary["candidates"] == 8 and summary["ok"] == 6
+        assert summary["robots_disallowed"] == 1 and summary["unsupported"] == 1
+        assert _Site.peak <= 2
+        assert _Site.hits.count("/robots.txt") == 1 and "/private/x" not in _Site.hits
+
+        conn = dbmod.connect(db)
+        assert "12,000 refugees" in dbmod.get_item_text(conn, "/news/0")
+        stored = conn.execute("SELECT length(full_text_z) FROM items WHERE id='/news/0'").fetchone()[0]
+        assert 0 < stored < len(ARTICLE)
+        total, rows = dbmod.search_items(conn, "trucking")
+        assert total == 6
+        conn.close()
+
+        assert run_enrichment(db, interval=0)["candidates"] == 0
+        again = run_enrichment(db, interval=0, refresh=True)
+        assert again["not_modified"] == 6
+        conn = dbmod.connect(db)
+        assert "12,000 refugees" in dbmod.get_item_text(conn, "/news/0")
+        conn.close()
+    finally:
+        srv.shutdown()
@@ -0,0 +1,55 @@
+import json
+from agents import collector, db as dbmod
+from agents.instrument import Recorder
+
+def _item(i):
+    return {"id": f"id{i}", "url": f"https://unhcr.org/{i}", "title": f"Refugees arrive {i}", "publisher": "UNHCR",
+            "domain": "unhcr.org", "published_at": "2026-02-20T10:00:00Z", "retrieved_at": "2026-02-20T10:00:00Z",
+            "snippet": "", "tier": "A", "keywords_hit": ["refugees"], "source_type": "rss"}
+
+def test_recorder_counts_rows_and_persists(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    with Recorder(run_id="r1", profile_dir=str(tmp_path / "prof")) as rec:
+        with rec.stage("write"):
+            conn = dbmod.connect(db)
+            dbmod.upsert_items(conn, [_item(i) for i in range(3)])
+            conn.close()
+        with rec.stage("read"):
+            conn = dbmod.connect(db)
+            dbmod.get_items_for_window(conn, "2026-02-20T00:00:00Z", "2026-02-20T23:59:59Z")
+            conn.close()
+        rec.source({"name": "UNHCR", "type": "rss", "status": "ok", "latency_ms": 120.0, "cpu_ms": 4.0,
+                    "entries": 10, "items": 3, "inserted": 1, "updated": 1, "bytes": 2048})
+        rec.finish("run-daily")
+    write, read, source, run = rec.records
+    assert write["rows_written"] >= 3 and read["rows_read"] == 3 and read["rows_written"] == 0
+    assert source["http_bytes"] == 2048 and source["wall_s"] == 0.12
+    assert source["rows_written"] == 2 and source["meta"]["items"] == 3
+    assert run["kind"] == "run" and run["rows_read"] >= 3 and write["wall_s"] >= 0 and write["cpu_s"] >= 0
+    assert (tmp_path / "prof" / "r1-write.prof").exists()
+
+    conn = dbmod.connect(db)
+    dbmod.save_run_records(conn, rec.records)
+    assert [r["name"] for r in conn.execute("SELECT name FROM runs WHERE run_id='r1' ORDER BY rowid")] == ["write", "read", "UNHCR", "run-daily"]
+    conn.close()
+    rec.write_jsonl(str(tmp_path / "runs.jsonl"))
+    lines = (tmp_path / "runs.jsonl").read_text().splitlines()
+    assert [json.loads(ln)["kind"] for ln in lines] == ["stage", "stage", "source", "run"]
+
+def test_source_rows_written_counts_rows_not_items(tmp_path, monkeypatch):
+    articles = [{"title": "Refugees reach camp", "url": "https://reliefweb.int/a", "domain": "reliefweb.int",
+                 "seendate": "20260220T100000Z"}]
+    monkeypatch.setattr(collector, "fetch_url", lambda *a, **k: json.dumps({"articles": articles}).encode())
+    pack = {"keywords": ["refugees"], "negative_keywords": [], "source_tiers": {"A": ["reliefweb.int"]},
+            "gdelt_query": "refugees", "rss_feeds": [], "report": {}}
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    with Recorder(run_id="r1") as rec:
+        for _ in range(2):
+            meta = collector.collect_and_persist(db, packs=[pack])
+            rec.source(meta["sources"][0])
+    first, second = rec.records
+    assert (first["rows_written"], first["meta"]["items"]) == (1, 1)
+    # kept again, but unchanged: nothing written
+    assert (second["rows_written"], second["meta"]["items"]) == (0, 1)
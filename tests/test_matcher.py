@@ -0,0 +1,26 @@
+import random
+from agents.matcher import Matcher, THEME_LEXICON, REGION_HINTS
+
+def _naive(text, terms):
+    t = text.lower()
+    return {k for k in terms if k.lower() in t}
+
+def test_matcher_matches_substring_semantics():
+    keywords = ["refugee", "refugees", "displaced", "internally displaced", "IDP", "IDPs", "asylum seeker",
+                "asylum seekers", "camp", "resettlement", "forced displacement", "displacement"]
+    negatives = ["fantasy football", "displaced fracture"]
+    m = Matcher(keywords, negatives, THEME_LEXICON, REGION_HINTS)
+    rng = random.Random(7)
+    vocab = keywords + negatives + ["the", "UN", "Sudanese", "aid", "border", "campaign", "IDPs;", "returns"]
+    for _ in range(500):
+        text = " ".join(rng.choice(vocab) for _ in range(rng.randint(0, 12)))
+        hits = m.scan(text)
+        assert hits["keywords"] == _naive(text, keywords)
+        assert hits["negatives"] == _naive(text, negatives)
+        assert hits["regions"] == _naive(text, REGION_HINTS)
+        assert hits["themes"] == {th for th, ps in THEME_LEXICON.items() if _naive(text, ps)}
+
+def test_matcher_scales_to_hundreds_of_terms():
+    terms = [f"term{i} phrase" for i in range(800)] + ["term1"]
+    m = Matcher(terms)
+    assert m.keyword_hits("A TERM12 Phrase and term799 phrase") == ["term1", "term12 phrase", "term799 phrase"]
@@ -0,0 +1,61 @@
+from agents import db as dbmod, neardup
+from agents.collector import pick_cluster_representatives
+
+def _item(i, title, publisher):
+    return {"id": f"id{i}", "url": f"https://{publisher}.com/{i}", "title": title, "publisher": publisher,
+            "domain": f"{publisher}.com", "published_at": "2026-02-20T10:00:00Z", "retrieved_at": "2026-02-20T11:00:00Z",
+            "snippet": "", "tier": "B", "keywords_hit": ["refugees"], "source_type": "gdelt"}
+
+def test_syndicated_copies_share_a_cluster(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    wire = "Thousands of Sudanese refugees cross into Chad as fighting intensifies in Darfur"
+    dbmod.upsert_items(conn, [_item(1, wire, "apnews"), _item(2, "Ukraine winter shelter appeal for displaced families falls short", "bbc")])
+    dbmod.upsert_items(conn, [_item(3, wire, "abcnews"), _item(4, wire.replace("Thousands of", "Thousands more"), "wtop")])
+    clusters = dict(conn.execute("SELECT id, cluster_id FROM items"))
+    conn.close()
+    assert clusters["id3"] == clusters["id1"] == "id1"
+    assert clusters["id4"] == "id1"
+    assert clusters["id2"] == "id2"
+
+def test_pick_one_representative_per_cluster():
+    scored = [("a", 5.0, "c1"), ("b", 4.9, "c1"), ("c", 4.0, "c2"), ("d", 3.0, "c1")]
+    assert pick_cluster_representatives(scored, 8) == [("a", 5.0, 3), ("c", 4.0, 1)]
+
+def test_items_without_shingles_are_not_merged(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    assert neardup.band_keys("—", "") == []
+    dbmod.upsert_items(conn, [_item(1, "—", "apnews"), _item(2, "!!!", "bbc")])
+    dbmod.upsert_items(conn, [_item(3, "…", "wtop")])
+    assert dict(conn.execute("SELECT id, cluster_id FROM items")) == {"id1": "id1", "id2": "id2", "id3": "id3"}
+
+    # databases written before keep their merged cluster until the migration splits it
+    conn.executemany("INSERT INTO lsh_buckets(band,bucket,item_id,cluster_id) VALUES (?,?,?,'id1')",
+                     [(b, k, i) for b, k in neardup.LEGACY_EMPTY_KEYS for i in ("id1", "id2", "id3")])
+    conn.execute("UPDATE items SET cluster_id = 'id1'")
+    conn.execute("PRAGMA user_version=5")
+    conn.commit()
+    assert dbmod.migrate(conn)
+    assert dict(conn.execute("SELECT id, cluster_id FROM items")) == {"id1": "id1", "id2": "id2", "id3": "id3"}
+    assert conn.execute("SELECT COUNT(*) FROM lsh_buckets").fetchone()[0] == 0
+    conn.close()
+
+def test_single_bucket_collisions_are_checked(tmp_path, monkeypatch):
+    # with votes alone never enough, joining rests on the shingle similarity of the colliding item
+    monkeypatch.setattr(neardup, "MIN_BAND_VOTES", neardup.BANDS + 1)
+    wire = "Thousands of Sudanese refugees cross into Chad as fighting intensifies in Darfur"
+    for min_jaccard, joined in ((0.5, True), (0.95, False)):
+        monkeypatch.setattr(neardup, "MIN_JACCARD", min_jaccard)
+        db = str(tmp_path / f"t{min_jaccard}.db")
+        dbmod.init_db(db)
+        conn = dbmod.connect(db)
+        dbmod.upsert_items(conn, [_item(1, wire, "apnews")])
+        dbmod.upsert_items(conn, [_item(2, wire.replace("Thousands of", "Thousands more"), "wtop"),
+                                  _item(3, wire.replace("Thousands of", "Thousands more"), "abc")])
+        clusters = dict(conn.execute("SELECT id, cluster_id FROM items"))
+        conn.close()
+        assert (clusters["id2"] == "id1") is joined
+        assert clusters["id3"] == clusters["id2"]  # an identical copy in the same batch
@@ -0,0 +1,80 @@
+import sqlite3
+from agents import collector, db as dbmod
+
+RSS = b'''<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><guid>a</guid><title>Refugees cross border</title><link>https://reliefweb.int/a</link></item>
+<item><guid>b</guid><title>Camp flooding displaces families</title><link>https://example.com/b</link></item>
+<item><guid>c</guid><title>Central bank holds rates</title><link>https://example.com/c</link></item>
+</channel></rss>'''
+
+def _pack(name, keywords, feeds, tiers):
+    return {"name": name, "keywords": keywords, "negative_keywords": [], "source_tiers": tiers,
+            "gdelt_query": "refugee", "rss_feeds": feeds, "report": {"max_top_developments": 8}}
+
+def test_shared_feed_fetched_once_and_selected_per_pack(tmp_path, monkeypatch):
+    fetched = []
+    def fake_feed(url, timeout=None, state=None, session=None):
+        fetched.append(url)
+        return {"status": 200, "content": RSS, "bytes": len(RSS), "etag": None, "last_modified": None}
+    monkeypatch.setattr(collector, "fetch_feed", fake_feed)
+    monkeypatch.setattr(collector, "fetch_url", lambda url, timeout=None, params=None, session=None: b'{"articles": []}')
+
+    shared = {"name": "shared", "url": "http://shared"}
+    packs = [_pack("refugees", ["refugees"], [shared], {"A": ["reliefweb.int"]}),
+             _pack("camps", ["camp", "refugees"], [shared, {"name": "own", "url": "http://own"}], {"B": ["reliefweb.int"]})]
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    meta = collector.collect_and_persist(db, packs=packs)
+
+    assert sorted(fetched) == ["http://own", "http://shared"]
+    assert meta["packs"]["refugees"]["selected"] == 1 and meta["packs"]["camps"]["selected"] == 2
+    conn = dbmod.connect(db)
+    tags = {(r["pack"], r["item_id"]): r["tier"] for r in conn.execute("SELECT pack, item_id, tier FROM item_packs")}
+    assert sorted(tags.values()) == ["A", "B", "U"]
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+    day = meta["date"]
+    assert [r["tier"] for r in dbmod.get_selected_items_for_date(conn, day, "refugees")] == ["A"]
+    assert sorted(r["tier"] for r in dbmod.get_selected_items_for_date(conn, day, "camps")) == ["B", "U"]
+    conn.close()
+
+def test_pack_keys_migrated_from_single_pack_schema(tmp_path):
+    db = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db)
+    conn.executescript("""
+        CREATE TABLE daily_selected (date TEXT NOT NULL, item_id TEXT NOT NULL, score REAL, cluster_size INTEGER,
+                                     PRIMARY KEY (date, item_id));
+        CREATE TABLE reports (date TEXT PRIMARY KEY, report_path TEXT, docx_path TEXT, meta_json TEXT);
+        INSERT INTO daily_selected VALUES ('2026-02-01', 'x', 1.5, 1);
+        INSERT INTO reports VALUES ('2026-02-01', 'r.md', NULL, '{}');
+    """)
+    conn.commit()
+    conn.close()
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    assert [tuple(r) for r in conn.execute("SELECT pack, date, item_id FROM daily_selected")] == [("default", "2026-02-01", "x")]
+    assert dbmod.get_selected_dates(conn, "2026-01-01", "2026-12-31") == ["2026-02-01"]
+    assert list(dbmod.get_report_rows(conn, ["2026-02-01"])) == ["2026-02-01"]
+    conn.close()
+
+def test_pack_tags_keep_the_items_event_ts(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    it = {"id": "u1", "url": "https://example.org/u1", "title": "Refugees reach camp", "publisher": "UNHCR",
+          "published_at": None, "retrieved_at": "2026-02-20T10:00:00Z", "tier": "A", "keywords_hit": ["refugees"]}
+    dbmod.upsert_items(conn, [it])
+    # a later fetch of the same undated item leaves the items row unchanged but re-tags it
+    later = dict(it, retrieved_at="2026-02-22T10:00:00Z")
+    assert dbmod.upsert_items(conn, [dict(later, packs={"default": later, "camps": later})])["unchanged"] == 1
+    dbmod.tag_items(conn, dbmod.pack_tag_rows(later, "other"), replace=False)
+    ev = conn.execute("SELECT event_ts FROM items WHERE id = 'u1'").fetchone()[0]
+    assert {(r["pack"], r["event_ts"]) for r in conn.execute("SELECT pack, event_ts FROM item_packs")} == {
+        ("default", ev), ("camps", ev), ("other", ev)}
+
+    # tags that drifted before this was fixed are reset by the migration
+    conn.execute("UPDATE item_packs SET event_ts = event_ts + 86400")
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+    assert dbmod.migrate(conn)
+    assert {r[0] for r in conn.execute("SELECT event_ts FROM item_packs")} == {ev}
+    conn.close()
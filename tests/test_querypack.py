@@ -0,0 +1,63 @@
+import json, os
+from agents import querypack
+from agents.collector import filter_gdelt, load_query_pack
+
+TIERS = {"A": ["reliefweb.int", "un.org", "UNHCR.org"], "B": ["news.un.org", "bbc.com"], "C": []}
+
+def test_domain_trie_matches_whole_labels():
+    trie = querypack.DomainTrie(TIERS)
+    assert trie.tier("un.org") == "A" and trie.tier("www.un.org") == "A"
+    assert trie.tier("notun.org") == "U" and trie.tier("un.org.evil.com") == "U"
+    assert trie.tier("news.un.org") == "B"  # the longest listed suffix wins
+    assert trie.tier("Blog.UNHCR.org:443") == "A"
+    assert trie.tier("") == "U" and trie.tier("org") == "U"
+
+def test_compiled_pack_is_cached_by_content(tmp_path, monkeypatch):
+    path = tmp_path / "pack.json"
+    pack = {"keywords": ["refugees ", "refugees"], "negative_keywords": ["fantasy football"], "source_tiers": TIERS,
+            "gdelt_query": "refugees", "rss_feeds": []}
+    path.write_text(json.dumps(pack), encoding="utf-8")
+    cache = str(tmp_path / "cache")
+    cp = querypack.load(str(path), cache_dir=cache)
+    assert cp.settings["keywords"] == ["refugees"] and cp.settings["report"] == {}
+    assert os.listdir(cache) == [f"{cp.digest}-v{querypack.ARTIFACT_VERSION}.json"]
+    assert querypack.load(str(path), cache_dir=cache) is cp
+
+    # a new process reads the artifact instead of compiling
+    monkeypatch.setattr(querypack, "_loaded", {})
+    monkeypatch.setattr(querypack, "_by_digest", {})
+    monkeypatch.setattr(querypack, "normalize", lambda *a: (_ for _ in ()).throw(AssertionError("compiled")))
+    monkeypatch.setattr(querypack.DomainTrie, "add", lambda *a: (_ for _ in ()).throw(AssertionError("compiled")))
+    again = querypack.load(str(path), cache_dir=cache)
+    assert again.digest == cp.digest and again.tier_for_domain("news.un.org") == "B"
+    assert again.settings == cp.settings and again.matcher.keyword_hits("Refugees cross") == ["refugees"]
+    monkeypatch.undo()
+
+    # an artifact for another digest or format is ignored and rewritten
+    artifact = os.path.join(cache, os.listdir(cache)[0])
+    with open(artifact, "w", encoding="utf-8") as f:
+        json.dump({"version": querypack.ARTIFACT_VERSION, "digest": "x", "settings": {}, "domains": {}}, f)
+    monkeypatch.setattr(querypack, "_loaded", {})
+    monkeypatch.setattr(querypack, "_by_digest", {})
+    assert querypack.load(str(path), cache_dir=cache).tier_for_domain("un.org") == "A"
+    with open(artifact, encoding="utf-8") as f:
+        assert json.load(f)["digest"] == cp.digest
+
+    # editing the file changes the key
+    path.write_text(json.dumps(dict(pack, keywords=["asylum"])), encoding="utf-8")
+    edited = querypack.load(str(path), cache_dir=cache)
+    assert edited.digest != cp.digest and len(os.listdir(cache)) == 2
+    assert edited.matcher.keyword_hits("Asylum claims rise") == ["asylum"]
+
+def test_collection_uses_compiled_tiers(tmp_path, monkeypatch):
+    monkeypatch.setattr(querypack, "_loaded", {})
+    monkeypatch.setattr(querypack, "_by_digest", {})
+    db = str(tmp_path / "t.db")
+    q = load_query_pack("config/query_pack.json", db_path=db)
+    assert querypack.compiled(q).digest == querypack.load("config/query_pack.json").digest
+    assert os.listdir(querypack.cache_dir_for(db)) == [f"{q.compiled.digest}-v{querypack.ARTIFACT_VERSION}.json"]
+    articles = [{"title": "Refugees reach camp", "url": "https://notun.org/a", "seendate": "20260220T100000Z"},
+                {"title": "Refugees reach camp", "url": "https://www.un.org/b", "seendate": "20260220T100000Z"}]
+    assert [it["tier"] for it in filter_gdelt(articles, q, "r")] == ["U", "A"]
+    # plain dicts (packs built in code) are compiled from their contents
+    assert [it["tier"] for it in filter_gdelt(articles, dict(q), "r")] == ["U", "A"]
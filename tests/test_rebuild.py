@@ -0,0 +1,43 @@
+import json, datetime as dt
+from agents import db as dbmod
+from agents.collector import select_for_window
+from agents.editor import qa_and_append
+from agents.rebuild import run_rebuild
+from agents.writer import build_report
+
+def _item(day, i):
+    return {"id": f"d{day}-{i}", "url": f"https://unhcr.org/{day}/{i}", "title": f"Refugees in Sudan update {day}-{i}",
+            "publisher": "UNHCR", "domain": "unhcr.org", "published_at": f"2026-02-{day:02d}T0{i}:00:00Z",
+            "retrieved_at": f"2026-02-{day:02d}T10:00:00Z", "snippet": "camp funding", "tier": "A",
+            "keywords_hit": ["refugees"], "source_type": "rss"}
+
+def test_rebuild_matches_sequential_reports(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    dbmod.upsert_items(conn, [_item(d, i) for d in range(1, 6) for i in range(3)])
+    for d in (2, 3, 4):
+        key = f"2026-02-{d:02d}"
+        select_for_window(conn, f"{key}T00:00:00Z", f"{key}T23:59:59Z", key, 8,
+                          now=dt.datetime(2026, 2, d, 23, 59, 59, tzinfo=dt.timezone.utc))
+    dbmod.save_report_meta(conn, "2026-02-03", "old.md", "old.docx", {"date": "2026-02-03", "items_collected": 42})
+    conn.close()
+
+    expected = {}
+    for d in (2, 3, 4):
+        key = f"2026-02-{d:02d}"
+        report, _ = build_report(key, db_path=db, out_dir=str(tmp_path / "seq" / key))
+        qa_and_append(report, db_path=db)
+        expected[key] = open(report.path, encoding="utf-8").read()
+
+    summary = run_rebuild(db, dt.date(2026, 2, 1), dt.date(2026, 2, 28), workers=2, out_root=str(tmp_path / "out"))
+    assert summary == {"dates": 3, "rebuilt": 3, "skipped": 0, "docx": 1, "failed": []}
+    for key, text in expected.items():
+        assert (tmp_path / "out" / key / "report.md").read_text(encoding="utf-8") == text
+    assert (tmp_path / "out" / "2026-02-03" / "report.docx").exists()
+    assert not (tmp_path / "out" / "2026-02-02" / "report.docx").exists()
+
+    conn = dbmod.connect(db)
+    meta = json.loads(conn.execute("SELECT meta_json FROM reports WHERE date='2026-02-03'").fetchone()[0])
+    conn.close()
+    assert meta["items_collected"] == 42 and meta["items_selected"] == 1 and "rebuilt_at" in meta
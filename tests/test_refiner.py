@@ -0,0 +1,63 @@
+import datetime as dt, json
+from agents import db as dbmod
+from agents.refiner import propose
+from agents.terms import title_grams
+
+AS_OF = dt.date(2026, 3, 30)
+ROUTINE = ["Refugees arrive in Chad", "Asylum seekers wait at Greek islands", "Resettlement quotas announced",
+           "Displaced families return home in Ukraine", "Funding appeal for IDPs in Haiti"]
+CHOLERA = ["Cholera outbreak spreads through Darfur shelters", "Health workers race to contain cholera outbreak in Khartoum",
+           "Cholera outbreak kills dozens near Kassala", "UN warns of cholera outbreak as rains hit Gedaref",
+           "Clinics in Port Sudan strained by cholera outbreak", "Vaccines arrive to fight Kosti cholera outbreak"]
+
+def _item(i, day, title, publisher="UNHCR"):
+    return {"id": f"i{i}", "url": f"https://example.org/{i}", "title": title, "publisher": publisher,
+            "domain": "example.org", "published_at": f"{day}T09:00:00Z", "retrieved_at": f"{day}T10:00:00Z",
+            "snippet": "", "tier": "A", "keywords_hit": ["refugees"], "source_type": "rss"}
+
+def _grams(conn):
+    return {(r["day"], r["gram"]): r["n"] for r in conn.execute("SELECT day, gram, n FROM title_grams")}
+
+def test_title_grams_skip_stopwords_and_numbers():
+    assert title_grams("Return to Sudan: 2,000 refugees cross border") == {
+        "return", "sudan", "refugees", "cross", "border", "refugees cross", "cross border"}
+
+def test_bursting_terms_are_proposed_with_evidence(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    items, i = [], 0
+    for back in range(30):
+        day = (AS_OF - dt.timedelta(days=back)).isoformat()
+        for title in ROUTINE:
+            items.append(_item(i, day, f"{title} ({day})"))
+            i += 1
+    for back, title in enumerate(CHOLERA):
+        day = (AS_OF - dt.timedelta(days=back % 2)).isoformat()
+        items.append(_item(i, day, title, publisher=f"Outlet {back}"))
+        items.append(_item(i + 1, day, "Border flotilla intercepted off Libya"))  # one syndicated story
+        items.append(_item(i + 2, day, f"Refugees flee fighting ({back})"))  # already a keyword
+        i += 3
+    dbmod.upsert_items(conn, items)
+
+    # counts are maintained incrementally: an edited title moves its grams
+    edited = dict(items[0], title="Winterization kits delivered")
+    dbmod.upsert_items(conn, [edited])
+    incremental = _grams(conn)
+    dbmod.rebuild_title_grams(conn)
+    assert _grams(conn) == incremental
+    assert incremental[(edited["published_at"][:10], "winterization kits")] == 1
+
+    pack = tmp_path / "pack.json"
+    pack.write_text(json.dumps({"version": 3, "mission": "Monitor displaced people and refugees.",
+                                "keywords": ["refugees", "displaced"], "negative_keywords": ["stock displacement"]}))
+    proposal, rationale = propose(db, str(pack), as_of=AS_OF)
+    conn.close()
+
+    assert proposal["version"] == 4 and proposal["mission"] == "Monitor displaced people and refugees."
+    added = set(proposal["keywords"]) - {"refugees", "displaced"}
+    assert "cholera outbreak" in added and "cholera" not in added
+    assert not any("flotilla" in t or "flee" in t for t in added)
+    assert "- cholera outbreak: 6 titles" in rationale
+    assert "Cholera outbreak kills dozens near Kassala" in rationale
+    assert "story cluster(s) only" in rationale and "already matched by a current keyword" in rationale
@@ -0,0 +1,36 @@
+import datetime as dt
+from docx import Document
+from agents import db as dbmod
+from agents.collector import select_for_window
+from agents.editor import qa_and_append
+from agents.export_docx import report_to_docx
+from agents.writer import build_report
+
+def _item(i, title):
+    return {"id": f"id{i}", "url": f"https://unhcr.org/{i}", "title": title, "publisher": "UNHCR",
+            "domain": "unhcr.org", "published_at": f"2026-02-20T0{i}:00:00Z", "retrieved_at": "2026-02-20T10:00:00Z",
+            "snippet": "", "tier": "A", "keywords_hit": ["refugees"], "source_type": "rss"}
+
+def test_report_model_renders_markdown_and_docx(tmp_path):
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    dbmod.upsert_items(conn, [_item(1, "Refugees cross from Sudan"), _item(2, "Camp expands for displaced families")])
+    select_for_window(conn, "2026-02-20T00:00:00Z", "2026-02-20T23:59:59Z", "2026-02-20", 8,
+                      now=dt.datetime(2026, 2, 20, 12, tzinfo=dt.timezone.utc))
+    conn.close()
+
+    report, wmeta = build_report("2026-02-20", db_path=db, out_dir=str(tmp_path / "out"))
+    assert [s.heading for s in report.sections] == ["Executive Summary", "Top Developments", "Regional Snapshot", "What to Watch"]
+    assert wmeta["regions"] == ["Sudan"] and [f.item_id for f in report.footnotes] == ["id2", "id1"]
+    emeta = qa_and_append(report, db_path=db)
+    text = open(report.path, encoding="utf-8").read()
+    assert text == report.to_markdown()
+    assert "1. **Camp expands for displaced families** (UNHCR; February 20, 2026)<sup>1</sup>" in text
+    assert emeta["citation_markers"] == text.split("## Footnotes")[0].count("<sup>") == 5
+    assert text.endswith("Tier U/C dominated.\n") and "\n\n## Appendix A: Quality & Methods Notes\n" in text
+
+    paras = Document(report_to_docx(report, str(tmp_path / "out" / "report.docx"))).paragraphs
+    assert paras[0].text == report.title
+    sups = [r.text for p in paras for r in p.runs if r.font.superscript]
+    assert len(sups) == emeta["citation_markers"]
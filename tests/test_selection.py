@@ -0,0 +1,78 @@
+import datetime as dt
+from dateutil import parser as dtparser
+from agents.collector import score_item, pick_cluster_representatives
+
+def _legacy(item, now):
+    tier_w = {"A": 3.0, "B": 2.0, "C": 1.0, "U": 0.7}.get(item.get("tier", "U"), 0.7)
+    kw = min(len(item.get("keywords_hit", [])), 4) * 0.5
+    recency = 1.0
+    if item.get("published_at"):
+        t = dtparser.parse(item["published_at"])
+        age_h = max((now - t.astimezone(dt.timezone.utc)).total_seconds() / 3600, 0)
+        recency = max(0.1, 1.5 - min(age_h / 48, 1.4))
+    return round(tier_w + kw + recency, 3)
+
+def test_score_item_matches_legacy_formula():
+    now = dt.datetime(2026, 2, 20, 12, 0, 0, 123456, tzinfo=dt.timezone.utc)
+    for tier in "ABCU":
+        for minutes in (0, 1, 59, 61, 1439, 2880, 5000, -30):
+            pub = (now - dt.timedelta(minutes=minutes)).replace(microsecond=0)
+            item = {"tier": tier, "keywords_hit": ["a"] * (minutes % 6), "published_at": pub.isoformat().replace("+00:00", "Z")}
+            assert score_item(item, now) == _legacy(item, now)
+    assert score_item({"tier": "B", "keywords_hit": []}, now) == 3.0
+
+def test_topk_ties_keep_row_order():
+    scored = [("a", 4.0, "x"), ("b", 5.0, "y"), ("c", 5.0, "z"), ("d", 5.0, "y")]
+    assert pick_cluster_representatives(scored, 2) == [("b", 5.0, 2), ("c", 5.0, 1)]
+
+def test_incremental_selection_matches_full_rescan(tmp_path, monkeypatch):
+    import random
+    from agents import collector, db as dbmod
+    from agents.scoring import epoch_us, score_rows
+
+    real_scan = dbmod.iter_window_chunks
+
+    def full(conn, start, end, now):
+        rows = [r for chunk in real_scan(conn, start, end, collector.SCORE_COLUMNS, pack="default")
+                for r in chunk]
+        scored = zip(rows, score_rows(rows, epoch_us(now)))
+        return len(rows), collector.pick_cluster_representatives(((r["id"], s, r["cluster_id"] or r["id"]) for r, s in scored), 6)
+
+    def iso(t):
+        return t.isoformat().replace("+00:00", "Z")
+
+    rng = random.Random(7)
+    titles = [f"Refugees {w} {v}" for w in ("cross border", "reach camp", "seek asylum", "await aid") for v in ("north", "south", "coast")]
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    scans = []
+    monkeypatch.setattr(dbmod, "iter_window_chunks", lambda *a, **kw: (scans.append(1), real_scan(*a, **kw))[1])
+
+    now = dt.datetime(2026, 2, 20, 2, 0, tzinfo=dt.timezone.utc)
+    items, n = {}, 0
+    for run in range(60):
+        now += dt.timedelta(minutes=15)
+        batch = []
+        for _ in range(rng.randint(0, 12) if run else 80):
+            kind = rng.random()
+            pub = now - dt.timedelta(minutes=rng.randrange(0, 23 * 60 if not run else 90, 30))
+            if kind < 0.1:
+                pub = now + dt.timedelta(minutes=rng.choice([30, 90]))  # future-dated
+            it = {"id": f"i{n}", "url": f"https://x.org/{n}", "title": f"{rng.choice(titles)}",
+                  "published_at": None if kind > 0.85 else iso(pub), "retrieved_at": iso(now),
+                  "tier": rng.choice("ABCU"), "keywords_hit": ["refugees"] * rng.randint(0, 3), "source_type": "rss"}
+            items[it["id"]] = it
+            batch.append(it)
+            n += 1
+        for it in rng.sample(list(items.values()), 2):  # re-published with another tier
+            batch.append(dict(it, tier=rng.choice("ABCU")))
+        dbmod.upsert_items(conn, batch)
+        start, end = iso(now - dt.timedelta(hours=24)), iso(now)
+        got = collector.select_for_window(conn, start, end, "2026-02-20", 6, now=now, changed=[it["id"] for it in batch])
+        assert got == full(conn, start, end, now)
+        saved = conn.execute("SELECT item_id, score, cluster_size FROM daily_selected WHERE date='2026-02-20'").fetchall()
+        assert sorted(map(tuple, saved)) == sorted(got[1])
+    # most runs are served from the pool
+    assert len(scans) < 15
+    conn.close()
@@ -0,0 +1,92 @@
+import json, os
+import pytest
+import cli
+from agents import collector, db as dbmod, validation
+
+ITEM = {"id": "x1", "title": "Refugees cross border", "url": "https://reliefweb.int/a", "publisher": "ReliefWeb",
+        "published_at": None, "retrieved_at": "2026-02-20T10:00:00Z", "snippet": "", "tier": "A",
+        "keywords_hit": ["refugees"], "source_type": "rss", "event_ts": 1771581600}
+def test_validator_is_built_once_and_locates_errors():
+    v = validation.validator(validation.RAW_ITEM)
+    assert validation.validator(validation.RAW_ITEM) is v and v.errors(ITEM) == []
+    assert v.errors(dict(ITEM, keywords_hit=["refugees", 2])) == ["keywords_hit[1]: 2 is not of type 'string'"]
+    assert v.errors(dict(ITEM, tier="Z"))[0].startswith("tier: 'Z' is not one of")
+    assert v.errors([]) == ["(root): [] is not of type 'object'"]
+    valid, invalid = v.partition([ITEM, dict(ITEM, title=None)])
+    assert valid == [ITEM] and invalid == [(dict(ITEM, title=None), ["title: None is not of type 'string'"])]
+
+def test_invalid_items_are_quarantined_not_written(tmp_path, monkeypatch):
+    articles = [{"title": "Refugees reach camp", "url": "https://reliefweb.int/a", "domain": "reliefweb.int",
+                 "seendate": "20260220T100000Z"},
+                {"title": "Refugees reach border", "url": "https://example.org/b", "domain": None,
+                 "seendate": "20260220T100000Z"}]
+    monkeypatch.setattr(collector, "fetch_url", lambda *a, **k: json.dumps({"articles": articles}).encode())
+    pack = {"keywords": ["refugees"], "negative_keywords": [], "source_tiers": {"A": ["reliefweb.int"]},
+            "gdelt_query": "refugees", "rss_feeds": [], "report": {}}
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    for _ in range(2):
+        meta = collector.collect_and_persist(db, packs=[pack])
+    assert meta["quarantined"] == 1 and meta["inserted_or_updated"] == 0 and meta["unchanged"] == 1
+    conn = dbmod.connect(db)
+    assert [r["title"] for r in conn.execute("SELECT title FROM items")] == ["Refugees reach camp"]
+    q = conn.execute("SELECT * FROM quarantine").fetchall()
+    conn.close()
+    assert len(q) == 1 and q[0]["hits"] == 2 and q[0]["source_type"] == "gdelt"
+    assert json.loads(q[0]["errors_json"]) == ["publisher: None is not of type 'string'"]
+
+def test_validate_date_range(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+    conn = dbmod.connect(db)
+    headers = "\n".join(validation.REQUIRED_HEADERS)
+    meta = {"date": None, "items_collected": 5, "items_selected": 2, "footnotes": 2, "tier_breakdown": {},
+            "regions": [], "publishers": ["UNHCR"]}
+    for day, text, extra in [("2026-02-01", headers, {}), ("2026-02-02", "# Displacement Watch Brief", {}),
+                             ("2026-02-03", headers, {"items_selected": "2"})]:
+        path = os.path.join("data", day, "report.md")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        dbmod.save_report_meta(conn, day, path, None, {**meta, "date": day, **extra})
+    conn.close()
+
+    with pytest.raises(SystemExit, match=r"2 of 4 day\(s\) failed validation"):
+        cli.main(["--db", db, "validate", "--start", "2026-02-01", "--end", "2026-02-04", "--workers", "2"])
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary["ok"], summary["invalid"], summary["missing"]) == (1, 2, 1)
+    assert summary["missing_dates"] == ["2026-02-04"]
+    problems = {p["date"]: p["errors"] for p in summary["problems"]}
+    assert problems["2026-02-02"][0] == "report: missing header '## Executive Summary'"
+    assert problems["2026-02-03"] == ["meta_json: items_selected: '2' is not of type 'integer'"]
+
+    cli.main(["--db", db, "validate", "--date", "2026-02-01"])
+    assert "Report validated" in capsys.readouterr().out
+
+RSS = b'''<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><guid>a</guid><title>Refugees flee fighting in Sudan</title><link>https://reliefweb.int/a</link></item>
+<item><guid>b</guid><title>Displaced families return in Ukraine</title><link>https://example.org/b</link></item>
+</channel></rss>'''
+
+def test_run_daily_meta_passes_validation(tmp_path, monkeypatch, capsys):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "config", "query_pack.json"), encoding="utf-8") as f:
+        pack = json.load(f)
+    pack["rss_feeds"] = [{"name": "UNHCR", "url": "http://feed"}]
+    monkeypatch.chdir(tmp_path)
+    with open("pack.json", "w", encoding="utf-8") as f:
+        json.dump(pack, f)
+    monkeypatch.setattr(collector, "fetch_feed", lambda url, timeout=None, state=None, session=None: {
+        "status": 200, "content": RSS, "bytes": len(RSS), "etag": None, "last_modified": None})
+    monkeypatch.setattr(collector, "fetch_url", lambda *a, **k: b'{"articles": []}')
+    db = str(tmp_path / "t.db")
+    cli.main(["--db", db, "run-daily", "--pack", "pack.json", "--run-log", ""])
+    date_key = json.loads(capsys.readouterr().out)["date"]
+
+    conn = dbmod.connect(db)
+    meta = json.loads(conn.execute("SELECT meta_json FROM reports WHERE date = ?", (date_key,)).fetchone()[0])
+    conn.close()
+    assert meta["regions"] and validation.validator(validation.REPORT_META).errors(meta) == []
+    cli.main(["--db", db, "validate", "--date", date_key, "--pack", "pack"])
+    assert "Report validated" in capsys.readouterr().out
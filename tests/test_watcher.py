@@ -0,0 +1,101 @@
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents import collector, db as dbmod
+from agents.watcher import Watcher, next_interval, status_rows
+
+def _rss(n):
+    items = "".join(f"<item><guid>b{i}</guid><title>Refugees cross border {i}</title>"
+                    f"<link>https://reliefweb.int/b{i}</link></item>" for i in range(n))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{items}</channel></rss>'.encode()
+
+class _Feeds(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: dict = {}
+    ports: set = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        with self.lock:
+            n = self.hits[path] = self.hits.get(path, 0) + 1
+            self.ports.add(self.client_address[1])
+        status, body, etag = 200, b"", None
+        if path == "/busy":
+            body = _rss(5 * n)  # five new entries per poll
+        elif path == "/quiet":
+            if self.headers.get("If-None-Match") == '"q1"':
+                status = 304
+            body, etag = (b"" if status == 304 else _rss(2)), '"q1"'
+        elif path == "/gdelt":
+            body = b'{"articles": []}'
+        else:
+            status, body = 500, b"down"
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_next_interval_tracks_publish_rate():
+    assert next_interval(900, None, 10, None) == (900, None)
+    fast, rate = next_interval(900, None, 9, 900)
+    assert fast == 300 and rate == 0.01
+    slow, rate = next_interval(900, 0.0, 0, 900)
+    assert slow == 1800 and rate == 0.0
+
+def test_watch_adapts_intervals_breaks_circuit_and_reports_at_cutoff(tmp_path, monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Feeds)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    monkeypatch.setattr(collector, "GDELT_URL", f"{base}/gdelt")
+    pack = {"keywords": ["refugees"], "negative_keywords": [], "source_tiers": {"A": ["reliefweb.int"]},
+            "gdelt_query": "refugee", "report": {"max_top_developments": 8},
+            "rss_feeds": [{"name": "busy", "url": f"{base}/busy"}, {"name": "quiet", "url": f"{base}/quiet"},
+                          {"name": "broken", "url": f"{base}/broken"}]}
+    db = str(tmp_path / "t.db")
+    dbmod.init_db(db)
+
+    start = time.time()
+    clock = [start]
+    cutoff = time.strftime("%H:%M", time.gmtime(start + 4 * 3600))
+    reports = []
+
+    def sleep(s):
+        clock[0] += max(s, 1)
+        if clock[0] > start + 5 * 3600:
+            w.stop.set()
+
+    w = Watcher(db, [pack], cutoff=cutoff, workers=4, on_cutoff=lambda meta, session: reports.append(meta),
+                clock=lambda: clock[0], sleep=sleep)
+    try:
+        w.run()
+    finally:
+        w.close()
+    srv.shutdown()
+
+    rows = {r["name"]: r for r in status_rows(dbmod.connect(db), clock[0])}
+    assert set(rows) == {"busy", "quiet", "broken", "GDELT"}
+    assert rows["busy"]["interval_s"] == 300 and rows["busy"]["churn_per_day"] > 0
+    assert rows["quiet"]["interval_s"] > 900 and rows["quiet"]["status"] == "not_modified"
+    assert rows["broken"]["failures"] >= 3 and rows["broken"]["last_error"]
+    # the breaker keeps the failing feed well below the busy feed's poll count
+    assert _Feeds.hits["/busy"] >= 50 and _Feeds.hits["/broken"] <= 8
+    # keep-alive: far fewer client connections than requests
+    assert len(_Feeds.ports) < sum(_Feeds.hits.values()) / 4
+
+    assert len(reports) == 1
+    meta = reports[0]
+    assert meta["mode"] == "watch" and meta["selected"] > 0 and meta["inserted"] > 0
+    conn = dbmod.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM daily_selected WHERE date = ?", (meta["date"],)).fetchone()[0] == meta["selected"]
+    conn.close()
+
+    # a restarted watcher resumes the saved schedule
+    w2 = Watcher(db, [pack], clock=lambda: clock[0])
+    assert w2.sources[f"{base}/quiet"]["state"]["interval_s"] == rows["quiet"]["interval_s"]
+    assert w2.due(clock[0]) == [k for k in w2.sources if w2.sources[k]["state"]["next_poll_ts"] <= clock[0]]
+    w2.close()